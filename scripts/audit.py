@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Local offline audit of the hash dumps made by create_hashdumps.py.
+
+md5.txt, sha1.txt, sha256.txt and the NTLM column of pwdump.txt are
+loaded into indexes of raw digest bytes. A wordlist (or '-' for a
+candidate stream on stdin) is hashed in batches on a process pool and
+every hit is mapped back to the users and, with --credentials, the
+credentials.csv rows. NTLM is computed with a vectorized MD4 when NumPy
+is installed (hashlib often lacks md4 on OpenSSL 3), falling back to
+hashlib or passlib one password at a time.
+
+--shadow also attacks shadow.txt (SHA-512 crypt), grouping hashes by
+salt so each candidate is hashed once per salt. It is slow by design;
+--shadow-limit caps how many candidates it tries.
+
+Usage: python audit.py wordlist.txt [--credentials credentials.csv] [--shadow]
+"""
+import os
+import csv
+import sys
+import time
+import hashlib
+import argparse
+import importlib.util
+from collections import deque, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from create_hashdumps import FORMATS, load_passlib
+
+# numpy is optional (per-password NTLM fallback) and imported on first use
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+FAST_FORMATS = ["md5", "sha1", "sha256", "pwdump"]
+BATCH_SIZE = 10000
+SHADOW_BATCH = 200
+SHADOW_LIMIT = 100000
+RESULTS_FILE = "audit_results.csv"
+
+
+# --- hashing ---
+def _md4_rounds():
+    """ (message word, shift, round constant, round) for MD4's 48 steps """
+    steps = []
+    for i in range(16):
+        steps.append((i, (3, 7, 11, 19)[i % 4], 0, 1))
+    for i in range(16):
+        steps.append(((i % 4) * 4 + i // 4, (3, 5, 9, 13)[i % 4], 0x5A827999, 2))
+    order = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)
+    for i in range(16):
+        steps.append((order[i], (3, 9, 11, 15)[i % 4], 0x6ED9EBA1, 3))
+    return steps
+
+MD4_STEPS = _md4_rounds()
+
+
+def ntlm_numpy(passwords):
+    """
+    NTLM (MD4 of UTF-16LE) for a batch at once, one uint32 lane per
+    password. Only for passwords that fit a single block (<= 27 chars).
+    """
+    global np
+    if np is None:
+        import numpy as np  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    blocks = bytearray()
+    for pw in passwords:
+        data = pw.encode('utf-16-le')
+        blocks += data + b"\x80" + bytes(55 - len(data)) + (len(data) * 8).to_bytes(8, 'little')
+    x = np.frombuffer(bytes(blocks), dtype='<u4').reshape(len(passwords), 16).T
+    state = [np.full(len(passwords), v, dtype=np.uint32)
+             for v in (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)]
+    a, b, c, d = state
+    with np.errstate(over='ignore'):
+        for k, s, const, rnd in MD4_STEPS:
+            if rnd == 1:
+                f = (b & c) | (~b & d)
+            elif rnd == 2:
+                f = (b & c) | (b & d) | (c & d)
+            else:
+                f = b ^ c ^ d
+            t = a + f + x[k] + np.uint32(const)
+            a, b, c, d = d, (t << np.uint32(s)) | (t >> np.uint32(32 - s)), b, c
+        out = np.stack([a + state[0], b + state[1], c + state[2], d + state[3]], axis=1)
+    raw = out.astype('<u4').tobytes()
+    return [raw[i * 16:(i + 1) * 16] for i in range(len(passwords))]
+
+
+def ntlm_one(password):
+    try:
+        return hashlib.new('md4', password.encode('utf-16-le')).digest()
+    except ValueError:
+        return load_passlib()[1].raw(password)
+
+
+def ntlm_many(passwords):
+    if not HAVE_NUMPY:
+        return [ntlm_one(pw) for pw in passwords]
+    short = [i for i, pw in enumerate(passwords) if len(pw.encode('utf-16-le')) <= 55]
+    digests = [None] * len(passwords)
+    if short:
+        for i, digest in zip(short, ntlm_numpy([passwords[i] for i in short])):
+            digests[i] = digest
+    for i, digest in enumerate(digests):
+        if digest is None:
+            digests[i] = ntlm_one(passwords[i])
+    return digests
+
+
+def digests_for(fmt, words):
+    if fmt == "pwdump":
+        return ntlm_many(words)
+    func = getattr(hashlib, fmt)
+    return [func(w.encode('utf-8')).digest() for w in words]
+
+
+# --- loading ---
+def load_digest_file(fmt, path):
+    """
+    {raw digest: [user label, ...]} for one dump file. Raw hash files are
+    labelled by 1-based line number, pwdump by user and uid.
+    """
+    index = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if fmt == "pwdump":
+                parts = line.split(":")
+                if len(parts) < 4:
+                    continue
+                index[bytes.fromhex(parts[3])].append((parts[0], int(parts[1])))
+            else:
+                index[bytes.fromhex(line)].append(("line", line_no))
+    return dict(index)
+
+
+def load_shadow(path):
+    """ {(rounds, salt): {full hash: [user, ...]}} for the $6$ lines of shadow.txt """
+    groups = defaultdict(lambda: defaultdict(list))
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(":")
+            if len(parts) < 2 or not parts[1].startswith("$6$"):
+                continue
+            fields = parts[1].split("$")
+            rounds = 5000
+            if fields[2].startswith("rounds="):
+                rounds = int(fields[2][7:])
+                salt = fields[3]
+            else:
+                salt = fields[2]
+            groups[(rounds, salt)][parts[1]].append(parts[0])
+    return {key: dict(hashes) for key, hashes in groups.items()}
+
+
+def load_credentials(path):
+    """ rows of credentials.csv: (all rows, rows with a password) as hash lines are written """
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    return rows, [row for row in rows if row.get('password')]
+
+
+# --- workers ---
+worker_indexes = {}
+
+
+def init_worker(indexes):
+    """ process pool initializer: each worker gets the digest indexes once """
+    worker_indexes.update(indexes)
+
+
+def crack_batch(words):
+    """ [(format, digest, word)] for every hit in a batch """
+    hits = []
+    for fmt, index in worker_indexes.items():
+        for word, digest in zip(words, digests_for(fmt, words)):
+            if digest in index:
+                hits.append((fmt, digest, word))
+    return hits
+
+
+def crack_shadow_batch(groups, words):
+    """ [(full hash, word)] for a batch against every salt group """
+    hits = []
+    sha512_crypt = load_passlib()[0]
+    for (rounds, salt), hashes in groups.items():
+        hasher = sha512_crypt.using(salt=salt, rounds=rounds)
+        for word in words:
+            hashed = hasher.hash(word)
+            if hashed in hashes:
+                hits.append((hashed, word))
+    return hits
+
+
+def read_batches(path, size, limit=None):
+    f = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8', errors='ignore')
+    try:
+        batch = []
+        count = 0
+        for line in f:
+            word = line.rstrip("\r\n")
+            if not word:
+                continue
+            batch.append(word)
+            count += 1
+            if len(batch) >= size:
+                yield batch
+                batch = []
+            if limit is not None and count >= limit:
+                break
+        if batch:
+            yield batch
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def run_pool(pool, func, batches, window, *args):
+    """ submit batches with at most `window` in flight, yield each result list """
+    if pool is None:
+        for batch in batches:
+            yield len(batch), func(*args, batch)
+        return
+    pending = deque()
+    for batch in batches:
+        pending.append((len(batch), pool.submit(func, *args, batch)))
+        if len(pending) >= window:
+            n, future = pending.popleft()
+            yield n, future.result()
+    while pending:
+        n, future = pending.popleft()
+        yield n, future.result()
+
+
+# --- reporting ---
+def label_user(fmt, label, credentials):
+    """ user_id for an index label, using credentials.csv when given """
+    kind, value = label
+    if fmt == "pwdump":
+        return kind
+    if credentials is not None and value - 1 < len(credentials[1]):
+        return credentials[1][value - 1]['user_id']
+    return f"line {value}"
+
+
+def print_rates(results, totals, credentials):
+    print("\n" + "=" * 40)
+    print("LOCAL AUDIT REPORT")
+    print("=" * 40)
+    for fmt, total in totals.items():
+        cracked = {user for f, user, _ in results if f == fmt}
+        print(f"{FORMATS[fmt][0]:<12} cracked {len(cracked)}/{total} ({len(cracked) / max(total, 1):.1%})")
+    if credentials is not None:
+        # personal accounts are keyed by email, work accounts by LAN ID
+        for kind, is_personal in (("Personal", True), ("Work", False)):
+            users = {row['user_id'] for row in credentials[1] if ('@' in row['user_id']) == is_personal}
+            cracked = {user for _, user, _ in results if user in users}
+            if users:
+                print(f"{kind} passwords cracked: {len(cracked)}/{len(users)} ({len(cracked) / len(users):.1%})")
+
+
+def audit(wordlist, formats=FAST_FORMATS, credentials_file=None, workers=None, shadow=False,
+          shadow_limit=SHADOW_LIMIT, output_file=RESULTS_FILE):
+    if shadow and wordlist == "-":
+        print("❌ --shadow reads the wordlist a second time, it needs a file instead of stdin")
+        return
+    start = time.perf_counter()
+    indexes = {}
+    totals = {}
+    for fmt in formats:
+        path = FORMATS[fmt][0]
+        if os.path.exists(path):
+            indexes[fmt] = load_digest_file(fmt, path)
+            totals[fmt] = sum(len(v) for v in indexes[fmt].values())
+        else:
+            print(f"⚠️  {path} not found, skipping {fmt}")
+    shadow_groups = load_shadow(FORMATS["shadow"][0]) if shadow else {}
+    if shadow:
+        totals["shadow"] = sum(len(users) for g in shadow_groups.values() for users in g.values())
+    if not indexes and not shadow_groups:
+        print("❌ Nothing to audit, run create_hashdumps.py first")
+        return
+    credentials = load_credentials(credentials_file) if credentials_file else None
+
+    workers = workers or os.cpu_count() or 1
+    print(f"--- Auditing {', '.join(totals)} with {wordlist} "
+          f"({workers} worker{'s' if workers > 1 else ''}) ---")
+    results = set()     # (format, user, password)
+    tried = 0
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                               initargs=(indexes,)) if workers > 1 else None
+    try:
+        if pool is None:
+            init_worker(indexes)
+        if indexes:
+            for n, hits in run_pool(pool, crack_batch, read_batches(wordlist, BATCH_SIZE), workers * 4):
+                tried += n
+                for fmt, digest, word in hits:
+                    for label in indexes[fmt][digest]:
+                        results.add((fmt, label_user(fmt, label, credentials), word))
+        hashed = time.perf_counter()
+        if shadow_groups:
+            print(f"--- sha512crypt: {len(shadow_groups)} salts, first {shadow_limit} candidates ---")
+            batches = read_batches(wordlist, SHADOW_BATCH, shadow_limit)
+            for _, hits in run_pool(pool, crack_shadow_batch, batches, workers * 2, shadow_groups):
+                for full_hash, word in hits:
+                    for group in shadow_groups.values():
+                        for user in group.get(full_hash, ()):
+                            results.add(("shadow", user, word))
+    except KeyboardInterrupt:
+        print("\nInterrupted, reporting what was cracked so far.")
+        hashed = time.perf_counter()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["file", "user_id", "password"])
+        for fmt, user, word in sorted(results):
+            writer.writerow([FORMATS[fmt][0], user, word])
+
+    print_rates(results, totals, credentials)
+    elapsed = hashed - start
+    if tried:
+        print(f"\nCandidates: {tried} in {elapsed:.1f}s ({tried * len(indexes) / elapsed:,.0f} hashes/s)")
+    print(f"Results saved to: {output_file}")
+
+
+def parse_formats(value):
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [n for n in names if n not in FAST_FORMATS]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown format(s) {', '.join(unknown) or value!r}; choose from {', '.join(FAST_FORMATS)}")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Crack the create_hashdumps.py outputs locally with a wordlist.")
+    parser.add_argument("wordlist", help="one candidate per line, '-' for stdin")
+    parser.add_argument("--credentials", help="credentials.csv, to map hits back to user_id rows")
+    parser.add_argument("--formats", type=parse_formats, default=FAST_FORMATS,
+                        help=f"fast hash files to load (default: {','.join(FAST_FORMATS)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="hashing processes, 1 = serial (default: %(default)s)")
+    parser.add_argument("--shadow", action="store_true", help="also attack shadow.txt (slow)")
+    parser.add_argument("--shadow-limit", type=int, default=SHADOW_LIMIT,
+                        help="candidates to try against shadow.txt (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=RESULTS_FILE, help="cracked users (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        audit(args.wordlist, args.formats, args.credentials, args.workers, args.shadow,
+              args.shadow_limit, args.output)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
@@ -0,0 +1,158 @@
+"""
+Duplicate-aware adaptive batching for the persona generator.
+
+Tracks the live acceptance rate (EWMA of accepted / requested) per sector
+and uses it to:
+  - size each request so the expected accepted count matches what is still
+    needed, within [min_chunk, max_chunk]
+  - pick sectors by smooth weighted round robin, weighted by yield, and
+    stop sectors whose yield stays below min_yield after a warm-up
+  - build compact exclusion hints (overused names, top password roots)
+    that are rotated into the prompt so the model stops repeating itself
+Token usage is tracked so accepted-personas-per-1k-tokens can be reported.
+"""
+import math
+from collections import Counter
+from near_duplicates import password_root
+
+
+class SectorStats:
+    """ running totals and smoothed yield for one sector """
+    def __init__(self):
+        self.batches = 0
+        self.requested = 0
+        self.generated = 0
+        self.accepted = 0
+        self.tokens = 0
+        self.yield_ewma = None
+        self.current_weight = 0.0
+        self.stopped = False
+
+    def per_1k_tokens(self):
+        return self.accepted * 1000 / self.tokens if self.tokens else 0.0
+
+
+class BatchController:
+    def __init__(self, sectors, base_chunk=25, min_chunk=10, max_chunk=50,
+                 min_yield=0.15, warmup_batches=3, alpha=0.3,
+                 hint_names=8, hint_roots=8, hint_pool=40):
+        self.sectors = {name: SectorStats() for name in sectors}
+        self.rotation = list(sectors)
+        self.base_chunk = base_chunk
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.min_yield = min_yield
+        self.warmup_batches = warmup_batches
+        self.alpha = alpha
+        self.hint_names = hint_names
+        self.hint_roots = hint_roots
+        self.hint_pool = hint_pool
+        self.hint_offset = 0
+
+    # --- scheduling ---
+    def weight(self, stats):
+        if stats.yield_ewma is None:
+            return 1.0
+        return max(stats.yield_ewma, 0.01)
+
+    def sector(self, name):
+        """ stats for a sector, created on first use (e.g. a CLI override) """
+        if name not in self.sectors:
+            self.sectors[name] = SectorStats()
+        return self.sectors[name]
+
+    def active_sectors(self):
+        rotation = {name: self.sectors[name] for name in self.rotation}
+        active = {name: s for name, s in rotation.items() if not s.stopped}
+        # never stop everything: fall back to the whole rotation
+        return active or rotation
+
+    def next_sector(self):
+        """Smooth weighted round robin over active sectors (deterministic)."""
+        active = self.active_sectors()
+        total = 0.0
+        best_name, best = None, None
+        for name, stats in active.items():
+            w = self.weight(stats)
+            stats.current_weight += w
+            total += w
+            if best is None or stats.current_weight > best.current_weight:
+                best_name, best = name, stats
+        best.current_weight -= total
+        return best_name
+
+    def batch_size(self, sector, remaining):
+        """ personas to request so the expected accepted count covers `remaining` """
+        stats = self.sector(sector)
+        expected_yield = stats.yield_ewma if stats.yield_ewma is not None else 1.0
+        wanted = min(self.base_chunk, max(remaining, 1))
+        size = math.ceil(wanted / max(expected_yield, 0.05))
+        # small requests are fine once only a few personas are still missing
+        return max(min(self.min_chunk, wanted), min(self.max_chunk, size))
+
+    # --- feedback ---
+    def record(self, sector, requested, generated, accepted, tokens=0):
+        """ feed back one batch's outcome """
+        stats = self.sector(sector)
+        stats.batches += 1
+        stats.requested += requested
+        stats.generated += generated
+        stats.accepted += accepted
+        stats.tokens += tokens
+        # per requested persona, so truncated/unreadable replies count against it
+        batch_yield = accepted / requested if requested else 0.0
+        if stats.yield_ewma is None:
+            stats.yield_ewma = batch_yield
+        else:
+            stats.yield_ewma += self.alpha * (batch_yield - stats.yield_ewma)
+        stats.stopped = (stats.batches >= self.warmup_batches
+                         and stats.yield_ewma < self.min_yield)
+
+    # --- prompt hints ---
+    def _rotating(self, ranked, count):
+        """ a window of `count` items that moves through the top of `ranked` """
+        pool = ranked[:self.hint_pool]
+        if len(pool) <= count:
+            return pool
+        start = self.hint_offset % len(pool)
+        return (pool[start:] + pool[:start])[:count]
+
+    def exclusion_hints(self, name_registry, password_registry):
+        """
+        Compact 'avoid these' prompt lines; empty string until there is data.
+        name_registry counts names the model repeated, password_registry is
+        the accepted personal passwords (reduced to their roots here).
+        """
+        roots = Counter()
+        for pw, count in password_registry.items():
+            root = password_root(pw)
+            if len(root) >= 3:
+                roots[root] += count
+        names = self._rotating([n for n, _ in name_registry.most_common(self.hint_pool)],
+                               self.hint_names)
+        roots = self._rotating([r for r, c in roots.most_common(self.hint_pool) if c > 1],
+                               self.hint_roots)
+        self.hint_offset += max(self.hint_names, self.hint_roots)
+        lines = []
+        if names:
+            lines.append(f"- Overused, do NOT use these names: {', '.join(names)}")
+        if roots:
+            lines.append(f"- Overused, do NOT build passwords on: {', '.join(roots)}")
+        return "\n    ".join(lines)
+
+    # --- reporting ---
+    def totals(self):
+        accepted = sum(s.accepted for s in self.sectors.values())
+        tokens = sum(s.tokens for s in self.sectors.values())
+        return accepted, tokens
+
+    def summary_lines(self):
+        lines = []
+        for name, s in self.sectors.items():
+            if not s.batches:
+                continue
+            y = f"{s.yield_ewma:.0%}" if s.yield_ewma is not None else "n/a"
+            status = "STOPPED" if s.stopped else "active"
+            lines.append(f"{name}: {s.accepted}/{s.generated} accepted, yield {y}, "
+                         f"{s.per_1k_tokens():.2f} per 1k tokens [{status}]")
+        return lines
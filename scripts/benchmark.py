@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Scale benchmarks on a synthetic corpus, fully offline.
+
+Builds (once) a deterministic corpus with synthetic.py, then runs each
+case in its own child process so peak RSS is per case: validate_password,
+salvage_json on fake model replies, strength scoring, get_pwned_count and the full
+check_hibp_csv enrichment against a local hibp_stub range server,
+create_hashdumps per format, sample.py, the generator loop with the
+fake Gemini client, and the cold start of the offline study.py commands
+(`study.py <command> --help` in a fresh interpreter, p50 should stay
+under ~100 ms). Reports throughput, p50/p99 per-call latency (where a
+case is made of calls) and peak RSS.
+
+--save-baseline stores the numbers per corpus size in a JSON file,
+--check compares against it and exits 1 when throughput drops or peak
+RSS grows by more than --threshold. The committed benchmark_baseline.json
+holds the 10k and 100k reference sizes from a single-core machine; re-save
+it on the machine that runs --check.
+
+Usage: python benchmark.py [--size 10k|100k|1M] [--only hashdump_md5,sampling] [--save-baseline | --check]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+import resource
+import contextlib
+import subprocess
+import multiprocessing
+
+DATA_DIR = "bench_data"
+BASELINE_FILE = "benchmark_baseline.json"
+RESULTS_FILE = "benchmark_results.json"
+THRESHOLD = 0.20
+PWNED_SHARE = 0.8           # share of corpus passwords the stub knows, about the study's HIBP rate
+LOOKUP_SAMPLE = 2000        # get_pwned_count makes one request per call
+SHADOW_ROWS = 5_000         # SHA-512 crypt is timed on a slice, even at low rounds
+SHADOW_ROUNDS = 5000
+GENERATOR_TARGET = 250      # enough batches to time the async loop
+FAKE_LATENCY = 0.05
+SAMPLE_SIZE = "10%"
+STARTUP_COMMANDS = ["hashdump", "sample", "roots", "candidates", "audit", "strength", "synthetic"]
+STARTUP_RUNS = 5
+HASH_FORMATS = ["md5", "sha1", "sha256", "pwdump", "shadow"]
+
+
+# --- helpers (run in the child) ---
+def read_passwords(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [row['password'] for row in csv.DictReader(f)]
+
+
+def timed_calls(func, items):
+    """ (ops, seconds, per-call latencies in ns) """
+    clock = time.perf_counter_ns
+    latencies = []
+    start = clock()
+    for item in items:
+        t = clock()
+        func(item)
+        latencies.append(clock() - t)
+    return len(latencies), (clock() - start) / 1e9, latencies
+
+
+def timed_run(func, ops):
+    """ (ops, seconds, None) for a case that is one bulk call """
+    start = time.perf_counter()
+    func()
+    return ops, time.perf_counter() - start, None
+
+
+def start_stub(passwords):
+    """ local range server knowing PWNED_SHARE of the passwords; hibp reads the URL on import """
+    from hibp_stub import RangeStub, serve
+    server, url = serve(RangeStub(passwords[:int(len(passwords) * PWNED_SHARE)]))
+    os.environ["HIBP_API_URL"] = url
+    return server
+
+
+# --- cases: each takes the corpus row count, runs in the corpus directory ---
+def bench_validate_password(rows):
+    from password_generator import validate_password
+    return timed_calls(validate_password, read_passwords("credentials.csv"))
+
+
+def bench_salvage_json(rows):
+    from password_generator import salvage_json, get_prompt, SECTORS, CHUNK_SIZE
+    from fake_model import FakeClient
+    fake = FakeClient(malformed_rate=0.3, seed=0)
+    replies = [fake.respond(get_prompt(CHUNK_SIZE, SECTORS[i % len(SECTORS)])).text
+               for i in range(max(100, rows // 100))]
+    return timed_calls(salvage_json, replies)
+
+
+def bench_strength(rows):
+    from strength import StrengthScorer, load_automaton
+    scorer = StrengthScorer(load_automaton(cache_path=None))
+    return timed_calls(scorer.score, read_passwords("credentials.csv"))
+
+
+def bench_get_pwned_count(rows):
+    passwords = read_passwords("credentials.csv")
+    server = start_stub(passwords)
+    from check_hibp_csv import get_pwned_count
+    try:
+        return timed_calls(get_pwned_count, passwords[:LOOKUP_SAMPLE])
+    finally:
+        server.shutdown()
+
+
+def bench_hibp_enrichment(rows):
+    server = start_stub(read_passwords("credentials.csv"))
+    from check_hibp_csv import process_csv
+    try:
+        return timed_run(lambda: process_csv("credentials.csv", cache=None), rows)
+    finally:
+        server.shutdown()
+
+
+def hashdump_case(fmt):
+    def bench(rows):
+        from create_hashdumps import process_credentials
+        input_file, rounds = "credentials.csv", None
+        if fmt == "shadow":
+            input_file, rounds = "credentials_shadow.csv", SHADOW_ROUNDS
+            with open("credentials.csv", 'r', encoding='utf-8') as src, \
+                    open(input_file, 'w', encoding='utf-8') as dst:
+                for i, line in enumerate(src):
+                    if i > SHADOW_ROWS:
+                        break
+                    dst.write(line)
+            rows = min(rows, SHADOW_ROWS)
+        return timed_run(lambda: process_credentials(input_file, rounds=rounds, formats=[fmt],
+                                                     resume=False), rows)
+    return bench
+
+
+def bench_sampling(rows):
+    from sample import process_sampling
+    with open("sample_input.txt", 'w', encoding='utf-8') as f:
+        for pw in read_passwords("credentials.csv"):
+            f.write(hashlib.md5(pw.encode('utf-8')).hexdigest() + "\n")
+    return timed_run(lambda: process_sampling(SAMPLE_SIZE, ["sample_input.txt"], seed=1), rows)
+
+
+def bench_generator_fake(rows):
+    import asyncio
+    import password_generator as pg
+    from fake_model import FakeClient
+    os.makedirs("generator", exist_ok=True)
+    os.chdir("generator")
+    for name in (pg.OUTPUT_JSONL, pg.OUTPUT_JSON, pg.OUTPUT_CSV):
+        if os.path.exists(name):
+            os.remove(name)
+    pg.TARGET_COUNT = GENERATOR_TARGET
+    client = FakeClient(latency=FAKE_LATENCY, seed=0)
+    start = time.perf_counter()
+    asyncio.run(pg.run_study_async(concurrency=pg.CONCURRENCY, model_client=client))
+    return pg.stats["accepted"], time.perf_counter() - start, None
+
+
+def bench_startup(rows):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "study.py")
+    return timed_calls(lambda command: subprocess.run([sys.executable, script, command, "--help"],
+                                                      check=True, stdout=subprocess.DEVNULL),
+                       STARTUP_COMMANDS * STARTUP_RUNS)
+
+
+BENCHMARKS = {
+    "validate_password": bench_validate_password,
+    "salvage_json": bench_salvage_json,
+    "strength": bench_strength,
+    "get_pwned_count": bench_get_pwned_count,
+    "hibp_enrichment": bench_hibp_enrichment,
+    **{f"hashdump_{fmt}": hashdump_case(fmt) for fmt in HASH_FORMATS},
+    "sampling": bench_sampling,
+    "generator_fake": bench_generator_fake,
+    "startup": bench_startup,
+}
+
+
+def percentile(ordered, q):
+    """ nearest-rank percentile of a sorted list """
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_case(name, workdir, rows, conn):
+    """ child process body: run one case quietly and send back its numbers """
+    os.chdir(workdir)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            ops, seconds, latencies = BENCHMARKS[name](rows)
+    except ImportError as e:
+        conn.send({"skipped": str(e)})
+        return
+    except Exception as e:
+        conn.send({"error": str(e)})
+        return
+    # ru_maxrss is KiB on Linux; hashing pools count as children
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    result = {"ops": ops, "seconds": round(seconds, 4),
+              "ops_per_s": round(ops / seconds, 1) if seconds else 0.0,
+              "peak_rss_mb": round(peak / 1024, 1)}
+    if latencies:
+        ordered = sorted(latencies)
+        result["p50_us"] = round(percentile(ordered, 0.50) / 1000, 1)
+        result["p99_us"] = round(percentile(ordered, 0.99) / 1000, 1)
+    conn.send(result)
+
+
+def run_isolated(name, workdir, rows):
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=run_case, args=(name, workdir, rows, child))
+    proc.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"error": f"child exited with code {proc.exitcode}"}
+    proc.join()
+    return result
+
+
+# --- corpus, baselines, report ---
+def ensure_corpus(size_label, rows, seed):
+    """ the corpus directory for this size/seed, generated on first use """
+    from synthetic import write_corpus
+    workdir = os.path.abspath(os.path.join(DATA_DIR, f"{size_label}-seed{seed}"))
+    if not os.path.exists(os.path.join(workdir, "credentials.csv")):
+        print(f"--- Building {rows} persona corpus in {workdir} ---")
+        write_corpus(rows, workdir, seed)
+    return workdir
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def check_regressions(results, baseline, threshold):
+    """ one message per case slower or bigger than the baseline allows """
+    problems = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base or "ops_per_s" not in r or "ops_per_s" not in base:
+            continue
+        if r["ops_per_s"] < base["ops_per_s"] * (1 - threshold):
+            problems.append(f"{name}: {r['ops_per_s']:,.0f}/s vs baseline {base['ops_per_s']:,.0f}/s")
+        if r["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            problems.append(f"{name}: peak RSS {r['peak_rss_mb']} MB vs baseline {base['peak_rss_mb']} MB")
+    return problems
+
+
+def print_row(name, r):
+    if "ops" not in r:
+        status = f"skipped ({r['skipped']})" if "skipped" in r else f"❌ {r['error']}"
+        print(f"{name:<20} {status}")
+        return
+    p50 = f"{r['p50_us']:,.1f}" if "p50_us" in r else "-"
+    p99 = f"{r['p99_us']:,.1f}" if "p99_us" in r else "-"
+    print(f"{name:<20} {r['ops']:>9} {r['seconds']:>9.2f} {r['ops_per_s']:>12,.0f} "
+          f"{p50:>10} {p99:>10} {r['peak_rss_mb']:>8.1f}")
+
+
+def run_benchmarks(size_label, seed=0, only=None, baseline_file=BASELINE_FILE,
+                   save_baseline=False, check=False, threshold=THRESHOLD):
+    """ main entry; returns False when --check found a regression """
+    from synthetic import parse_size
+    rows = parse_size(size_label)
+    workdir = ensure_corpus(size_label, rows, seed)
+    names = only or list(BENCHMARKS)
+    credential_rows = 2 * rows
+
+    print(f"--- {len(names)} benchmarks on {credential_rows} credentials ({size_label}, seed {seed}) ---")
+    print(f"{'case':<20} {'ops':>9} {'seconds':>9} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'RSS MB':>8}")
+    results = {}
+    for name in names:
+        results[name] = run_isolated(name, workdir, credential_rows)
+        print_row(name, results[name])
+
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({size_label: results}, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+    baseline = load_baseline(baseline_file)
+    if save_baseline:
+        measured = {name: r for name, r in results.items() if "ops" in r}
+        baseline.setdefault(size_label, {}).update(measured)
+        with open(baseline_file, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"✅ Baseline for {size_label} saved to {baseline_file}")
+    if check:
+        if size_label not in baseline:
+            print(f"⚠️  No {size_label} baseline in {baseline_file}, run with --save-baseline first")
+            return False
+        problems = check_regressions(results, baseline[size_label], threshold)
+        for problem in problems:
+            print(f"❌ REGRESSION {problem}")
+        if problems:
+            return False
+        print(f"✅ No regressions beyond {threshold:.0%}")
+    return True
+
+
+def parse_only(value):
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown benchmark(s) {', '.join(unknown)}; "
+                                         f"choose from {', '.join(BENCHMARKS)}")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Offline scale benchmarks on a synthetic corpus.")
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1M or a persona count (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed (default: %(default)s)")
+    parser.add_argument("--only", type=parse_only, help="comma separated cases to run (default: all)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON (default: %(default)s)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    mode.add_argument("--check", action="store_true", help="exit 1 on a regression against the baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown / RSS growth as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        ok = run_benchmarks(args.size, args.seed, args.only, args.baseline,
+                            args.save_baseline, args.check, args.threshold)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    sys.exit(0 if ok else 1)
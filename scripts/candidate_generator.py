@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Targeted work-password candidates from known personal passwords.
+
+Rules are learned from the personas.json pairs: for every work password
+that keeps the whole personal root, the root is cut out of it, leaving a
+template such as '{root}!2024Bank' or '{root}#R1sk', plus the case style
+and leet substitutions applied to the root. Years in templates become a
+slot filled from --years. Each personal password (credentials.csv rows
+with an email user_id, or a plain cracked list) is expanded through the
+most frequent rules, pre-filtered with the generator's policy
+(study_policy(), blocklist included), deduplicated with a Bloom filter
+and written as a hashcat wordlist.
+
+Work is sharded by root across processes, so all bases sharing a root
+land in the same shard, and each shard expands its bases in root order.
+Duplicates come from bases sharing a root, so they sit close together,
+and a shard's Bloom filter only covers a window of --bloom-window
+candidates before a fresh one is started. Memory stays bounded however
+large the cracked list is; a repeat further apart than that is written
+again.
+
+Usage: python candidate_generator.py credentials.csv [-o candidates.txt] [--rules-from personas.json]
+"""
+import os
+import re
+import csv
+import sys
+import time
+import zlib
+import shutil
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from password_policy import study_policy, FastBloomFilter
+from root_analysis import decompose, load_personas, LEET_UNDO
+
+OUTPUT_FILE = "candidates.txt"
+RULES_SOURCE = "personas.json"
+TOP_RULES = 500
+DEFAULT_YEARS = "2020-2026"
+BLOOM_FP_RATE = 1e-5
+BLOOM_WINDOW = 4_000_000    # candidates per Bloom filter, ~35 MB per shard at BLOOM_FP_RATE
+NEVER = 1 << 30
+BATCH_SIZE = 16384      # candidates per Bloom filter batch
+YEAR = re.compile(r"(?:19[89]\d|20[0-4]\d)")
+YEAR_SLOT = "\x00"
+LETTER = re.compile(r"[A-Za-z]")
+
+
+def root_span(core, root_at, root_len):
+    """ core[start:end] holding the root letters root_at..root_at+root_len (leet included) """
+    letters = [i for i, c in enumerate(core) if LETTER.match(c.translate(LEET_UNDO))]
+    return letters[root_at], letters[root_at + root_len - 1] + 1
+
+
+def case_style(region, personal):
+    """ how the work password cased the root, relative to the personal one """
+    if region == personal:
+        return "keep"
+    if region == personal.lower():
+        return "lower"
+    if region == personal.upper():
+        return "upper"
+    if region == personal[:1].upper() + personal[1:]:
+        return "capitalize"
+    return None
+
+
+def learn_rule(personal, work):
+    """
+    (before, after, case style, leet pairs) for one persona pair, or None
+    when the work password does not keep the full personal root.
+    """
+    p, w = decompose(personal), decompose(work)
+    if not p.root or not p.root.isalpha() or p.root not in w.root:
+        return None
+    at = w.root.find(p.root)
+    style = case_style(w.cased[at:at + len(p.root)], p.cased)
+    if style is None:
+        return None
+    start, end = root_span(w.core, at, len(p.root))
+    region = w.core[start:end]
+    if len(region) != len(p.root):
+        return None     # separators inside the root, can't be replayed
+    leet = tuple(sorted({(c.translate(LEET_UNDO).lower(), c) for c in region if not c.isalpha()}))
+    before = YEAR.sub(YEAR_SLOT, w.prefix + w.core[:start])
+    after = YEAR.sub(YEAR_SLOT, w.core[end:] + w.suffix)
+    return before, after, style, leet
+
+
+def learn_rules(personas, top=TOP_RULES):
+    """ most frequent rules first: [((before, after, style, leet), count), ...] """
+    rules = Counter()
+    for p in personas:
+        rule = learn_rule(p.get('personal_password', ''), p.get('work_password', ''))
+        if rule is not None:
+            rules[rule] += 1
+    return rules.most_common(top)
+
+
+def parse_years(value):
+    """ '2020-2026' or '2023,2024' -> list of year strings """
+    years = []
+    for part in value.split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            years.extend(str(y) for y in range(int(lo), int(hi) + 1))
+        elif part.strip():
+            years.append(part.strip())
+    return years
+
+
+def expand_rules(rules, years):
+    """ [(style, leet, before, after)] with year slots filled, rule order kept """
+    expanded = []
+    for (before, after, style, leet), _ in rules:
+        if YEAR_SLOT in before or YEAR_SLOT in after:
+            for y in years:
+                expanded.append((style, leet, before.replace(YEAR_SLOT, y), after.replace(YEAR_SLOT, y)))
+        else:
+            expanded.append((style, leet, before, after))
+    return expanded
+
+
+def root_variant(cased, style, leet):
+    if style == "lower":
+        cased = cased.lower()
+    elif style == "upper":
+        cased = cased.upper()
+    elif style == "capitalize":
+        cased = cased[:1].upper() + cased[1:]
+    if leet:
+        table = {}
+        for letter, char in leet:
+            table[letter] = table[letter.upper()] = char
+        cased = cased.translate(str.maketrans(table))
+    return cased
+
+
+def read_bases(path):
+    """ personal passwords: email rows of a credentials CSV, or one per line """
+    bases = []
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                if '@' in row.get('user_id', '') and row.get('password'):
+                    bases.append(row['password'])
+        else:
+            bases = [line.rstrip("\r\n") for line in f if line.strip()]
+    return list(dict.fromkeys(bases))
+
+
+def group_rules(rules, policy):
+    """
+    {(style, leet): [(before, after, need), ...]} in rule order. need[mask]
+    is the shortest root with class bits `mask` that makes the candidate
+    pass the policy (NEVER if none does), so no candidate string has to be
+    checked on its own.
+    """
+    groups = {}
+    for style, leet, before, after in rules:
+        if policy is None:
+            need = (0,) * 16
+        else:
+            frag = policy.fragment(before + after)
+            need = tuple(next((n for n in range(1, policy.min_length + 1)
+                               if policy.check_fragments(frag, (n, mask, True)) is None), NEVER)
+                         for mask in range(16))
+        groups.setdefault((style, leet), []).append((before, after, need))
+    return groups
+
+
+def generate_shard(bases, rules, out_path, check_policy=True, bloom_window=BLOOM_WINDOW):
+    """
+    Expand one shard's bases (sorted by root) into out_path.
+    Returns (generated, written, rejected by policy, duplicates).
+    """
+    policy = study_policy() if check_policy else None
+    blocking = policy is not None and policy.enable_blocklist and (policy.blocklist or policy.external)
+    blocked = policy.blocklist if blocking else frozenset()
+    groups = group_rules(rules, policy)
+    window = max(1, min(len(bases) * len(rules), bloom_window))
+    bloom = FastBloomFilter(window, BLOOM_FP_RATE)
+    generated = written = rejected = dups = 0
+    lines = []
+
+    def flush(out):
+        nonlocal written, dups, bloom
+        if bloom.count and bloom.count + len(lines) > window:
+            bloom = FastBloomFilter(window, BLOOM_FP_RATE)
+        fresh = bloom.add_many_new(lines)
+        dups += len(lines) - len(fresh)
+        if fresh:
+            out.write("\n".join(fresh) + "\n")
+            written += len(fresh)
+        lines.clear()
+
+    with open(out_path, 'w', encoding='utf-8', newline='\n', buffering=1024 * 1024) as out:
+        for base in bases:
+            cased = decompose(base).cased
+            if not cased:
+                continue
+            for key, group in groups.items():
+                text = root_variant(cased, *key)
+                length, mask, ok = policy.fragment(text) if policy is not None else (len(text), 0, True)
+                generated += len(group)
+                if not ok:
+                    rejected += len(group)
+                    continue
+                candidates = [before + text + after for before, after, need in group if length >= need[mask]]
+                if blocking:
+                    candidates = [c for c in candidates if c.lower() not in blocked]
+                    if policy.external:
+                        candidates = [c for c in candidates if not policy.is_blocked(c)]
+                rejected += len(group) - len(candidates)
+                lines.extend(candidates)
+            if len(lines) >= BATCH_SIZE:
+                flush(out)
+        flush(out)
+    return generated, written, rejected, dups
+
+
+def shard_of(root, shards):
+    return zlib.crc32(root.encode('utf-8')) % shards
+
+
+def process_candidates(input_file, output_file=OUTPUT_FILE, rules_from=RULES_SOURCE, top=TOP_RULES,
+                       years=DEFAULT_YEARS, workers=None, check_policy=True, bloom_window=BLOOM_WINDOW):
+    """ main entry: learn rules, expand every base, merge the shards """
+    start = time.perf_counter()
+    rules = learn_rules(load_personas(rules_from), top)
+    if not rules:
+        print(f"❌ No reusable rules found in {rules_from}")
+        return
+    expanded = expand_rules(rules, parse_years(years))
+    bases = read_bases(input_file)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(bases)))
+    print(f"--- {len(rules)} rules ({len(expanded)} with years) from {rules_from}, "
+          f"{len(bases)} base passwords, {workers} worker{'s' if workers > 1 else ''} ---")
+    for (before, after, style, leet), count in rules[:5]:
+        shown = (before + "{root}" + after).replace(YEAR_SLOT, "{year}")
+        print(f"  {count:>4}x {shown} ({style}{', leet ' + ''.join(c for _, c in leet) if leet else ''})")
+
+    shards = [[] for _ in range(workers)]
+    for root, base in sorted((decompose(base).root, base) for base in bases):
+        shards[shard_of(root, workers)].append(base)
+    parts = [f"{output_file}.part{i}" for i in range(workers)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(generate_shard, shards, [expanded] * workers, parts,
+                                    [check_policy] * workers, [bloom_window] * workers))
+    else:
+        results = [generate_shard(shards[0], expanded, parts[0], check_policy, bloom_window)]
+
+    with open(output_file, 'wb') as out:
+        for part in parts:
+            with open(part, 'rb') as f:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+            os.remove(part)
+
+    generated, written, rejected, dups = (sum(col) for col in zip(*results))
+    elapsed = time.perf_counter() - start
+    print(f"Generated: {generated} | Policy rejects: {rejected} | Duplicates: {dups}")
+    print(f"✅ Wrote {written} candidates to {output_file} "
+          f"({generated / elapsed:,.0f} candidates/s, {elapsed:.1f}s)")
+    print(f"   hashcat -a 0 -m <mode> hashes.txt {output_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Expand known personal passwords into likely work passwords.")
+    parser.add_argument("input_file", help="credentials.csv (email rows) or a cracked password list")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help="wordlist to write (default: %(default)s)")
+    parser.add_argument("--rules-from", default=RULES_SOURCE,
+                        help="personas.json / personas.jsonl to learn rules from (default: %(default)s)")
+    parser.add_argument("--top-rules", type=int, default=TOP_RULES,
+                        help="most frequent rules to apply (default: %(default)s)")
+    parser.add_argument("--years", default=DEFAULT_YEARS,
+                        help="years for the {year} slot, e.g. 2020-2026 or 2024,2025 (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes, 1 = serial (default: %(default)s)")
+    parser.add_argument("--no-policy", action="store_true",
+                        help="keep candidates that fail the work password policy")
+    parser.add_argument("--bloom-window", type=int, default=BLOOM_WINDOW,
+                        help="candidates each dedup Bloom filter covers, bounds memory per worker (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        process_candidates(args.input_file, args.output, args.rules_from, args.top_rules,
+                           args.years, args.workers, not args.no_policy, args.bloom_window)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
@@ -7,96 +7,109 @@ enrich the CSV data with the results, and output the combined results
 import os
 import csv
 import sys
-import time
-import hashlib
-import requests
-
-def check_hibp_api(hash_prefix):
-    """Fetch all hash suffixes with retry logic for rate limits."""
-    url = f"https://api.pwnedpasswords.com/range/{hash_prefix}"
-    while True:
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                return response.text
-            if response.status_code == 429:
-                wait_time = int(response.headers.get("Retry-After", 2))
-                print(f"--- Rate limited. Sleeping {wait_time}s... ---")
-                time.sleep(wait_time)
-                continue
-            return None
-        except requests.exceptions.RequestException:
-            return None
-
-def get_pwned_count(password):
+import argparse
+import hibp
+import metrics
+from password_policy import study_policy
+
+def get_pwned_count(password, index=None):
     """Returns the count of times a password was pwned."""
     if not password:
         return 0
-    sha1 = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
-    prefix, suffix = sha1[:5], sha1[5:]
-
-    response_list = check_hibp_api(prefix)
-    if not response_list:
-        return 0
-
-    for line in response_list.splitlines():
-        h, count = line.split(':')
-        if h == suffix:
-            return int(count)
-    return 0
-
-def process_csv(input_file):
+    if index is not None:
+        return index.count_password(password)
+    return hibp.lookup_counts([password], concurrency=1)[0] or 0
+
+def new_totals():
+    """ running counts for the final report """
+    return {"checked": 0, "pwned": 0, "failed": 0, "compliant": 0, "compliant_pwned": 0,
+            "pwned_list": []}
+
+def enrich_rows(rows, counts, compliant, writer, totals, verbose=True):
+    """ write rows with their 'pwned' cell and add them to totals """
+    for row, count, is_compliant in zip(rows, counts, compliant):
+        password = row.get('password', '')
+
+        if count is None:
+            # unknown, not safe: leave the cell empty and keep it out of the rate
+            totals["failed"] += 1
+            row['pwned'] = ""
+            if verbose:
+                print(f"❓ LOOKUP FAILED: {row['user_id']}")
+            writer.writerow(row)
+            continue
+
+        totals["checked"] += 1
+        is_pwned = bool(count)
+        row['pwned'] = is_pwned
+        if is_compliant:
+            totals["compliant"] += 1
+            totals["compliant_pwned"] += is_pwned
+
+        if is_pwned:
+            totals["pwned"] += 1
+            totals["pwned_list"].append(password)
+            if verbose:
+                print(f"⚠️  PWNED: {row['user_id']}")
+        elif verbose:
+            print(f"✅ SAFE: {row['user_id']}")
+
+        writer.writerow(row)
+
+def print_report(totals, input_file, output_file, cache=None):
+    """ final security report """
+    print("\n" + "="*40)
+    print("FINAL SECURITY REPORT")
+    print("="*40)
+    if totals["checked"] > 0:
+        percentage = (totals["pwned"] / totals["checked"]) * 100
+        print(f"Total Passwords Checked: {totals['checked']}")
+        print(f"Pwned Passwords Found:  {totals['pwned']}")
+        print(f"Compromise Rate: {percentage:.2f}%")
+        print(f"Meeting Password Policy: {totals['compliant']} ({totals['compliant_pwned']} of them pwned)")
+
+        if totals["pwned_list"]:
+            print("\nList of Compromised Passwords:")
+            for p in set(totals["pwned_list"]): # Using set to show unique passwords
+                print(f" - {p}")
+    else:
+        print("No data processed.")
+    if totals["failed"]:
+        print(f"⚠️  Lookups failed (not counted, 'pwned' left empty): {totals['failed']}")
+    metrics.event("hibp_report", file=input_file, checked=totals["checked"], pwned=totals["pwned"],
+                  failed=totals["failed"], compliant=totals["compliant"],
+                  compliant_pwned=totals["compliant_pwned"])
+
+    if cache is not None:
+        print(f"Ranges from cache: {cache.hits} | Downloaded/missing: {cache.misses}")
+    print(f"\nResults saved to: {output_file}")
+
+def process_csv(input_file, concurrency=hibp.DEFAULT_CONCURRENCY, cache=None, cache_only=False,
+                index=None):
     """ main loop to process the input file """
     output_file = f"checked_{input_file}"
-    pwned_list = []
-    total_count = 0
-    pwned_count = 0
+    totals = new_totals()
 
     try:
         with open(input_file, mode='r', encoding='utf-8') as infile:
             reader = csv.DictReader(infile)
             fieldnames = reader.fieldnames + ['pwned']
+            rows = list(reader)
+
+        # One request per distinct hash prefix, results come back in row order
+        passwords = [row.get('password', '') for row in rows]
+        with metrics.timer("hibp_lookup_seconds"):
+            counts = hibp.lookup_counts(passwords, concurrency,
+                                        cache=cache, cache_only=cache_only, index=index)
+        # the generator's work password rules, to see how many compliant passwords are pwned anyway
+        compliant = [reason is None for reason in study_policy().validate_many(passwords)]
 
-            with open(output_file, mode='w', encoding='utf-8', newline='') as outfile:
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-                writer.writeheader()
-
-                for row in reader:
-                    total_count += 1
-                    password = row.get('password', '')
-                    count = get_pwned_count(password)
-
-                    is_pwned = count > 0
-                    row['pwned'] = is_pwned
-
-                    if is_pwned:
-                        pwned_count += 1
-                        pwned_list.append(password)
-                        print(f"⚠️  PWNED: {row['user_id']}")
-                    else:
-                        print(f"✅ SAFE: {row['user_id']}")
-
-                    writer.writerow(row)
-                    time.sleep(0.2) # Rate limit precaution
-
-        # Final Report
-        print("\n" + "="*40)
-        print("FINAL SECURITY REPORT")
-        print("="*40)
-        if total_count > 0:
-            percentage = (pwned_count / total_count) * 100
-            print(f"Total Passwords Checked: {total_count}")
-            print(f"Pwned Passwords Found:  {pwned_count}")
-            print(f"Compromise Rate: {percentage:.2f}%")
-
-            if pwned_list:
-                print("\nList of Compromised Passwords:")
-                for p in set(pwned_list): # Using set to show unique passwords
-                    print(f" - {p}")
-        else:
-            print("No data processed.")
-
-        print(f"\nResults saved to: {output_file}")
+        with open(output_file, mode='w', encoding='utf-8', newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            enrich_rows(rows, counts, compliant, writer, totals)
+
+        print_report(totals, input_file, output_file, cache)
 
     except FileNotFoundError:
         print(f"Error: File '{input_file}' not found.")
@@ -104,8 +117,15 @@ def process_csv(input_file):
         print(f"An error occurred: {e}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: python {os.path.basename(sys.argv[0])} <credentials.csv>")
-        sys.exit(1)
-
-    process_csv(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Enrich a credentials CSV with HIBP pwned status.")
+    parser.add_argument("input_file", help="credentials.csv")
+    hibp.add_cli_options(parser)
+    metrics.add_cli_options(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+    range_cache = hibp.open_cache(args)
+    pwned_index = hibp.open_index(args)
+
+    process_csv(args.input_file, args.concurrency, range_cache, args.cache_only, pwned_index)
@@ -2,56 +2,45 @@
 """ Check the provided password list text file against HIBP"""
 import os
 import sys
-import time
-import hashlib
-import requests
+import argparse
+import hibp
+import metrics
 
-def check_hibp_api(hash_prefix):
-    """Fetch all hash suffixes with retry logic for rate limits."""
-    url = f"https://api.pwnedpasswords.com/range/{hash_prefix}"
-
-    while True:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            return response.text
-        if response.status_code == 429:
-            # Look for 'Retry-After' header, default to 2 seconds if not found
-            wait_time = int(response.headers.get("Retry-After", 2))
-            print(f"--- Rate limited. Sleeping for {wait_time} seconds... ---")
-            time.sleep(wait_time)
-            continue # Try the request again after sleeping
-        raise RuntimeError(f"Error fetching: {response.status_code}")
-
-def get_password_leaks_count(hashes, hash_to_check):
-    """Check if our specific hash suffix is in the returned list."""
-    hashes = (line.split(':') for line in hashes.splitlines())
-    for h, count in hashes:
-        if h == hash_to_check:
-            return int(count)
-    return 0
-
-def pwned_api_check(password):
+def pwned_api_check(password, index=None):
     """Full check logic: hash, prefix, query, and match."""
-    sha1password = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
-    prefix, suffix = sha1password[:5], sha1password[5:]
-    response_list = check_hibp_api(prefix)
-    return get_password_leaks_count(response_list, suffix)
+    if index is not None:
+        return index.count_password(password)
+    count = hibp.lookup_counts([password], concurrency=1)[0]
+    if count is None:
+        raise RuntimeError("Error fetching range from HIBP")
+    return count
 
-def main(file_path):
+def main(file_path, concurrency=hibp.DEFAULT_CONCURRENCY, cache=None, cache_only=False, index=None):
     """Main loop"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                password = line.strip()
-                if not password:
-                    continue
-                count = pwned_api_check(password)
-                if count:
-                    print(f"⚠️  '{password}' was found {count} times.")
-                else:
-                    print(f"✅ '{password}' was NOT found.")
-                # Small preventive delay to avoid hitting the limit constantly
-                time.sleep(0.2)
+            passwords = [line.strip() for line in f if line.strip()]
+
+        # Each distinct hash prefix is fetched once, concurrently
+        with metrics.timer("hibp_lookup_seconds"):
+            counts = hibp.lookup_counts(passwords, concurrency, cache=cache, cache_only=cache_only,
+                                        index=index)
+        found = failed = 0
+        for password, count in zip(passwords, counts):
+            if count is None:
+                failed += 1
+                print(f"❓ '{password}' could not be checked.")
+            elif count:
+                found += 1
+                print(f"⚠️  '{password}' was found {count} times.")
+            else:
+                print(f"✅ '{password}' was NOT found.")
+
+        checked = len(passwords) - failed
+        print(f"\nChecked: {checked} | Found: {found} | Not found: {checked - found}")
+        if failed:
+            print(f"⚠️  Lookups failed (not counted): {failed}")
+        metrics.event("hibp_report", file=file_path, checked=checked, pwned=found, failed=failed)
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found.")
     except Exception as e:
@@ -61,14 +50,20 @@ if __name__ == "__main__":
     # Get the script name (like $0 in shell)
     script_name = os.path.basename(sys.argv[0])
 
-    if len(sys.argv) == 2:
-        target_file = sys.argv[1]
-        # Verify the file exists before starting
-        if os.path.isfile(target_file):
-            main(target_file)
-        else:
-            print(f"Error: The file '{target_file}' does not exist.")
-            sys.exit(1)
+    parser = argparse.ArgumentParser(
+        prog=script_name,
+        description="Check a password list (one per line) against HIBP.")
+    parser.add_argument("password_file", help="password_file.txt")
+    hibp.add_cli_options(parser)
+    metrics.add_cli_options(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+    range_cache = hibp.open_cache(args)
+    pwned_index = hibp.open_index(args)
+
+    # Verify the file exists before starting
+    if os.path.isfile(args.password_file):
+        main(args.password_file, args.concurrency, range_cache, args.cache_only, pwned_index)
     else:
-        print(f"Usage: python {script_name} <password_file.txt>")
+        print(f"Error: The file '{args.password_file}' does not exist.")
         sys.exit(1)
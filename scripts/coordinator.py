@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Sharded generation: one coordinator, any number of workers.
+
+The coordinator owns everything run_study keeps in memory (seen_ids, the
+password registries, the near-duplicate index and the batch controller's
+sector schedule) plus the personas.jsonl store. Workers are other
+processes or hosts, each with its own API key or model. They lease a
+request (sector, count, prompt) from the coordinator, call their model,
+parse the reply and submit the personas back. The coordinator validates
+and dedups each submission under one lock and appends what it accepts,
+so workers never touch the store and never race on dedup.
+
+JSON over HTTP:
+  POST /lease  {"worker"}                      -> {"lease", "sector", "count", "prompt"} or {"done": true}
+  POST /submit {"lease", "personas", "tokens"} -> {"accepted", "generated", "total", "target", "done"}
+  GET  /status                                 -> progress and per worker totals
+A submit is answered once per lease and replayed on retries until the
+worker leases again. Leases not submitted within LEASE_SECONDS expire.
+
+Usage: python coordinator.py serve [sector] [--port 8765] [--target N] [--fake-workers N]
+       python coordinator.py worker http://host:8765 [--api-key KEY] [--model NAME] [--fake]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import itertools
+import threading
+import subprocess
+from types import SimpleNamespace
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import password_generator as pg
+import metrics
+from rate_limit import is_quota_error
+
+DEFAULT_PORT = 8765
+LEASE_SECONDS = 300      # a lease not submitted by then expires
+SHUTDOWN_GRACE = 10      # seconds to let in-flight workers hear "done"
+CALL_RETRIES = 5         # worker: attempts per coordinator call before giving up
+MAX_ERRORS = 5           # worker: model errors per request (quota aside) before giving up
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 120.0
+
+
+class Coordinator:
+    """ shared dedup state and the store; every lease / submit holds the lock """
+    def __init__(self, target_sector_override=None):
+        self.sector_override = target_sector_override
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.store, self.seen_ids = pg.load_existing()
+        self.rotation = itertools.count(pg.stats["accepted"] // pg.CHUNK_SIZE)
+        self.leases = {}                    # lease id -> (worker, sector, count, issued)
+        self.replies = {}                   # lease id -> (worker, submit reply, answered), for retries
+        self.workers = defaultdict(Counter)
+        if pg.stats["accepted"] >= pg.TARGET_COUNT:
+            self.done.set()
+
+    def prune(self, worker):
+        """ drop expired leases and the replies a worker has seen; caller holds the lock """
+        now = time.monotonic()
+        for lease_id, (_, _, _, issued) in list(self.leases.items()):
+            if now - issued >= LEASE_SECONDS:
+                del self.leases[lease_id]
+                metrics.inc("leases_expired_total")
+        # a worker leases again only after its last submit was answered
+        for lease_id, (owner, _, answered) in list(self.replies.items()):
+            if owner == worker or now - answered >= LEASE_SECONDS:
+                del self.replies[lease_id]
+
+    def lease(self, worker):
+        with self.lock:
+            self.prune(worker)
+            if self.done.is_set():
+                return {"done": True}
+            sector, count, prompt = pg.plan_request(self.sector_override, self.rotation)
+            lease_id = uuid.uuid4().hex[:12]
+            self.leases[lease_id] = (worker, sector, count, time.monotonic())
+            self.workers[worker]["leases"] += 1
+        metrics.inc("leases_total", worker=worker)
+        return {"lease": lease_id, "sector": sector, "count": count, "prompt": prompt}
+
+    def submit(self, lease_id, personas, tokens=0):
+        """ accept / reject one leased batch atomically """
+        with self.lock:
+            self.prune(None)
+            if lease_id in self.replies:
+                return self.replies[lease_id][1]
+            lease = self.leases.pop(lease_id, None)
+            if lease is None:
+                return {"error": f"unknown or expired lease {lease_id}"}
+            worker, sector, count, _ = lease
+            batch = [p for p in personas if isinstance(p, dict)]
+            valid_batch = []
+            if not self.done.is_set():
+                valid_batch = pg.accept_batch(batch, sector, self.seen_ids,
+                                              limit=pg.TARGET_COUNT - pg.stats["accepted"])
+            usage = SimpleNamespace(usage_metadata=SimpleNamespace(total_token_count=tokens))
+            pg.record_batch(sector, count, batch, valid_batch, usage)
+            pg.save_batch(self.store, valid_batch)
+            totals = self.workers[worker]
+            totals["batches"] += 1
+            totals["generated"] += len(batch)
+            totals["accepted"] += len(valid_batch)
+            totals["tokens"] += tokens
+            if pg.stats["accepted"] >= pg.TARGET_COUNT:
+                self.done.set()
+            reply = {"accepted": len(valid_batch), "generated": len(batch),
+                     "total": pg.stats["accepted"], "target": pg.TARGET_COUNT,
+                     "done": self.done.is_set()}
+            self.replies[lease_id] = (worker, reply, time.monotonic())
+            pg.print_progress(sector)
+            print(f"  [WORKER]     {worker}: {totals['accepted']} accepted in {totals['batches']} batches")
+        metrics.inc("worker_accepted_total", len(valid_batch), worker=worker)
+        return reply
+
+    def active_leases(self):
+        """ leases handed out in the last LEASE_SECONDS and not yet submitted """
+        with self.lock:
+            self.prune(None)
+            return len(self.leases)
+
+    def status(self):
+        with self.lock:
+            return {"accepted": pg.stats["accepted"], "target": pg.TARGET_COUNT,
+                    "done": self.done.is_set(), "leases": len(self.leases),
+                    "workers": {name: dict(totals) for name, totals in self.workers.items()}}
+
+
+def make_handler(coordinator):
+    """ build a request handler class bound to one coordinator """
+    class CoordinatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path != "/status":
+                self.send_error(404)
+                return
+            self.reply(200, coordinator.status())
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self.reply(400, {"error": "request body is not JSON"})
+                return
+            if self.path == "/lease":
+                self.reply(200, coordinator.lease(str(body.get("worker") or self.client_address[0])))
+            elif self.path == "/submit":
+                personas = body.get("personas")
+                reply = coordinator.submit(body.get("lease"), personas if isinstance(personas, list) else [],
+                                           int(body.get("tokens") or 0))
+                self.reply(404 if "error" in reply else 200, reply)
+            else:
+                self.send_error(404)
+
+        def reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return CoordinatorHandler
+
+
+def serve(coordinator, host="127.0.0.1", port=DEFAULT_PORT):
+    """Start the coordinator in a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(coordinator))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    shown = socket.gethostname() if host in ("0.0.0.0", "") else host
+    return server, f"http://{shown}:{server.server_address[1]}"
+
+
+def spawn_fake_workers(url, count, latency):
+    """ local worker processes on the fake model, for testing and benchmarks """
+    script = os.path.abspath(__file__)
+    return [subprocess.Popen([sys.executable, script, "worker", url, "--fake",
+                              "--fake-latency", str(latency), "--name", f"fake-{i + 1}"])
+            for i in range(count)]
+
+
+def run_coordinator(target_sector_override=None, host="127.0.0.1", port=DEFAULT_PORT,
+                    fake_workers=0, fake_latency=0.5):
+    """ serve leases until TARGET_COUNT personas are accepted, then export """
+    coordinator = Coordinator(target_sector_override)
+    server, url = serve(coordinator, host, port)
+    print(f"--- Coordinator on {url}: {pg.stats['accepted']}/{pg.TARGET_COUNT} accepted, "
+          f"waiting for workers ---")
+    start = time.perf_counter()
+    procs = spawn_fake_workers(url, fake_workers, fake_latency) if fake_workers else []
+    try:
+        while not coordinator.done.wait(1):
+            pass
+        # let workers with a request in flight hear "done" before the port closes
+        deadline = time.monotonic() + SHUTDOWN_GRACE
+        while coordinator.active_leases() and time.monotonic() < deadline:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        print("\n--- Interrupted, stopping the coordinator ---")
+    finally:
+        server.shutdown()
+        for proc in procs:
+            try:
+                proc.wait(timeout=SHUTDOWN_GRACE)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+        pg.export_legacy(coordinator.store)
+
+    elapsed = time.perf_counter() - start
+    print(f"--- {pg.stats['accepted']}/{pg.TARGET_COUNT} accepted in {elapsed:.1f}s "
+          f"from {len(coordinator.workers)} workers ---")
+    for name, totals in sorted(coordinator.workers.items()):
+        print(f"  {name}: {totals['accepted']}/{totals['generated']} accepted, "
+              f"{totals['batches']} batches, {totals['tokens']} tokens")
+
+
+# --- worker ---
+def call(session, url, endpoint, payload):
+    """ POST to the coordinator; None once it stays unreachable (it shut down) """
+    import requests  # pylint: disable=import-outside-toplevel
+    for attempt in range(CALL_RETRIES):
+        try:
+            response = session.post(f"{url}/{endpoint}", json=payload, timeout=60)
+            return response.json()
+        except (requests.ConnectionError, requests.Timeout):
+            time.sleep(1 + attempt)
+    return None
+
+
+def generate(model_client, model, prompt):
+    """ call the model until it answers; quota errors back off exponentially,
+    the MAX_ERRORS-th other error is re-raised """
+    attempt = errors = 0
+    while True:
+        try:
+            with metrics.timer("llm_request_seconds", mode="worker"):
+                return model_client.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=pg.generation_config()
+                )
+        except Exception as e:
+            if is_quota_error(e):
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                attempt += 1
+                metrics.inc("llm_errors_total", kind="quota")
+                metrics.inc("sleep_seconds_total", delay, reason="quota_backoff")
+                print(f"--- Quota exceeded. Backing off {delay:.1f}s... ---")
+            else:
+                errors += 1
+                metrics.inc("llm_errors_total", kind="other")
+                if errors >= MAX_ERRORS:
+                    raise
+                delay = 2
+                print(f"❌ API Error: {e}")
+                metrics.inc("sleep_seconds_total", delay, reason="error")
+            time.sleep(delay)
+
+
+def run_worker(url, name, model_client, model=pg.MODEL):
+    """ lease, generate, parse and submit until the coordinator is done; False if the model kept failing """
+    # only workers talk HTTP, so serve starts without importing requests
+    import requests  # pylint: disable=import-outside-toplevel
+    url = url.rstrip("/")
+    session = requests.Session()
+    batches = accepted = 0
+    while True:
+        lease = call(session, url, "lease", {"worker": name})
+        if lease is None:
+            print(f"⚠️  [{name}] coordinator at {url} is unreachable, stopping")
+            break
+        if lease.get("done"):
+            break
+        try:
+            response = generate(model_client, model, lease["prompt"])
+        except Exception as e:
+            # the lease expires on the coordinator, another worker picks up the slack
+            print(f"❌ [{name}] {MAX_ERRORS} API errors on one request, stopping after "
+                  f"{accepted} personas in {batches} batches: {e}")
+            return False
+        try:
+            personas = pg.parse_batch(response)
+        except Exception as e:
+            print(f"❌ [{name}] Parse Error: {e}")
+            personas = []
+        if not isinstance(personas, list):
+            personas = []
+        reply = call(session, url, "submit", {"lease": lease["lease"], "personas": personas,
+                                              "tokens": pg.usage_tokens(response)})
+        if reply is None:
+            print(f"⚠️  [{name}] coordinator at {url} is unreachable, stopping")
+            break
+        if "error" in reply:
+            print(f"⚠️  [{name}] {reply['error']}")
+            continue
+        batches += 1
+        accepted += reply["accepted"]
+        print(f"[{name}] {lease['sector']}: {reply['accepted']}/{reply['generated']} accepted, "
+              f"{reply['total']}/{reply['target']} in total")
+        if reply["done"]:
+            break
+    print(f"✅ [{name}] {accepted} personas accepted in {batches} batches")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Coordinator / worker persona generation sharing one dedup state.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    srv = sub.add_parser("serve", help="own the store and dedup state, hand out leases")
+    srv.add_argument("sector", nargs="?", help="study this sector exclusively (default: rotate SECTORS)")
+    srv.add_argument("--host", default="127.0.0.1", help="listen address, 0.0.0.0 for remote workers (default: %(default)s)")
+    srv.add_argument("--port", type=int, default=DEFAULT_PORT, help="listen port (default: %(default)s)")
+    srv.add_argument("--target", type=int, default=pg.TARGET_COUNT, help="personas to collect (default: %(default)s)")
+    srv.add_argument("--fake-workers", type=int, default=0, metavar="N",
+                     help="also start N local workers on the fake model")
+    srv.add_argument("--fake-latency", type=float, default=0.5,
+                     help="mean fake response time in seconds (default: %(default)s)")
+    metrics.add_cli_options(srv)
+
+    wrk = sub.add_parser("worker", help="generate batches for a coordinator")
+    wrk.add_argument("url", help="coordinator URL, e.g. http://127.0.0.1:8765")
+    wrk.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}",
+                     help="worker name in the coordinator's totals (default: host-pid)")
+    wrk.add_argument("--api-key", help="API key for this worker (default: config.API_KEY)")
+    wrk.add_argument("--model", default=pg.MODEL, help="model to call (default: %(default)s)")
+    wrk.add_argument("--fake", action="store_true", help="use the offline fake model client (fake_model.py)")
+    wrk.add_argument("--fake-latency", type=float, default=0.5,
+                     help="mean fake response time in seconds (default: %(default)s)")
+    metrics.add_cli_options(wrk)
+    args = parser.parse_args()
+    metrics.configure(args)
+
+    try:
+        if args.command == "serve":
+            pg.TARGET_COUNT = args.target
+            run_coordinator(args.sector, args.host, args.port, args.fake_workers, args.fake_latency)
+        else:
+            if args.fake:
+                from fake_model import FakeClient
+                model_client = FakeClient(latency=args.fake_latency)
+            elif args.api_key:
+                model_client = pg.make_client(args.api_key)
+            else:
+                model_client = pg.client
+            if not run_worker(args.url, args.name, model_client, args.model):
+                sys.exit(1)
+    except KeyboardInterrupt:
+        pass
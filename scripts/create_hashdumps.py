@@ -1,81 +1,313 @@
 #!/usr/bin/env python3
 """
 Generate shadow, pwdump, and raw hash files from an input CSV.
-Required: pip install passlib
+Required: pip install passlib (bcrypt format: pip install bcrypt)
+
+Rows are hashed and streamed straight into buffered per-format writers.
+A checkpoint is committed every few thousand rows, so an interrupted run
+picks up where it left off instead of starting over.
 """
 import os
 import csv
 import sys
+import json
+import random
+import time
 import hashlib
-from passlib.hash import sha512_crypt, nthash
+import argparse
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import metrics
+
+CHUNK_SIZE = 64
+CHECKPOINT_EVERY = 2048
+CHECKPOINT_FILE = "hashdumps.checkpoint"
+WRITE_BUFFER = 1024 * 1024
+START_UID = 1001
+DEFAULT_FORMATS = ["shadow", "pwdump", "md5", "sha1", "sha256"]
+CRYPT_SALT_CHARS = "./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+YESCRYPT_UNSUPPORTED = ("yescrypt is not supported here: it needs the stdlib crypt module "
+                        "(Python < 3.13) backed by a libxcrypt system crypt")
+
+BCRYPT_DEFAULT_ROUNDS = 12
+LM_EMPTY = "aad3b435b51404eeaad3b435b51404ee"   # LM hash of an empty password
+
+# passlib handlers, imported by load_passlib() on first use; passlib alone
+# takes longer to import than the rest of an offline run's startup
+sha512_crypt = nthash = None
+
+# crypt settings used by the current process, replaced by configure_hashers()
+shadow_rounds_setting = None
+shadow_hasher = None    # built from shadow_rounds_setting on first use
+bcrypt_rounds_setting = BCRYPT_DEFAULT_ROUNDS
+
+def load_passlib():
+    """ (sha512_crypt, nthash) from passlib.hash, imported once """
+    global sha512_crypt, nthash
+    if nthash is None:
+        from passlib.hash import sha512_crypt, nthash  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    return sha512_crypt, nthash
+
+def configure_hashers(rounds=None, bcrypt_rounds=None):
+    """Select the crypt costs (library defaults when None)."""
+    global shadow_rounds_setting, shadow_hasher, bcrypt_rounds_setting
+    shadow_rounds_setting = rounds
+    shadow_hasher = None
+    bcrypt_rounds_setting = bcrypt_rounds or BCRYPT_DEFAULT_ROUNDS
 
 def generate_shadow_line(user, password):
     """Create example Linux shadow file line using SHA-512 crypt."""
+    global shadow_hasher
+    if shadow_hasher is None:
+        crypt_handler = load_passlib()[0]
+        shadow_hasher = crypt_handler.using(rounds=shadow_rounds_setting) if shadow_rounds_setting else crypt_handler
     # Standard $6$ (SHA-512) hash
-    shadow_hash = sha512_crypt.hash(password)
+    shadow_hash = shadow_hasher.hash(password)
     return f"{user.split('@')[0].lower()}:{shadow_hash}:20386:0:99999:7:::"
 
+def yescrypt_hash(password):
+    """ $y$ hash from the system libxcrypt via the stdlib crypt module, None if unsupported """
+    # passlib has no yescrypt; crypt is deprecated in 3.11 and gone in 3.13
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            import crypt  # pylint: disable=import-outside-toplevel,deprecated-module
+    except ImportError:
+        return None
+    salt = "$y$j9T$" + "".join(random.SystemRandom().choices(CRYPT_SALT_CHARS, k=22))
+    hashed = crypt.crypt(password, salt)
+    return hashed if hashed and hashed.startswith("$y$") else None
+
+def yescrypt_supported():
+    return yescrypt_hash("probe") is not None
+
+def generate_yescrypt_line(user, password):
+    """Create example Ubuntu 22.04+ shadow line using yescrypt ($y$)."""
+    hashed = yescrypt_hash(password)
+    if hashed is None:
+        raise RuntimeError(YESCRYPT_UNSUPPORTED)
+    return f"{user.split('@')[0].lower()}:{hashed}:20386:0:99999:7:::"
+
+def generate_bcrypt_hash(password):
+    """Create a $2b$ bcrypt hash (hashcat mode 3200)."""
+    # the bcrypt package directly, passlib's wrapper breaks on bcrypt >= 4.1
+    import bcrypt  # pylint: disable=import-outside-toplevel
+    # bcrypt only ever looks at the first 72 bytes
+    salt = bcrypt.gensalt(rounds=bcrypt_rounds_setting)
+    return bcrypt.hashpw(password.encode('utf-8')[:72], salt).decode('ascii')
+
 def generate_pwdump_line(user, password, uid):
     """Create example Windows PWDUMP (NTLM) line."""
-    ntlm = nthash.hash(password).upper()
-    lm_empty = "aad3b435b51404eeaad3b435b51404ee"
-    return f"{user}:{uid}:{lm_empty}:{ntlm}:::"
+    ntlm = (nthash or load_passlib()[1]).hash(password).upper()
+    return f"{user}:{uid}:{LM_EMPTY}:{ntlm}:::"
 
-def process_credentials(input_file):
-    """ main loop to process credentials """
-    shadow_output = []
-    pwdump_output = []
-    md5_list = []
-    sha1_list = []
-    sha256_list = []
+# format name -> (output file, line generator taking user, password, uid)
+FORMATS = {
+    "shadow": ("shadow.txt", lambda user, pw, uid: generate_shadow_line(user, pw)),
+    "pwdump": ("pwdump.txt", generate_pwdump_line),
+    "md5": ("md5.txt", lambda user, pw, uid: hashlib.md5(pw.encode()).hexdigest()),
+    "sha1": ("sha1.txt", lambda user, pw, uid: hashlib.sha1(pw.encode()).hexdigest()),
+    "sha256": ("sha256.txt", lambda user, pw, uid: hashlib.sha256(pw.encode()).hexdigest()),
+    "bcrypt": ("bcrypt.txt", lambda user, pw, uid: generate_bcrypt_hash(pw)),
+    "yescrypt": ("yescrypt.txt", lambda user, pw, uid: generate_yescrypt_line(user, pw)),
+}
 
-    start_uid = 1001
+def init_worker(rounds, bcrypt_rounds):
+    """ process pool initializer """
+    configure_hashers(rounds, bcrypt_rounds)
+
+def hash_chunk(formats, items):
+    """
+    Encoded output lines per format for a chunk of (user, password, uid)
+    rows, plus the seconds spent hashing each format.
+    """
+    out, seconds = {}, {}
+    for name in formats:
+        start = time.perf_counter()
+        generate = FORMATS[name][1]
+        out[name] = "".join(generate(user, password, uid) + "\n"
+                            for user, password, uid in items).encode('utf-8')
+        seconds[name] = time.perf_counter() - start
+    return out, seconds
+
+def read_chunks(reader, skip_rows=0):
+    """
+    Yields (rows consumed so far, [(user, password, uid), ...]) every
+    CHUNK_SIZE CSV rows. UIDs come from the CSV row number, as before.
+    """
+    items = []
+    i = -1
+    for i, row in enumerate(reader):
+        if i < skip_rows:
+            continue
+        user = row.get('user_id', f'user_{i}')
+        password = row.get('password', '')
+
+        if password:
+            items.append((user, password, START_UID + i))
+        if (i + 1) % CHUNK_SIZE == 0:
+            yield i + 1, items
+            items = []
+    if i + 1 > skip_rows and (items or (i + 1) % CHUNK_SIZE):
+        yield i + 1, items
+
+def ordered_results(pool, formats, chunks, window):
+    """
+    Hash chunks in the pool with at most `window` in flight, yielding
+    results strictly in input order (bounded memory, stable line order).
+    """
+    if pool is None:
+        for rows_done, items in chunks:
+            yield rows_done, len(items), hash_chunk(formats, items)
+        return
+    pending = deque()
+    for rows_done, items in chunks:
+        pending.append((rows_done, len(items), pool.submit(hash_chunk, formats, items)))
+        if len(pending) >= window:
+            done, n, future = pending.popleft()
+            yield done, n, future.result()
+    while pending:
+        done, n, future = pending.popleft()
+        yield done, n, future.result()
+
+def load_checkpoint(input_file, formats, settings):
+    """ checkpoint dict if it belongs to this exact job, else None """
+    if not os.path.exists(CHECKPOINT_FILE):
+        return None
+    with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if (state.get("input") != os.path.abspath(input_file)
+            or state.get("formats") != formats or state.get("settings") != settings):
+        print(f"⚠️  Ignoring {CHECKPOINT_FILE}: it belongs to a different job")
+        return None
+    for name, offset in state["offsets"].items():
+        filename = FORMATS[name][0]
+        if not os.path.exists(filename) or os.path.getsize(filename) < offset:
+            print(f"⚠️  Ignoring {CHECKPOINT_FILE}: {filename} is missing or shorter than recorded")
+            return None
+    return state
+
+def save_checkpoint(state, writers):
+    """ flush + fsync every writer, then atomically record how far we got """
+    for name, f in writers.items():
+        f.flush()
+        os.fsync(f.fileno())
+        state["offsets"][name] = f.tell()
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CHECKPOINT_FILE)
+
+def process_credentials(input_file, workers=None, rounds=None, formats=None,
+                        bcrypt_rounds=None, resume=True):
+    """ main loop to process credentials """
+    formats = list(formats or DEFAULT_FORMATS)
+    workers = workers or os.cpu_count() or 1
+    settings = {"rounds": rounds, "bcrypt_rounds": bcrypt_rounds}
+    configure_hashers(rounds, bcrypt_rounds)
+    state = {}
 
     try:
+        state = load_checkpoint(input_file, formats, settings) if resume else None
+        if state is None:
+            state = {"input": os.path.abspath(input_file), "formats": formats,
+                     "settings": settings, "rows_done": 0, "entries": 0,
+                     "offsets": {name: 0 for name in formats}}
+        else:
+            print(f"--- Resuming after row {state['rows_done']} ({state['entries']} entries) ---")
+
+        writers = {}
+        pool = None
+        # open the input before touching any output, so a bad path leaves them alone
         with open(input_file, mode='r', encoding='utf-8') as f:
-            # Using DictReader to handle the quoted CSV format
-            reader = csv.DictReader(f)
-
-            print(f"--- Processing {input_file} ---")
-            for i, row in enumerate(reader):
-                user = row.get('user_id', f'user_{i}')
-                password = row.get('password', '')
-
-                if not password:
-                    continue
-
-                # Generate the various formats
-                shadow_output.append(generate_shadow_line(user, password))
-                pwdump_output.append(generate_pwdump_line(user, password, start_uid + i))
-
-                # Raw hashes
-                encoded_pw = password.encode()
-                md5_list.append(hashlib.md5(encoded_pw).hexdigest())
-                sha1_list.append(hashlib.sha1(encoded_pw).hexdigest())
-                sha256_list.append(hashlib.sha256(encoded_pw).hexdigest())
-
-        # Write to files
-        files_to_write = {
-            "shadow.txt": shadow_output,
-            "pwdump.txt": pwdump_output,
-            "md5.txt": md5_list,
-            "sha1.txt": sha1_list,
-            "sha256.txt": sha256_list
-        }
-
-        for filename, content in files_to_write.items():
-            with open(filename, "w", encoding="utf-8") as out_f:
-                out_f.write("\n".join(content) + "\n")
-            print(f"✅ Created {filename} ({len(content)} entries)")
+            try:
+                for name in formats:
+                    out = open(FORMATS[name][0], "ab" if state["rows_done"] else "wb",
+                               buffering=WRITE_BUFFER)
+                    # drop anything written after the last committed checkpoint
+                    out.truncate(state["offsets"][name])
+                    out.seek(state["offsets"][name])
+                    writers[name] = out
+
+                # Using DictReader to handle the quoted CSV format
+                reader = csv.DictReader(f)
+
+                print(f"--- Processing {input_file} → {', '.join(formats)} "
+                      f"({workers} worker{'s' if workers > 1 else ''}) ---")
+                if workers > 1:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                               initargs=(rounds, bcrypt_rounds))
+                chunks = read_chunks(reader, state["rows_done"])
+                last_commit = state["rows_done"]
+                for rows_done, n, (lines, seconds) in ordered_results(pool, formats, chunks, workers * 4):
+                    for name, data in lines.items():
+                        writers[name].write(data)
+                        metrics.inc("hash_seconds_total", seconds[name], format=name)
+                        metrics.inc("hash_entries_total", n, format=name)
+                    state["rows_done"] = rows_done
+                    state["entries"] += n
+                    if rows_done - last_commit >= CHECKPOINT_EVERY:
+                        with metrics.timer("hashdump_checkpoint_seconds"):
+                            save_checkpoint(state, writers)
+                        last_commit = rows_done
+            finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+                for w in writers.values():
+                    w.close()
+
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+        for name in formats:
+            print(f"✅ Created {FORMATS[name][0]} ({state['entries']} entries)")
+            metrics.event("hashdump", format=name, file=FORMATS[name][0], entries=state['entries'])
 
     except FileNotFoundError:
         print(f"Error: '{input_file}' not found.")
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Progress is checkpointed in {CHECKPOINT_FILE}, re-run to resume.")
     except Exception as e:
         print(f"An error occurred: {e}")
+        if state.get("rows_done"):
+            print(f"Progress is checkpointed in {CHECKPOINT_FILE}, re-run to resume.")
+
+def parse_formats(value):
+    """ argparse type for --formats shadow,md5 / all """
+    if value == "all":
+        # every format this system can produce
+        return [n for n in FORMATS if n != "yescrypt" or yescrypt_supported()]
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [n for n in names if n not in FORMATS]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown format(s) {', '.join(unknown) or value!r}; choose from {', '.join(FORMATS)} or all")
+    if "yescrypt" in names and not yescrypt_supported():
+        raise argparse.ArgumentTypeError(YESCRYPT_UNSUPPORTED)
+    return names
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: python {os.path.basename(sys.argv[0])} <credentials.csv>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Generate shadow, pwdump and raw hash files from a credentials CSV.")
+    parser.add_argument("input_file", help="credentials.csv")
+    parser.add_argument("--formats", type=parse_formats, default=DEFAULT_FORMATS,
+                        help=f"comma separated subset of {', '.join(FORMATS)}, or all "
+                             f"(default: {','.join(DEFAULT_FORMATS)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="hashing processes, 1 = serial (default: %(default)s)")
+    parser.add_argument("--rounds", type=int,
+                        help="SHA-512 crypt rounds for shadow.txt (default: passlib's 656000); "
+                             "lower values trade realism for throughput")
+    parser.add_argument("--bcrypt-rounds", type=int,
+                        help=f"bcrypt log2 cost for bcrypt.txt (default: {BCRYPT_DEFAULT_ROUNDS})")
+    parser.add_argument("--restart", action="store_true",
+                        help=f"ignore {CHECKPOINT_FILE} and start from the first row")
+    metrics.add_cli_options(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
 
-    process_credentials(sys.argv[1])
+    process_credentials(args.input_file, args.workers, args.rounds, args.formats,
+                        args.bcrypt_rounds, resume=not args.restart)
@@ -0,0 +1,183 @@
+"""
+Offline stand-in for google-genai's Client, for benchmarking the generator
+without network access or quota. It answers get_prompt() style prompts with
+a JSON list of personas drawn from small name/hobby pools, so duplicates
+show up the way they do with the real model as the run grows.
+Supports client.models.generate_content / generate_content_stream and their
+client.aio.models counterparts; streamed replies arrive in STREAM_CHUNK_CHARS
+pieces spread over the drawn latency, with the usage on the last chunk.
+"""
+import re
+import json
+import time
+import random
+from types import SimpleNamespace
+
+FIRST_NAMES = [
+    "Anya", "Kenji", "Maria", "David", "Fatima", "Lars", "Chloe", "Mateo", "Priya", "Omar",
+    "Ingrid", "Wei", "Amara", "Jonas", "Sofia", "Ravi", "Elena", "Kwame", "Yuki", "Liam",
+    "Aisha", "Diego", "Hana", "Olu", "Nadia", "Tomas", "Mei", "Samir", "Zara", "Felix",
+]
+LAST_NAMES = [
+    "Sharma", "Tanaka", "Garcia", "Smith", "Khan", "Nilsen", "Dubois", "Rossi", "Patel", "Haddad",
+    "Berg", "Chen", "Okafor", "Weber", "Costa", "Iyer", "Petrova", "Mensah", "Sato", "Murphy",
+]
+HOBBIES = [
+    "desertrose", "travelbug", "bookworm", "dragonfly", "footballfan", "golfswing", "techgeek",
+    "mydogleo", "soccerfanatics", "balletdancer", "familyfirst", "coffeelover", "surfsup",
+    "mountainhike", "pizzalover", "chessmaster", "gardenqueen", "jazzhands", "skislopes",
+]
+BEHAVIORS = [
+    "Moderate Reuse (Substitution & Suffix)", "High/Direct Reuse", "Thematic Expansion",
+    "Generic Expansion", "Role/Department Addition",
+]
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "proton.me", "icloud.com"]
+STREAM_CHUNK_CHARS = 256
+MIDDLE_NAME_RATE = 0.8
+LEET = str.maketrans({"o": "0", "e": "3", "a": "@", "i": "1", "s": "$"})
+
+
+class FakeQuotaError(Exception):
+    """Mimics google.genai.errors.APIError for a 429 RESOURCE_EXHAUSTED."""
+    code = 429
+
+    def __init__(self):
+        super().__init__("429 RESOURCE_EXHAUSTED (fake)")
+
+
+def fake_persona(rng, sector, avoid_names=(), avoid_roots=()):
+    """ one persona dict in the study schema, mostly honoring "do NOT use" hints """
+    # a middle name on most personas keeps the pool (and the emails the
+    # near-duplicate check compares) well above a full study's TARGET_COUNT
+    for _ in range(3):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        middle = rng.choice(FIRST_NAMES) if rng.random() < MIDDLE_NAME_RATE else ""
+        name = " ".join(n for n in (first, middle, last) if n)
+        if name not in avoid_names:
+            break
+    for _ in range(3):
+        hobby = rng.choice(HOBBIES)
+        if hobby not in avoid_roots:
+            break
+    personal = hobby if rng.random() < 0.5 else hobby.title().replace(" ", "")
+    if rng.random() < 0.3:
+        personal += str(rng.randint(1, 99))
+    work = hobby.capitalize().translate(LEET) + rng.choice("!#$%&*") + str(rng.choice([2023, 2024, 2025]))
+    if rng.random() < 0.3:
+        work += sector[:4]
+    return {
+        "name": name,
+        "occupation": f"{sector} Specialist",
+        "personal_email": f"{rng.choice(['', '.', '_']).join(name.lower().split())}@{rng.choice(DOMAINS)}",
+        "personal_password": personal,
+        "work_lanid": f"{first[0].lower()}{middle[:1].lower()}{last.lower()}{rng.randint(1, 99)}",
+        "work_password": work,
+        "behavior_tag": rng.choice(BEHAVIORS),
+    }
+
+
+class FakeModels:
+    """ client.models / client.aio.models """
+    def __init__(self, owner, is_async):
+        self.owner = owner
+        self.is_async = is_async
+
+    def _respond(self, contents):
+        return self.owner.respond(contents)
+
+    def generate_content(self, model=None, contents="", config=None):
+        if self.is_async:
+            return self._generate_async(contents)
+        self.owner.maybe_fail()
+        time.sleep(self.owner.draw_latency())
+        return self._respond(contents)
+
+    async def _generate_async(self, contents):
+        # imported here so synthetic.py (fake_persona only) starts without asyncio
+        import asyncio  # pylint: disable=import-outside-toplevel
+        self.owner.maybe_fail()
+        await asyncio.sleep(self.owner.draw_latency())
+        return self._respond(contents)
+
+    def generate_content_stream(self, model=None, contents="", config=None):
+        if self.is_async:
+            return self._stream_async(contents)
+        return self._stream(contents)
+
+    def _stream(self, contents):
+        self.owner.maybe_fail()
+        latency = self.owner.draw_latency()
+        chunks = stream_chunks(self._respond(contents))
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+    async def _stream_async(self, contents):
+        # like the SDK: awaiting the call returns the async iterator
+        self.owner.maybe_fail()
+        latency = self.owner.draw_latency()
+        chunks = stream_chunks(self._respond(contents))
+
+        async def iterate():
+            import asyncio  # pylint: disable=import-outside-toplevel
+            for chunk in chunks:
+                await asyncio.sleep(latency / len(chunks))
+                yield chunk
+        return iterate()
+
+
+def stream_chunks(response, size=STREAM_CHUNK_CHARS):
+    """ split a response into streamed chunks; only the last one carries the usage """
+    text = response.text
+    pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+    chunks = [SimpleNamespace(text=piece, usage_metadata=None) for piece in pieces]
+    chunks[-1].usage_metadata = response.usage_metadata
+    return chunks
+
+
+class FakeClient:
+    """
+    latency: mean seconds per call, quota_error_rate: share of calls that
+    raise a 429, malformed_rate: share of responses that are truncated.
+    """
+    def __init__(self, latency=0.5, quota_error_rate=0.0, malformed_rate=0.05, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+        self.models = FakeModels(self, is_async=False)
+        self.aio = SimpleNamespace(models=FakeModels(self, is_async=True))
+
+    def draw_latency(self):
+        return self.rng.uniform(0.5, 1.5) * self.latency
+
+    def maybe_fail(self):
+        self.calls += 1
+        if self.quota_error_rate and self.rng.random() < self.quota_error_rate:
+            raise FakeQuotaError()
+
+    def respond(self, prompt):
+        """ build a response object with .text and .usage_metadata """
+        count_match = re.search(r"generate (\d+) unique personas", prompt)
+        sector_match = re.search(r"in the (.+?) sector", prompt)
+        count = int(count_match.group(1)) if count_match else 10
+        sector = sector_match.group(1) if sector_match else "Tech"
+
+        names_match = re.search(r"do NOT use these names: (.+)", prompt)
+        roots_match = re.search(r"do NOT build passwords on: (.+)", prompt)
+        avoid_names = set(names_match.group(1).split(", ")) if names_match else set()
+        avoid_roots = set(roots_match.group(1).split(", ")) if roots_match else set()
+
+        personas = [fake_persona(self.rng, sector, avoid_names, avoid_roots) for _ in range(count)]
+        text = json.dumps(personas, indent=2)
+        if self.rng.random() < self.malformed_rate:
+            # truncated mid-object plus chatter, like a high temperature reply
+            text = text[:int(len(text) * self.rng.uniform(0.5, 0.95))] + "\nを行いいます。"
+
+        prompt_tokens = len(prompt) // 4
+        output_tokens = len(text) // 4
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens,
+                                candidates_token_count=output_tokens,
+                                total_token_count=prompt_tokens + output_tokens)
+        return SimpleNamespace(text=text, usage_metadata=usage)
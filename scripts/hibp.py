@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Bulk HIBP Pwned Passwords range lookups shared by the checker scripts.
+https://haveibeenpwned.com/API/v3#SearchingPwnedPasswordsByRange
+
+Every password is SHA1 hashed first and grouped by its 5 character prefix,
+so each distinct range is downloaded exactly once no matter how many rows
+reuse it. Ranges are fetched concurrently over one pooled keep-alive
+session, paced by an adaptive rate limiter that honours Retry-After.
+Set HIBP_API_URL (or pass base_url) to point at a local stub range server.
+Pass a hibp_cache.RangeCache to reuse ranges across runs, or a
+hibp_index.PwnedIndex to answer from a local dump without any requests.
+"""
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import hibp_cache
+import hibp_index
+import metrics
+
+API_URL = os.environ.get("HIBP_API_URL", "https://api.pwnedpasswords.com")
+DEFAULT_CONCURRENCY = 8
+REQUEST_TIMEOUT = 5
+MAX_ATTEMPTS = 5
+CACHE_COMMIT_EVERY = 100
+
+
+class RateLimiter:
+    """
+    Adaptive pacing shared by all fetch threads.
+    Starts with no delay, backs off when the server answers 429 (using
+    Retry-After when present) and slowly speeds back up on success.
+    """
+    def __init__(self, min_interval=0.0, max_interval=1.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """ block until the caller is allowed to send a request """
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.blocked_until)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            metrics.inc("sleep_seconds_total", delay, reason="hibp_pacing")
+            time.sleep(delay)
+
+    def throttled(self, retry_after=None):
+        """ record a 429, pausing everyone for Retry-After seconds """
+        with self.lock:
+            self.interval = min(self.max_interval, max(self.interval * 2, 0.01))
+            pause = retry_after if retry_after is not None else self.interval
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+        return pause
+
+    def succeeded(self):
+        """ a successful response lets the pace creep back up """
+        with self.lock:
+            self.interval *= 0.7
+            if self.interval < 0.001:
+                self.interval = self.min_interval
+
+
+def parse_retry_after(value, default=2):
+    """Retry-After is normally whole seconds; fall back on anything odd."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def make_session(concurrency=DEFAULT_CONCURRENCY):
+    """ keep-alive session with a connection pool sized to the thread count """
+    # requests is imported here: offline runs (cache or index only) never need it
+    import requests  # pylint: disable=import-outside-toplevel
+    from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Add-Padding"] = "true"
+    return session
+
+
+def sha1_hex(password):
+    """ uppercase SHA1 hex digest, the format used by the range API """
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
+
+def parse_range(body):
+    """Turn a range response body into a {suffix: count} dict."""
+    counts = {}
+    for line in body.splitlines():
+        suffix, _, count = line.partition(':')
+        if count:
+            counts[suffix.strip()] = int(count)
+    return counts
+
+
+def fetch_range(session, prefix, limiter, base_url=None):
+    """Fetch one range body, retrying on rate limits. Returns None on failure."""
+    import requests  # pylint: disable=import-outside-toplevel
+    url = f"{(base_url or API_URL).rstrip('/')}/range/{prefix}"
+    for _ in range(MAX_ATTEMPTS):
+        limiter.wait()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException:
+            metrics.inc("hibp_requests_total", status="error")
+            limiter.throttled()
+            continue
+        metrics.observe("hibp_request_seconds", time.perf_counter() - start)
+        metrics.inc("hibp_requests_total", status=response.status_code)
+        if response.status_code == 200:
+            limiter.succeeded()
+            return response.text
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            wait_time = limiter.throttled(retry_after)
+            print(f"--- Rate limited on {prefix}. Backing off {wait_time:.1f}s... ---")
+            continue
+        return None
+    return None
+
+
+def fetch_ranges(prefixes, concurrency=DEFAULT_CONCURRENCY, base_url=None,
+                 cache=None, cache_only=False):
+    """
+    Download every distinct prefix once, concurrently.
+    With a RangeCache, fresh cached ranges are served from disk and new
+    downloads are written back; cache_only never touches the network.
+    Returns {prefix: {suffix: count}}; failed or uncached prefixes map to None.
+    """
+    prefixes = sorted(set(prefixes))
+    bodies = cache.get_many(prefixes) if cache is not None else {}
+    missing = [p for p in prefixes if p not in bodies]
+
+    if missing and not cache_only:
+        limiter = RateLimiter()
+        with make_session(concurrency) as session:
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                fetched = {}
+                results = pool.map(lambda p: fetch_range(session, p, limiter, base_url), missing)
+                for prefix, body in zip(missing, results):
+                    if body is None:
+                        continue
+                    bodies[prefix] = fetched[prefix] = body
+                    # commit as we go so an interrupted run keeps its downloads
+                    if cache is not None and len(fetched) >= CACHE_COMMIT_EVERY:
+                        cache.put_many(fetched)
+                        fetched = {}
+                if cache is not None:
+                    cache.put_many(fetched)
+
+    downloaded = len(bodies) - (len(prefixes) - len(missing))
+    metrics.inc("hibp_ranges_total", len(prefixes) - len(missing), source="cache")
+    metrics.inc("hibp_ranges_total", downloaded, source="download")
+    metrics.inc("hibp_ranges_total", len(prefixes) - len(bodies), source="failed")
+    return {
+        prefix: parse_range(bodies[prefix]) if prefix in bodies else None
+        for prefix in prefixes
+    }
+
+
+def lookup_counts(passwords, concurrency=DEFAULT_CONCURRENCY, base_url=None,
+                  cache=None, cache_only=False, index=None):
+    """
+    Bulk enrichment: returns one pwned count per password, in input order.
+    Empty passwords count as 0, failed lookups as None.
+    With a hibp_index.PwnedIndex everything is answered locally.
+    """
+    if index is not None:
+        digests = [hashlib.sha1(pw.encode('utf-8')).digest() for pw in passwords if pw]
+        found = iter(index.count_many(digests))
+        return [next(found) if pw else 0 for pw in passwords]
+
+    hashes = [sha1_hex(pw) if pw else None for pw in passwords]
+    ranges = fetch_ranges((h[:5] for h in hashes if h), concurrency, base_url,
+                          cache, cache_only)
+
+    results = []
+    for h in hashes:
+        if h is None:
+            results.append(0)
+            continue
+        suffixes = ranges.get(h[:5])
+        results.append(None if suffixes is None else suffixes.get(h[5:], 0))
+    return results
+
+
+def add_cli_options(parser):
+    """ shared --concurrency / cache flags for the checker scripts """
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="parallel range requests (default: %(default)s)")
+    parser.add_argument("--cache", default=hibp_cache.DEFAULT_CACHE,
+                        help="range cache file (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always download ranges, do not read or write the cache")
+    parser.add_argument("--cache-ttl", type=float, default=hibp_cache.DEFAULT_TTL / 86400,
+                        help="days before a cached range is refetched, 0 = never (default: %(default)s)")
+    parser.add_argument("--cache-only", action="store_true",
+                        help="offline: answer only from the cache, uncached ranges are reported as failed")
+    parser.add_argument("--index",
+                        help="offline: answer from a local dump index built by hibp_index.py")
+
+
+def open_index(args):
+    """ PwnedIndex for parsed CLI args, or None when --index is not given """
+    return hibp_index.PwnedIndex(args.index) if args.index else None
+
+
+def open_cache(args):
+    """ RangeCache for parsed CLI args, or None when caching is disabled """
+    if args.index:
+        if args.cache_only:
+            raise SystemExit("--cache-only and --index are both offline modes, pick one")
+        return None
+    if args.no_cache:
+        if args.cache_only:
+            raise SystemExit("--cache-only needs the cache, drop --no-cache")
+        return None
+    return hibp_cache.RangeCache(args.cache, ttl=args.cache_ttl * 86400)
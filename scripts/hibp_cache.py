@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache of HIBP range bodies, keyed by hash prefix.
+Backed by one SQLite file in WAL mode so several checker processes can
+share it. Bodies are stored zlib compressed with their fetch time; entries
+older than the TTL are treated as misses, and the least recently used
+ranges are evicted once the cache grows past its size budget.
+Usage: python hibp_cache.py <cache.sqlite> [stats|purge]
+"""
+import os
+import sys
+import time
+import zlib
+import sqlite3
+
+DEFAULT_CACHE = "hibp_cache.sqlite"
+DEFAULT_TTL = 30 * 24 * 3600       # ranges only ever grow, a month is plenty
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranges (
+    prefix   TEXT PRIMARY KEY,
+    body     BLOB NOT NULL,
+    size     INTEGER NOT NULL,
+    fetched  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_accessed ON ranges(accessed);
+"""
+
+
+class RangeCache:
+    """SQLite backed {prefix: range body} store with TTL and LRU eviction."""
+    def __init__(self, path=DEFAULT_CACHE, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # busy timeout lets concurrent checkers queue on the write lock
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, prefixes):
+        """Returns {prefix: body} for every fresh cached prefix."""
+        prefixes = list(prefixes)
+        found = {}
+        now = time.time()
+        oldest = now - self.ttl if self.ttl else 0
+        for i in range(0, len(prefixes), 500):
+            chunk = prefixes[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT prefix, body FROM ranges WHERE prefix IN ({marks}) AND fetched >= ?",
+                (*chunk, oldest)).fetchall()
+            for prefix, blob in rows:
+                found[prefix] = zlib.decompress(blob).decode('ascii')
+            if rows:
+                with self.conn:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                    self.conn.executemany("UPDATE ranges SET accessed = ? WHERE prefix = ?",
+                                          ((now, prefix) for prefix, _ in rows))
+        self.hits += len(found)
+        self.misses += len(prefixes) - len(found)
+        return found
+
+    def get(self, prefix):
+        return self.get_many([prefix]).get(prefix)
+
+    def put_many(self, bodies):
+        """Store {prefix: body}. Zero count padding lines are dropped first."""
+        now = time.time()
+        rows = []
+        for prefix, body in bodies.items():
+            kept = "\n".join(line for line in body.splitlines()
+                             if line and not line.endswith(":0"))
+            blob = zlib.compress(kept.encode('ascii'), 6)
+            rows.append((prefix, blob, len(blob), now, now))
+        if not rows:
+            return
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ranges (prefix, body, size, fetched, accessed) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def put(self, prefix, body):
+        self.put_many({prefix: body})
+
+    def total_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ranges").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used ranges until the cache fits max_bytes."""
+        if not self.max_bytes:
+            return 0
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+        removed = 0
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            cursor = self.conn.execute("SELECT prefix, size FROM ranges ORDER BY accessed")
+            doomed = []
+            for prefix, size in cursor:
+                if excess <= 0:
+                    break
+                doomed.append((prefix,))
+                excess -= size
+            self.conn.executemany("DELETE FROM ranges WHERE prefix = ?", doomed)
+            removed = len(doomed)
+        return removed
+
+    def purge_expired(self):
+        """Delete ranges older than the TTL."""
+        if not self.ttl:
+            return 0
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM ranges WHERE fetched < ?",
+                                       (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    def stats(self):
+        count, size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ranges").fetchone()
+        return {"ranges": count, "bytes": size, "coverage": count / 16 ** 5}
+
+
+class MemoryRangeCache:
+    """ RangeCache interface over a plain dict: shares ranges within one run, nothing on disk """
+    def __init__(self):
+        self.bodies = {}
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        pass
+
+    def get_many(self, prefixes):
+        prefixes = list(prefixes)
+        found = {p: self.bodies[p] for p in prefixes if p in self.bodies}
+        self.hits += len(found)
+        self.misses += len(prefixes) - len(found)
+        return found
+
+    def put_many(self, bodies):
+        self.bodies.update(bodies)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[2] not in ("stats", "purge")):
+        print(f"Usage: python {os.path.basename(sys.argv[0])} <cache.sqlite> [stats|purge]")
+        sys.exit(1)
+
+    with RangeCache(sys.argv[1]) as cache:
+        if len(sys.argv) == 3 and sys.argv[2] == "purge":
+            print(f"Purged {cache.purge_expired()} expired ranges")
+        info = cache.stats()
+        print(f"Ranges cached: {info['ranges']} ({info['coverage']:.2%} of all prefixes)")
+        print(f"Size on disk:  {info['bytes'] / 1024 / 1024:.1f} MiB (compressed bodies)")
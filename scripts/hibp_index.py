@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Offline Pwned Passwords lookups from a local mirror of the SHA1:count dump.
+
+The text dump is converted once into a compact binary index:
+    header   8 byte magic + uint64 record count
+    offsets  (2^20 + 1) uint64 record offsets, one per 5 hex char prefix
+    records  20 byte raw SHA1 digest + uint32 count, sorted by digest
+Lookups memory-map the file, jump to the prefix bucket through the offset
+table and binary search inside it, so only the touched pages are resident.
+
+Usage:
+  python hibp_index.py build <pwnedpasswords.txt> <pwned.idx> [--unsorted]
+  python hibp_index.py lookup <pwned.idx> <password> [password...]
+"""
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import tempfile
+
+MAGIC = b"PPIDX\x00\x01\x00"
+HEADER = struct.Struct("<8sQ")
+RECORD = struct.Struct("<20sI")
+PREFIX_BITS = 20
+BUCKETS = 1 << PREFIX_BITS
+OFFSETS_START = HEADER.size
+RECORDS_START = OFFSETS_START + (BUCKETS + 1) * 8
+
+
+def parse_dump_line(line):
+    """'HEX40:count' -> (digest bytes, count)"""
+    digest, _, count = line.strip().partition(':')
+    return bytes.fromhex(digest), int(count)
+
+
+def prefix_of(digest):
+    """ top 20 bits of a digest, i.e. the 5 hex char range prefix """
+    return int.from_bytes(digest[:3], 'big') >> 4
+
+
+def _write_index(records, dst_path):
+    """Write sorted (digest, count) records and the prefix offset table."""
+    counts = [0] * BUCKETS
+    total = 0
+    previous = b""
+    with open(dst_path, 'wb') as out:
+        out.seek(RECORDS_START)
+        pack = RECORD.pack
+        for digest, count in records:
+            if digest <= previous:
+                raise ValueError(f"dump is not sorted by hash near {digest.hex().upper()} "
+                                 "(rebuild with --unsorted)")
+            previous = digest
+            out.write(pack(digest, min(count, 0xFFFFFFFF)))
+            counts[prefix_of(digest)] += 1
+            total += 1
+
+        # offsets[i] is the first record of bucket i, offsets[BUCKETS] == total
+        offsets = [0] * (BUCKETS + 1)
+        running = 0
+        for i, n in enumerate(counts):
+            offsets[i] = running
+            running += n
+        offsets[BUCKETS] = running
+
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, total))
+        out.write(struct.pack(f"<{BUCKETS + 1}Q", *offsets))
+    return total
+
+
+def _iter_sorted_dump(src_path):
+    with open(src_path, 'r', encoding='ascii') as f:
+        for line in f:
+            if line.strip():
+                yield parse_dump_line(line)
+
+
+def _iter_unsorted_dump(src_path, tmp_dir=None):
+    """
+    Two pass bucket sort for dumps in arbitrary order: spill records into
+    256 files by first digest byte, then sort one bucket at a time in memory.
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        spills = [open(os.path.join(tmp, f"{i:02x}.bin"), 'wb') for i in range(256)]
+        try:
+            for digest, count in _iter_sorted_dump(src_path):
+                spills[digest[0]].write(RECORD.pack(digest, min(count, 0xFFFFFFFF)))
+        finally:
+            for f in spills:
+                f.close()
+        for i in range(256):
+            with open(os.path.join(tmp, f"{i:02x}.bin"), 'rb') as f:
+                data = f.read()
+            bucket = sorted(RECORD.iter_unpack(data))
+            merged = []
+            for digest, count in bucket:
+                if merged and merged[-1][0] == digest:
+                    merged[-1] = (digest, merged[-1][1] + count)
+                else:
+                    merged.append((digest, count))
+            yield from merged
+
+
+def build_index(src_path, dst_path, presorted=True):
+    """Convert a SHA1:count dump into a binary index. Returns the record count."""
+    records = _iter_sorted_dump(src_path) if presorted else _iter_unsorted_dump(src_path)
+    return _write_index(records, dst_path)
+
+
+class PwnedIndex:
+    """Memory-mapped, read-only view of a built index."""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.total = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a Pwned Passwords index")
+
+    def close(self):
+        if getattr(self, "mm", None) is not None:
+            self.mm.close()
+            self.mm = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.total
+
+    def bucket(self, prefix):
+        """[first, last) record numbers for a 20 bit prefix"""
+        return struct.unpack_from("<QQ", self.mm, OFFSETS_START + prefix * 8)
+
+    def count_digest(self, digest):
+        """Pwned count for a raw 20 byte SHA1 digest (0 if absent)."""
+        mm = self.mm
+        size = RECORD.size
+        lo, hi = self.bucket(prefix_of(digest))
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            pos = RECORDS_START + mid * size
+            probe = mm[pos:pos + 20]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                return int.from_bytes(mm[pos + 20:pos + 24], 'little')
+        return 0
+
+    def count_hex(self, sha1_hex):
+        return self.count_digest(bytes.fromhex(sha1_hex))
+
+    def count_password(self, password):
+        return self.count_digest(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def count_many(self, digests):
+        """
+        Batch lookup of raw digests, results in input order.
+        Probing in sorted order walks the file front to back, so each page
+        is faulted in at most once per batch.
+        """
+        digests = list(digests)
+        results = [0] * len(digests)
+        for i in sorted(range(len(digests)), key=digests.__getitem__):
+            results[i] = self.count_digest(digests[i])
+        return results
+
+    def range_body(self, prefix_hex):
+        """Reconstruct the API style 'SUFFIX:count' body for a 5 hex char prefix."""
+        lo, hi = self.bucket(int(prefix_hex, 16))
+        start = RECORDS_START + lo * RECORD.size
+        lines = []
+        for digest, count in RECORD.iter_unpack(self.mm[start:RECORDS_START + hi * RECORD.size]):
+            lines.append(f"{digest.hex().upper()[5:]}:{count}")
+        return "\r\n".join(lines)
+
+
+if __name__ == "__main__":
+    script_name = os.path.basename(sys.argv[0])
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == "build":
+        unsorted = "--unsorted" in args
+        src, dst = [a for a in args[1:] if a != "--unsorted"][:2]
+        print(f"--- Building {dst} from {src} ---")
+        n = build_index(src, dst, presorted=not unsorted)
+        print(f"✅ Indexed {n} hashes ({os.path.getsize(dst) / 1024 / 1024:.1f} MiB)")
+    elif len(args) >= 3 and args[0] == "lookup":
+        with PwnedIndex(args[1]) as index:
+            for pw in args[2:]:
+                count = index.count_password(pw)
+                if count:
+                    print(f"⚠️  '{pw}' was found {count} times.")
+                else:
+                    print(f"✅ '{pw}' was NOT found.")
+    else:
+        print("Usage:")
+        print(f"  python {script_name} build <pwnedpasswords.txt> <pwned.idx> [--unsorted]")
+        print(f"  python {script_name} lookup <pwned.idx> <password> [password...]")
+        sys.exit(1)
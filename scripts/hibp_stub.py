@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Pwned Passwords range API.
+Serves /range/<prefix> from a password list so the checkers can be run
+and timed without touching the network.
+Usage: python hibp_stub.py <passwords.txt> [port]
+Then:  HIBP_API_URL=http://127.0.0.1:8000 python check_hibp_csv.py credentials.csv
+"""
+import os
+import sys
+import time
+import random
+import hashlib
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RangeStub:
+    """
+    In-memory range index. Every known password gets a count, and each
+    range is padded with random suffixes like the real service.
+    Optionally answers a fraction of requests with 429 + Retry-After.
+    """
+    def __init__(self, passwords, padding=20, latency=0.0, rate_limit_ratio=0.0,
+                 retry_after=1, seed=0):
+        rng = random.Random(seed)
+        self.ranges = defaultdict(dict)
+        for pw in passwords:
+            sha1 = hashlib.sha1(pw.encode('utf-8')).hexdigest().upper()
+            entry = self.ranges[sha1[:5]]
+            entry[sha1[5:]] = entry.get(sha1[5:], 0) + rng.randint(1, 5000)
+        self.padding = padding
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.rng = rng
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def body(self, prefix):
+        """ range body for a prefix, including deterministic padding lines """
+        pad = random.Random(prefix)
+        lines = [f"{suffix}:{count}" for suffix, count in self.ranges.get(prefix, {}).items()]
+        for _ in range(self.padding):
+            lines.append(f"{pad.getrandbits(140):035X}:0")
+        return "\r\n".join(lines)
+
+    def should_throttle(self):
+        with self.lock:
+            self.requests += 1
+            if self.rate_limit_ratio and self.rng.random() < self.rate_limit_ratio:
+                self.throttled += 1
+                return True
+        return False
+
+
+def make_handler(stub):
+    """ build a request handler class bound to one stub instance """
+    class RangeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            parts = self.path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] != "range" or len(parts[1]) != 5:
+                self.send_error(404)
+                return
+            if stub.latency:
+                time.sleep(stub.latency)
+            if stub.should_throttle():
+                self.send_response(429)
+                self.send_header("Retry-After", str(stub.retry_after))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            payload = stub.body(parts[1].upper()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return RangeHandler
+
+
+def serve(stub, host="127.0.0.1", port=0):
+    """Start the stub in a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(f"Usage: python {os.path.basename(sys.argv[0])} <passwords.txt> [port]")
+        sys.exit(1)
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        known = [line.strip() for line in f if line.strip()]
+    listen_port = int(sys.argv[2]) if len(sys.argv) == 3 else 8000
+    httpd, url = serve(RangeStub(known), port=listen_port)
+    print(f"Serving {len(known)} passwords on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        httpd.shutdown()
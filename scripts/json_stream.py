@@ -0,0 +1,110 @@
+"""
+Incremental recovery of persona objects from a model response.
+
+PersonaStreamParser is fed the response text as it arrives and returns
+each top-level JSON object once its closing brace is in. It works through
+the text once. json.JSONDecoder.raw_decode parses each object in place,
+and str.find skips everything between objects: the opening '[', commas,
+code fences and trailing chatter.
+
+While the stream is open, an object that does not parse yet is retried
+when more text with a '}' arrives. It is given up once MAX_OBJECT_CHARS
+have arrived after its opening brace. On close, a truncated or broken
+object is skipped from its opening brace, so any object nested inside it
+can still be recovered. A wrapper like {"personas": [...]} is unwrapped.
+
+parse_text() handles a complete response. When the response looks whole
+it tries a single json.loads, which is the fast path for well-formed
+replies, and otherwise uses the parser.
+"""
+import json
+
+MAX_OBJECT_CHARS = 4096   # personas are ~300 chars; anything longer is a wrapper or garbage
+
+_decoder = json.JSONDecoder()
+
+
+def unwrap(obj):
+    """ the persona dicts in a decoded object: itself, or the list a wrapper holds """
+    if "personal_email" not in obj:
+        for value in obj.values():
+            if isinstance(value, list):
+                return [item for item in value if isinstance(item, dict)]
+    return [obj]
+
+
+def parse_text(text):
+    """ (personas, outcome) for a complete response """
+    stripped = text.rstrip().removesuffix("```").rstrip()
+    if stripped.endswith(("]", "}")):
+        start = min((i for i in (stripped.find("["), stripped.find("{")) if i != -1), default=0)
+        try:
+            data = json.loads(stripped[start:])
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(data, dict):
+                data = unwrap(data)
+            personas = [p for p in data if isinstance(p, dict)] if isinstance(data, list) else []
+            return personas, "clean" if personas else "failed"
+    parser = PersonaStreamParser()
+    personas = parser.feed(text) + parser.close()
+    return personas, parser.outcome()
+
+
+class PersonaStreamParser:
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0          # text before pos has been consumed
+        self.checked = 0      # no '}' in buffer[pos:checked] - nothing new to retry with
+        self.objects = 0
+        self.failed = 0       # objects given up as truncated or malformed
+
+    def feed(self, text):
+        """ add a chunk of the response; returns the objects it completed """
+        self.buffer += text
+        found = self._drain(final=False)
+        # drop consumed text so the buffer only holds the object in progress
+        self.buffer = self.buffer[self.pos:]
+        self.checked = max(self.checked - self.pos, 0)
+        self.pos = 0
+        return found
+
+    def close(self):
+        """ end of the response; returns whatever is still recoverable """
+        found = self._drain(final=True)
+        self.buffer, self.pos, self.checked = "", 0, 0
+        return found
+
+    def outcome(self):
+        """ json_parse_total label: clean, recovered or failed """
+        if not self.failed:
+            return "clean" if self.objects else "failed"
+        return "recovered" if self.objects else "failed"
+
+    def _drain(self, final):
+        buf = self.buffer
+        found = []
+        while True:
+            start = buf.find("{", self.pos)
+            if start == -1:
+                self.pos = len(buf)
+                return found
+            self.pos = start
+            if not final and buf.find("}", max(self.checked, start)) == -1:
+                self.checked = len(buf)
+                return found
+            try:
+                obj, end = _decoder.raw_decode(buf, start)
+            except json.JSONDecodeError:
+                if not final and len(buf) - start < MAX_OBJECT_CHARS:
+                    # most likely still arriving
+                    self.checked = len(buf)
+                    return found
+                self.failed += 1
+                self.pos = start + 1
+                continue
+            personas = unwrap(obj)
+            self.objects += len(personas)
+            found.extend(personas)
+            self.pos = end
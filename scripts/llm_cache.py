@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Record / replay cache for model responses.
+
+CachingClient wraps a google-genai style client (or fake_model's). It
+supports models.generate_content / generate_content_stream and their
+client.aio counterparts, and stores every live response in one SQLite
+file with its raw text, usage metadata and latency. Modes:
+  record  always call the model, store every response
+  replay  never touch the network; once no recorded response is left,
+          ReplayExhausted ends the run
+  mixed   serve recorded responses, fetch (and store) only the misses
+
+A response is keyed by model, generation config and prompt. The prompt's
+"Batch Seed" line is masked first, because the seed is random per
+request and would otherwise make every key unique. Identical prompts are
+normal, and each run serves a recorded response at most once, so
+replayed batches are as varied as the recorded ones were. When the
+exact prompt has nothing left (changed validation rules change the
+"do NOT use" hints), any unused response for the same prompt without
+hints is served. Replay then falls back to any unused response for the
+same model and sector in recording order, so a run whose batch planning
+diverged still works through the recording without personas landing in
+the wrong sector.
+
+Usage: python llm_cache.py [llm_cache.sqlite] [stats]
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from types import SimpleNamespace
+import metrics
+
+DEFAULT_CACHE = "llm_cache.sqlite"
+MODES = ("record", "replay", "mixed")
+USAGE_FIELDS = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+SEED_LINE = re.compile(r"Batch Seed: \S+")
+HINT_LINES = re.compile(r"\n[ \t]*- Overused, .*")
+SECTOR = re.compile(r"password habits in the (.+?) sector")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id        INTEGER PRIMARY KEY,
+    key       TEXT NOT NULL,
+    loose_key TEXT NOT NULL,
+    model     TEXT NOT NULL,
+    prompt    TEXT NOT NULL,
+    text      TEXT NOT NULL,
+    usage     TEXT NOT NULL,
+    latency   REAL NOT NULL,
+    recorded  REAL NOT NULL,
+    sector    TEXT NOT NULL DEFAULT ''
+);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS responses_key ON responses(key);
+CREATE INDEX IF NOT EXISTS responses_loose_key ON responses(loose_key);
+CREATE INDEX IF NOT EXISTS responses_model ON responses(model, sector);
+"""
+PAGE = 64                # ids read per step while skipping served responses
+
+
+class ReplayExhausted(Exception):
+    """replay mode ran out of recorded responses"""
+
+
+def config_text(config):
+    """ stable JSON for a generation config (pydantic model, dict or None) """
+    if config is None:
+        return "null"
+    if hasattr(config, "model_dump"):
+        config = config.model_dump(exclude_none=True)
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def cache_keys(model, config, prompt):
+    """ (exact key, key without the prompt's "do NOT use" hints); the batch seed is masked in both """
+    prompt = SEED_LINE.sub("Batch Seed: *", prompt)
+    keys = []
+    for text in (prompt, HINT_LINES.sub("", prompt)):
+        payload = json.dumps([model or "", config_text(config), text])
+        keys.append(hashlib.sha256(payload.encode('utf-8')).hexdigest())
+    return tuple(keys)
+
+
+def prompt_sector(prompt):
+    """ the sector a generator prompt asks for, "" for other prompts """
+    found = SECTOR.search(prompt)
+    return found.group(1) if found else ""
+
+
+def usage_dict(response):
+    usage = getattr(response, "usage_metadata", None)
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
+
+def cached_response(text, usage):
+    """ the parts of a response the generator reads: .text and .usage_metadata """
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(**usage))
+
+
+class ResponseCache:
+    """SQLite store of responses; each one is served at most once per instance."""
+    def __init__(self, path=DEFAULT_CACHE):
+        self.path = path
+        # the generator may call from a pipeline thread
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.add_sector_column()
+        self.conn.executescript(INDEXES)
+        self.used = set()
+        self.cursors = {}       # (column, value) -> last id served or skipped for it
+        self.hits = 0
+        self.loose_hits = 0
+        self.other_hits = 0
+        self.recorded = 0
+        self.misses = 0
+
+    def close(self):
+        self.conn.close()
+
+    def add_sector_column(self):
+        """ caches recorded before the sector column: add it and fill it from the prompts """
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+        if "sector" in columns:
+            return
+        self.conn.execute("BEGIN")
+        self.conn.execute("ALTER TABLE responses ADD COLUMN sector TEXT NOT NULL DEFAULT ''")
+        rows = self.conn.execute("SELECT id, prompt FROM responses").fetchall()
+        self.conn.executemany("UPDATE responses SET sector = ? WHERE id = ?",
+                              [(prompt_sector(prompt), row_id) for row_id, prompt in rows])
+        self.conn.execute("COMMIT")
+
+    def next_unused(self, column, value):
+        """ the first unused id for column = value; ids before the cursor are all used """
+        where = "model = ? AND sector = ?" if column == "model" else f"{column} = ?"
+        params = value if column == "model" else (value,)
+        last = self.cursors.get((column, value), 0)
+        while True:
+            ids = [row[0] for row in self.conn.execute(
+                f"SELECT id FROM responses WHERE {where} AND id > ? ORDER BY id LIMIT {PAGE}",
+                (*params, last))]
+            for row_id in ids:
+                last = row_id
+                if row_id not in self.used:
+                    self.cursors[(column, value)] = last
+                    return row_id
+            self.cursors[(column, value)] = last
+            if len(ids) < PAGE:
+                return None
+
+    def take(self, keys, model=None, sector=""):
+        """
+        an unused (text, usage) for the exact key, else the loose key, else
+        (when model is given) any response for the model and sector; None on a miss
+        """
+        lookups = [("key", keys[0]), ("loose_key", keys[1])]
+        if model is not None:
+            lookups.append(("model", (model or "", sector)))
+        with self.lock:
+            for column, value in lookups:
+                row_id = self.next_unused(column, value)
+                if row_id is None:
+                    continue
+                self.used.add(row_id)
+                if column == "key":
+                    self.hits += 1
+                elif column == "loose_key":
+                    self.loose_hits += 1
+                else:
+                    self.other_hits += 1
+                text, usage = self.conn.execute(
+                    "SELECT text, usage FROM responses WHERE id = ?", (row_id,)).fetchone()
+                return text, json.loads(usage)
+            self.misses += 1
+        return None
+
+    def put(self, keys, model, prompt, text, usage, latency):
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO responses (key, loose_key, model, sector, prompt, text, usage, latency, recorded) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*keys, model or "", prompt_sector(prompt), prompt, text, json.dumps(usage),
+                 latency, time.time()))
+            # a response recorded now is not served again in the same run
+            self.used.add(cursor.lastrowid)
+            self.recorded += 1
+
+    def stats(self):
+        count, prompts, latency = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT loose_key), COALESCE(SUM(latency), 0) FROM responses").fetchone()
+        return {"responses": count, "prompts": prompts, "latency": latency,
+                "bytes": os.path.getsize(self.path)}
+
+    def summary(self):
+        served = self.hits + self.loose_hits + self.other_hits
+        return (f"--- LLM cache: {served} replayed ({self.loose_hits} by prompt without hints, "
+                f"{self.other_hits} for other prompts of the sector), "
+                f"{self.recorded} recorded, {self.misses} misses ({self.path}) ---")
+
+
+class CachingModels:
+    """ client.models / client.aio.models with the cache in front """
+    def __init__(self, owner, is_async):
+        self.owner = owner
+        self.is_async = is_async
+
+    def _inner(self):
+        client = self.owner.client
+        return client.aio.models if self.is_async else client.models
+
+    def _lookup(self, model, contents, config):
+        """ (keys, cached response or None); replay misses raise """
+        owner = self.owner
+        keys = cache_keys(model, config, contents)
+        if owner.mode != "record":
+            found = owner.cache.take(keys, model if owner.mode == "replay" else None, prompt_sector(contents))
+            if found is not None:
+                metrics.inc("llm_cache_total", result="hit")
+                return keys, cached_response(*found)
+            metrics.inc("llm_cache_total", result="miss")
+            if owner.mode == "replay":
+                raise ReplayExhausted(f"all responses in {owner.cache.path} have been replayed")
+        return keys, None
+
+    def _store(self, keys, model, contents, text, usage, latency):
+        self.owner.cache.put(keys, model, contents, text, usage, latency)
+        metrics.inc("llm_cache_total", result="recorded")
+
+    def generate_content(self, model=None, contents="", config=None):
+        if self.is_async:
+            return self._generate_async(model, contents, config)
+        keys, response = self._lookup(model, contents, config)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        response = self._inner().generate_content(model=model, contents=contents, config=config)
+        self._store(keys, model, contents, response.text or "", usage_dict(response),
+                    time.perf_counter() - start)
+        return response
+
+    async def _generate_async(self, model, contents, config):
+        keys, response = self._lookup(model, contents, config)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        response = await self._inner().generate_content(model=model, contents=contents, config=config)
+        self._store(keys, model, contents, response.text or "", usage_dict(response),
+                    time.perf_counter() - start)
+        return response
+
+    def generate_content_stream(self, model=None, contents="", config=None):
+        if self.is_async:
+            return self._stream_async(model, contents, config)
+        return self._stream(model, contents, config)
+
+    def _stream(self, model, contents, config):
+        keys, response = self._lookup(model, contents, config)
+        if response is not None:
+            yield response
+            return
+        start = time.perf_counter()
+        parts, chunk = [], None
+        stream = self._inner().generate_content_stream(model=model, contents=contents, config=config)
+        try:
+            for chunk in stream:
+                parts.append(chunk.text or "")
+                yield chunk
+        except GeneratorExit:
+            # the caller stopped reading (target reached); the response is
+            # billed anyway, so read the rest and record it whole
+            for chunk in stream:
+                parts.append(chunk.text or "")
+            self._store(keys, model, contents, "".join(parts), usage_dict(chunk), time.perf_counter() - start)
+            raise
+        # a stream that broke off raised above and is not recorded
+        self._store(keys, model, contents, "".join(parts), usage_dict(chunk), time.perf_counter() - start)
+
+    async def _stream_async(self, model, contents, config):
+        # like the SDK: awaiting the call returns the async iterator
+        keys, response = self._lookup(model, contents, config)
+        if response is not None:
+            async def replay():
+                yield response
+            return replay()
+        stream = await self._inner().generate_content_stream(model=model, contents=contents, config=config)
+
+        async def record():
+            start = time.perf_counter()
+            parts, chunk = [], None
+            async for chunk in stream:
+                parts.append(chunk.text or "")
+                yield chunk
+            self._store(keys, model, contents, "".join(parts), usage_dict(chunk),
+                        time.perf_counter() - start)
+        return record()
+
+
+class CachingClient:
+    """ drop-in for genai.Client: client.models and client.aio.models go through the cache """
+    def __init__(self, client, path=DEFAULT_CACHE, mode="mixed"):
+        if mode not in MODES:
+            raise ValueError(f"unknown cache mode {mode!r}, use one of {', '.join(MODES)}")
+        self.client = client
+        self.mode = mode
+        self.cache = ResponseCache(path)
+        self.models = CachingModels(self, is_async=False)
+        self.aio = SimpleNamespace(models=CachingModels(self, is_async=True))
+
+
+def add_cli_options(parser):
+    """ shared --llm-cache flags """
+    parser.add_argument("--llm-cache", choices=MODES,
+                        help="record responses, replay them offline, or mixed (replay, fetch misses)")
+    parser.add_argument("--llm-cache-file", default=DEFAULT_CACHE,
+                        help="response cache file (default: %(default)s)")
+
+
+def wrap(client, args):
+    """ the client behind the cache when --llm-cache was given """
+    if not getattr(args, "llm_cache", None):
+        return client
+    return CachingClient(client, args.llm_cache_file, args.llm_cache)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 or (len(sys.argv) == 3 and sys.argv[2] != "stats"):
+        print(f"Usage: python {os.path.basename(sys.argv[0])} [llm_cache.sqlite] [stats]")
+        sys.exit(1)
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CACHE
+    if not os.path.exists(path):
+        print(f"Error: File '{path}' not found.")
+        sys.exit(1)
+    cache = ResponseCache(path)
+    info = cache.stats()
+    cache.close()
+    print(f"Responses cached: {info['responses']} for {info['prompts']} distinct prompts (hints ignored)")
+    print(f"Live time saved per full replay: {info['latency']:.1f}s")
+    print(f"Size on disk: {info['bytes'] / 1024 / 1024:.1f} MiB")
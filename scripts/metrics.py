@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Shared run metrics: counters, gauges, timers and histograms.
+
+Everything is a no-op until enable() is called (the scripts do that for
+--metrics), so instrumented code costs a function call and one flag
+check while metrics are off. Once on, updates stay in memory and are
+flushed every FLUSH_INTERVAL seconds and at exit to:
+  <prefix>.jsonl  one JSON event per line (per-batch / per-file events)
+  <prefix>.prom   Prometheus textfile (node_exporter textfile collector format)
+The prefix defaults to metrics_<script>, so each script keeps its own
+textfile. `python metrics.py watch` is a live summary of a textfile.
+"""
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import bisect
+import argparse
+import threading
+import contextlib
+
+DEFAULT_PREFIX = "metrics"
+WATCH_FILE = "metrics_password_generator.prom"
+FLUSH_INTERVAL = 2.0
+NAMESPACE = "persona_study"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    """ cumulative-bucket histogram, Prometheus style """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Timer:
+    """ context manager that observes its elapsed seconds into a histogram """
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        # the flush thread and close() at exit share the .prom.tmp file
+        self.flush_lock = threading.Lock()
+        self.counters = {}      # (name, labels) -> value
+        self.gauges = {}
+        self.histograms = {}
+        self.events = []
+        self.prefix = None
+        self.pid = None
+        self.stop = threading.Event()
+
+    # --- setup ---
+    def enable(self, prefix=DEFAULT_PREFIX, interval=FLUSH_INTERVAL):
+        """ start recording; flushes every `interval` seconds and at exit """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.prefix = prefix
+        self.pid = os.getpid()
+        self.event("run_start", script=os.path.basename(sys.argv[0]), argv=sys.argv[1:])
+        thread = threading.Thread(target=self._flush_loop, args=(interval,), daemon=True)
+        thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        if not self.enabled or os.getpid() != self.pid:
+            return
+        self.stop.set()
+        self.event("run_end")
+        self.flush()
+
+    def _flush_loop(self, interval):
+        while not self.stop.wait(interval):
+            self.flush()
+
+    # --- recording ---
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        """ set a gauge to its current value """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def timer(self, name, **labels):
+        """ `with metrics.timer("x_seconds"):` - a shared null context when disabled """
+        if not self.enabled:
+            return _NULL_TIMER
+        return Timer(self, name, labels)
+
+    def event(self, kind, **fields):
+        if not self.enabled:
+            return
+        record = {"ts": round(time.time(), 3), "event": kind}
+        record.update(fields)
+        with self.lock:
+            self.events.append(record)
+
+    # --- export ---
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            histograms = [(key, h.buckets, list(h.counts), h.sum, h.count) for key, h in histograms]
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {NAMESPACE}_{name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{NAMESPACE}_{name}{format_labels(labels)} {value:g}")
+        for (name, labels), value in gauges:
+            declare(name, "gauge")
+            lines.append(f"{NAMESPACE}_{name}{format_labels(labels)} {value:g}")
+        for (name, labels), buckets, counts, total, count in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(buckets + ("+Inf",), counts):
+                cumulative += n
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{NAMESPACE}_{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{NAMESPACE}_{name}_sum{format_labels(labels)} {total:.6f}")
+            lines.append(f"{NAMESPACE}_{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """ append pending events and atomically rewrite the textfile """
+        if not self.enabled:
+            return
+        with self.flush_lock:
+            with self.lock:
+                events, self.events = self.events, []
+            if events:
+                with open(f"{self.prefix}.jsonl", 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(e) + "\n" for e in events)
+            tmp = f"{self.prefix}.prom.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, f"{self.prefix}.prom")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# --- module level API on one shared registry ---
+registry = Metrics()
+enable = registry.enable
+inc = registry.inc
+gauge = registry.gauge
+observe = registry.observe
+timer = registry.timer
+event = registry.event
+flush = registry.flush
+
+
+def add_cli_options(parser):
+    """ shared --metrics flag for the scripts """
+    parser.add_argument("--metrics", nargs="?", const="", metavar="PREFIX",
+                        help=f"record metrics to PREFIX.jsonl / PREFIX.prom "
+                             f"(default prefix: {DEFAULT_PREFIX}_<script>)")
+
+
+def configure(args):
+    """ enable metrics if --metrics was given """
+    prefix = getattr(args, "metrics", None)
+    if prefix is not None:
+        script = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        enable(prefix or f"{DEFAULT_PREFIX}_{script}")
+
+
+# --- live summary ---
+SAMPLE = re.compile(r'^(\w+?)(?:_(bucket|sum|count))?(\{.*\})?\s+(\S+)$')
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_textfile(text):
+    """ {name: kind}, {(name, labels): value}, {(name, labels): {'buckets': [(le, n)], 'sum', 'count'}} """
+    kinds, values, hists = {}, {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE"):
+            _, _, name, kind = line.split()
+            kinds[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            continue
+        name, part, labels, value = match.groups()
+        labels = dict(LABEL.findall(labels or ""))
+        if part and kinds.get(name) == "histogram":
+            le = labels.pop("le", None)
+            entry = hists.setdefault((name, tuple(sorted(labels.items()))),
+                                     {"buckets": [], "sum": 0.0, "count": 0})
+            if part == "bucket":
+                entry["buckets"].append((float(le), float(value)))
+            else:
+                entry[part] = float(value)
+        else:
+            full = f"{name}_{part}" if part else name
+            values[(full, tuple(sorted(labels.items())))] = float(value)
+    return kinds, values, hists
+
+
+def bucket_quantile(buckets, count, q):
+    """ upper bound of the bucket holding the q quantile """
+    rank = q * count
+    for le, cumulative in buckets:
+        if cumulative >= rank:
+            return le
+    return float("inf")
+
+
+def short_name(name):
+    return name[len(NAMESPACE) + 1:] if name.startswith(NAMESPACE + "_") else name
+
+
+def summary_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        _, values, hists = parse_textfile(f.read())
+    age = time.time() - os.path.getmtime(path)
+    lines = [f"=== {path} (updated {age:.0f}s ago) ==="]
+    for (name, labels), value in sorted(values.items()):
+        shown = f"{value:,.0f}" if value.is_integer() else f"{value:,.3f}"
+        lines.append(f"  {short_name(name) + format_labels(labels):<60} {shown:>14}")
+    if hists:
+        lines.append(f"  {'timings (s)':<52} {'count':>8} {'mean':>8} {'p50':>8} {'p99':>8}")
+    for (name, labels), h in sorted(hists.items()):
+        count = h["count"]
+        mean = h["sum"] / count if count else 0.0
+        lines.append(f"  {short_name(name) + format_labels(labels):<52} {count:>8.0f} {mean:>8.3f} "
+                     f"{bucket_quantile(h['buckets'], count, 0.5):>8g} "
+                     f"{bucket_quantile(h['buckets'], count, 0.99):>8g}")
+    return lines
+
+
+def watch(path, interval=2.0, once=False):
+    """ redraw the summary of a textfile every `interval` seconds """
+    while True:
+        try:
+            lines = summary_lines(path)
+        except FileNotFoundError:
+            lines = [f"Waiting for {path} ..."]
+        if not once:
+            print("\033[2J\033[H", end="")
+        print("\n".join(lines), flush=True)
+        if once:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Live summary of a metrics textfile written with --metrics.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    watch_parser = sub.add_parser("watch", help="redraw the summary until Ctrl+C")
+    watch_parser.add_argument("textfile", nargs="?", default=WATCH_FILE,
+                              help="textfile to summarize (default: %(default)s)")
+    watch_parser.add_argument("--interval", type=float, default=2.0, help="seconds between redraws")
+    watch_parser.add_argument("--once", action="store_true", help="print once and exit")
+    args = parser.parse_args()
+
+    try:
+        watch(args.textfile, args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,158 @@
+"""
+Incremental near-duplicate index for generated personas.
+
+Exact email/lanid matching lets "anyasharma@gmail.com" and "anya.sharma@..."
+both through. Each persona is normalized into a few fields (name, email
+local part, lanid, and a "profile" of name + de-leeted password root),
+every field is turned into character 3-gram shingles and a MinHash
+signature, and the signatures go into per-field LSH band tables. A new
+persona is only compared against the handful of candidates that share a
+band bucket, so checks stay sub-linear as the accepted set grows to 100k+.
+"""
+import re
+import random
+import zlib
+
+# field -> minimum Jaccard similarity that counts as a duplicate (None = off)
+DEFAULT_THRESHOLDS = {
+    "name": None,       # the model reuses popular names for distinct personas
+    "email": 0.85,
+    "lanid": None,      # "asharma" is legitimately shared by different people
+    "profile": 0.75,    # same name and same password root: a regenerated persona
+}
+# 8 bands x 4 rows: candidate pairs start to show up around 0.6 similarity
+NUM_PERM = 32
+BANDS = 8
+SHINGLE = 3
+MASK64 = (1 << 64) - 1
+
+LEET_UNDO = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s",
+                           "7": "t", "@": "a", "$": "s", "!": "i"})
+NON_LETTERS = re.compile(r"[^a-z]+")
+
+
+def normalize_name(name):
+    """ lowercase letters only, tokens sorted so word order doesn't matter """
+    tokens = NON_LETTERS.split((name or "").lower())
+    return "".join(sorted(t for t in tokens if t))
+
+
+def normalize_email(email):
+    """ local part without separators, digits or +tags """
+    local = (email or "").lower().split("@")[0].split("+")[0]
+    return NON_LETTERS.sub("", local)
+
+
+def normalize_lanid(lanid):
+    return NON_LETTERS.sub("", (lanid or "").lower())
+
+
+def password_root(password):
+    """ undo common leetspeak and drop digits/symbols: 'D3sertR0se!24' -> 'desertrose' """
+    return NON_LETTERS.sub("", (password or "").lower().translate(LEET_UNDO))
+
+
+def persona_fields(persona):
+    """ normalized strings the index compares, keyed by field name """
+    name = normalize_name(persona.get("name"))
+    return {
+        "name": name,
+        "email": normalize_email(persona.get("personal_email")),
+        "lanid": normalize_lanid(persona.get("work_lanid")),
+        "profile": name + "|" + password_root(persona.get("personal_password")),
+    }
+
+
+def shingles(text, size=SHINGLE):
+    """ character n-grams with edge markers, so short strings still get a few """
+    padded = f"^{text}$"
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index, one band table per enabled field.
+    check() returns (field, similarity) for the first field whose best
+    candidate reaches its threshold, or None; add() indexes a persona.
+    """
+    def __init__(self, thresholds=None, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        self.thresholds = {f: t for f, t in (thresholds or DEFAULT_THRESHOLDS).items() if t}
+        rng = random.Random(seed)
+        self.perms = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_perm)]
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.tables = {field: {} for field in self.thresholds}
+        self.exact = {field: {} for field in self.thresholds}
+        self.shingle_sets = {field: [] for field in self.thresholds}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def signature(self, shingle_set):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+        return [min([(a * h + b) & MASK64 for h in hashes]) for a, b in self.perms]
+
+    def band_keys(self, sig):
+        rows = self.rows
+        return [(band, tuple(sig[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def prepare(self, persona):
+        """ normalized value, shingles and LSH keys per enabled field """
+        prepared = {}
+        for field, value in persona_fields(persona).items():
+            if field not in self.thresholds or not value.strip("|"):
+                continue
+            shingle_set = shingles(value)
+            prepared[field] = (value, shingle_set, self.band_keys(self.signature(shingle_set)))
+        return prepared
+
+    def check(self, persona, prepared=None):
+        prepared = prepared or self.prepare(persona)
+        for field, (value, shingle_set, keys) in prepared.items():
+            if value in self.exact[field]:
+                return field, 1.0
+            table = self.tables[field]
+            stored = self.shingle_sets[field]
+            threshold = self.thresholds[field]
+            seen = set()
+            for key in keys:
+                for other in table.get(key, ()):
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    similarity = jaccard(shingle_set, stored[other])
+                    if similarity >= threshold:
+                        return field, similarity
+        return None
+
+    def add(self, persona, prepared=None):
+        prepared = prepared or self.prepare(persona)
+        for field in self.thresholds:
+            if field not in prepared:
+                self.shingle_sets[field].append(frozenset())
+                continue
+            value, shingle_set, keys = prepared[field]
+            self.shingle_sets[field].append(frozenset(shingle_set))
+            self.exact[field].setdefault(value, self.size)
+            table = self.tables[field]
+            for key in keys:
+                table.setdefault(key, []).append(self.size)
+        self.size += 1
+        return self.size - 1
+
+    def check_and_add(self, persona):
+        """ add the persona unless it is a near duplicate; returns check()'s result """
+        prepared = self.prepare(persona)
+        match = self.check(persona, prepared)
+        if match is None:
+            self.add(persona, prepared)
+        return match
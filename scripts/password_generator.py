@@ -1,36 +1,58 @@
 """ generate "human-like" passwords for study - Gemini 2.5 Stable """
 import os
-import re
-import csv
 import sys
 import json
 import time
 import uuid
-import string
+import asyncio
+import argparse
+import itertools
 from collections import Counter
-from google import genai
-from google.genai import types  # Explicit types for 2.5 config
-from config import API_KEY
+from rate_limit import ModelRateLimiter, is_quota_error
+from persona_store import PersonaStore
+from password_policy import study_policy
+from near_duplicates import NearDuplicateIndex, DEFAULT_THRESHOLDS
+from batch_controller import BatchController
+from json_stream import PersonaStreamParser, parse_text
+import llm_cache
+import metrics
 
 # --- SETTINGS ---
 TARGET_COUNT = 2500
 CHUNK_SIZE = 25
-OUTPUT_JSON = "personas.json"
+OUTPUT_JSONL = "personas.jsonl"   # append-only store, source of truth
+OUTPUT_JSON = "personas.json"     # legacy exports, rewritten at the end of a run
 OUTPUT_CSV = "credentials.csv"
 SUMMARY_FILE = "data_summary.txt"
 SECTORS = ["Banking", "Healthcare", "Construction", "Education", "Retail", "Tech"]
+MODEL = "gemini-2.5-flash"
+TEMPERATURE = 0.7
+
+# --- CONCURRENT MODE (--concurrency > 1) ---
+# Paid tier 1 quota for gemini-2.5-flash; lower these for other tiers/models
+CONCURRENCY = 8
+RATE_LIMIT_RPM = 1000
+RATE_LIMIT_RPD = 10000
+RATE_LIMIT_TPM = 1000000
+EST_TOKENS_PER_PERSONA = 120
 
 # --- FEATURES ---
-ENABLE_BLOCKLIST = True
-BLOCKLIST = [
-    "password", "12345678", "qwertyuiop", "password123", "password123!",
-    "admin123", "welcome1", "welcome1!", "changeme", "sunshine",
-    "football", "p@ssword", "123456789", "iloveyou", "monkey",
-    "dragon", "letmein", "p@$$w0rd", "spring2026", "summer2026",
-    "winter2026", "autumn2026", "password!", "admin!123", "adminadmin"
-]
+# The blocklist (ENABLE_BLOCKLIST, BLOCKLIST, BLOCKLIST_FILES) lives in
+# password_policy.py so the analysis tools check the same rules
+
+# Near-duplicate persona rejection: minimum similarity per field, None disables a field
+ENABLE_NEAR_DUP = True
+NEAR_DUP_THRESHOLDS = dict(DEFAULT_THRESHOLDS)
 
-VALID_SYMBOLS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+# Adaptive batching: size requests and weight sectors by live acceptance rate,
+# and add "avoid these names/roots" hints to the prompt
+ENABLE_ADAPTIVE_BATCHING = True
+MIN_CHUNK_SIZE = 10
+MAX_CHUNK_SIZE = 50
+MIN_SECTOR_YIELD = 0.15   # sectors below this acceptance rate are stopped
+
+# Stream responses and validate personas as their objects complete
+ENABLE_STREAMING = True
 
 # --- REPORTING COUNTERS ---
 stats = {
@@ -39,52 +61,67 @@ stats = {
     "rejected_blocklist": 0,
     "rejected_pattern": 0,
     "rejected_duplicate_persona": 0,
-    "accepted": 0
+    "rejected_near_duplicate": 0,
+    **{f"near_dup_{field}": 0 for field in NEAR_DUP_THRESHOLDS},
+    "accepted": 0,
+    "tokens_used": 0
 }
 
 personal_pw_registry = Counter()
 work_pw_registry = Counter()
+duplicate_name_registry = Counter()
+near_dup_index = NearDuplicateIndex(NEAR_DUP_THRESHOLDS)
 
-client = genai.Client(api_key=API_KEY)
+controller = BatchController(SECTORS, CHUNK_SIZE, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, MIN_SECTOR_YIELD)
 
-def validate_password(pw, check_complexity=True):
-    """ check if the password matches character set and complexity rules """
-    if not pw:
-        return False, "empty"
+POLICY = study_policy()
 
-    all_allowed = string.ascii_letters + string.digits + VALID_SYMBOLS
-    if any(c not in all_allowed for c in pw):
-        return False, "pattern"
+def make_client(api_key=None):
+    """ a genai.Client; the SDK takes ~1s to import, so it is only loaded here """
+    from google import genai  # pylint: disable=import-outside-toplevel
+    if api_key is None:
+        from config import API_KEY  # pylint: disable=import-outside-toplevel
+        api_key = API_KEY
+    return genai.Client(api_key=api_key)
 
-    if check_complexity:
-        if len(pw) < 12:
-            return False, "complexity"
-        has_low = any(c in string.ascii_lowercase for c in pw)
-        has_up  = any(c in string.ascii_uppercase for c in pw)
-        has_num = any(c in string.digits for c in pw)
-        has_sym = any(c in VALID_SYMBOLS for c in pw)
+class LazyClient:
+    """ stands in for the genai client and builds it on the first request """
+    def __init__(self):
+        self._client = None
 
-        if sum([has_low, has_up, has_num, has_sym]) < 3:
-            return False, "complexity"
+    def __getattr__(self, name):
+        if self._client is None:
+            self._client = make_client()
+        return getattr(self._client, name)
 
-        if ENABLE_BLOCKLIST and pw.lower() in [b.lower() for b in BLOCKLIST]:
-            return False, "blocklist"
+# importing this module (validate_password, salvage_json, forked workers)
+# must not pay for the SDK or require an API key
+client = LazyClient()
 
-    return True, None
+def validate_password(pw, check_complexity=True):
+    """ check if the password matches character set and complexity rules """
+    return POLICY.validate(pw, check_complexity)
 
-def get_prompt(count, sector):
-    """ generate the seeded prompt for the AI model """
-    batch_seed = uuid.uuid4().hex[:8]
+def get_prompt(count, sector, hints="", batch_seed=None):
+    """ generate the seeded prompt for the AI model; the seed is random unless given """
+    batch_seed = batch_seed or uuid.uuid4().hex[:8]
+    if hints:
+        hints = f"\n    {hints}"
     return f"""
     Batch Seed: {batch_seed}
     As a data generator, generate {count} unique personas for a study on password habits in the {sector} sector.
     RESEARCH FOCUS: Credential Reuse.
     - Diversity: Global mix of names and backgrounds. Passwords that are laborious to type are avoided.
     - personal_password: Raw human root (hobbies, slang, pet names, meaningful numbers).
-    - work_password: A modification of that root (12+ chars, numbers, symbols) expanding on it.
+    - work_password: A modification of that root (12+ chars, numbers, symbols) expanding on it.{hints}
     Return a JSON list: name, occupation, personal_email, personal_password, work_lanid, work_password, behavior_tag
     """
 
+def accepted_per_1k_tokens():
+    """ personas accepted this run per 1,000 billed tokens """
+    accepted, tokens = controller.totals()
+    return accepted * 1000 / tokens if tokens else 0.0
+
 def write_summary():
     """ save a progress summary file """
     with open(SUMMARY_FILE, "w") as f:
@@ -92,9 +129,19 @@ def write_summary():
         f.write(f"Total Accepted: {stats['accepted']} / {TARGET_COUNT}\n")
         f.write(f"Total API Attempts: {stats['total_generated']}\n")
         f.write(f"Rejection - Duplicate:  {stats['rejected_duplicate_persona']}\n")
+        near_dup_fields = ", ".join(f"{field}: {stats[f'near_dup_{field}']}"
+                                    for field, threshold in NEAR_DUP_THRESHOLDS.items() if threshold)
+        f.write(f"Rejection - Near Dup:   {stats['rejected_near_duplicate']} ({near_dup_fields})\n")
         f.write(f"Rejection - Pattern:    {stats['rejected_pattern']} (Emoji/Spaces/Unallowed Symbols)\n")
         f.write(f"Rejection - Complexity: {stats['rejected_complexity']}\n")
-        f.write(f"Rejection - Blocklist:  {stats['rejected_blocklist']}\n\n")
+        f.write(f"Rejection - Blocklist:  {stats['rejected_blocklist']}\n")
+        f.write(f"Tokens Used (this run): {stats['tokens_used']}\n")
+        f.write(f"Accepted per 1k Tokens: {accepted_per_1k_tokens():.2f}\n\n")
+
+        f.write("--- SECTOR YIELD (this run) ---\n")
+        for line in controller.summary_lines():
+            f.write(f"{line}\n")
+        f.write("\n")
 
         f.write("--- TOP 10 PERSONAL ROOTS ---\n")
         for pw, count in personal_pw_registry.most_common(10):
@@ -107,149 +154,402 @@ def write_summary():
 
 def salvage_json(raw_text):
     """
-    Attempts to extract and repair a partial or corrupted JSON list.
-    Useful for high-temperature hallucinations or truncated responses.
+    Extracts the persona objects from a complete, truncated or chatty
+    response in one pass (json_stream.py). Handles high-temperature
+    hallucinations, code fences and trailing conversational text.
     """
-    # 1. Try a clean load first
-    try:
-        return json.loads(raw_text)
-    except json.JSONDecodeError:
-        pass
-
-    # 2. Extract everything between the first '[' and the last '}'
-    # This ignores trailing conversational text like "を行いいます。"
-    start_index = raw_text.find('[')
-    last_object_end = raw_text.rfind('}')
+    personas, outcome = parse_text(raw_text)
+    metrics.inc("json_parse_total", result=outcome)
+    return personas
+
+def generation_config():
+    """ model config shared by the serial and concurrent loops """
+    from google.genai import types  # pylint: disable=import-outside-toplevel
+    # Explicitly targeting 2.5 Flash, high temperature that sometimes fails JSON outout
+    return types.GenerateContentConfig(
+        response_mime_type='application/json',
+        temperature=TEMPERATURE
+    )
+
+def parse_batch(response):
+    """ turn a model response into a list of persona dicts (may be empty) """
+    return salvage_json(response.text or "")
+
+def stream_batch(model_client, prompt, sector, seen_ids):
+    """
+    Stream one request and validate / dedup each persona as soon as its
+    object is complete. Returns (batch_data, valid_batch, last chunk); the
+    last chunk carries the usage metadata. A stream that breaks off after
+    some personas arrived keeps them, so nothing accepted goes unsaved.
+    """
+    parser = PersonaStreamParser()
+    batch_data, valid_batch = [], []
+    chunk = None
+    start = time.perf_counter()
+
+    def take(personas):
+        if not personas:
+            return
+        batch_data.extend(personas)
+        accepted = accept_batch(personas, sector, seen_ids, limit=TARGET_COUNT - stats["accepted"])
+        if accepted and not valid_batch:
+            metrics.observe("first_accept_seconds", time.perf_counter() - start)
+        valid_batch.extend(accepted)
 
-    if start_index == -1 or last_object_end == -1:
-        return []
+    try:
+        with metrics.timer("llm_request_seconds", mode="stream"):
+            for chunk in model_client.models.generate_content_stream(
+                model=MODEL,
+                contents=prompt,
+                config=generation_config()
+            ):
+                take(parser.feed(chunk.text or ""))
+                if stats["accepted"] >= TARGET_COUNT:
+                    break
+    except Exception as e:
+        if not batch_data:
+            raise
+        print(f"⚠️  Stream broke off after {len(batch_data)} personas: {e}")
+        metrics.inc("llm_errors_total", kind="stream")
+    take(parser.close())
+    metrics.inc("json_parse_total", result=parser.outcome())
+    return batch_data, valid_batch, chunk
+
+def accept_batch(batch_data, sector, seen_ids, limit=None):
+    """
+    Validate and dedup one batch against everything accepted so far.
+    Updates stats, seen_ids and the password registries; returns the
+    accepted personas (at most `limit`).
+    """
+    valid_batch = []
+    for p in batch_data:
+        if limit is not None and len(valid_batch) >= limit:
+            break
+        stats["total_generated"] += 1
+        p_email = p.get('personal_email', '').lower()
+        w_id = p.get('work_lanid', '').lower()
+
+        if not p_email or p_email in seen_ids or w_id in seen_ids:
+            stats["rejected_duplicate_persona"] += 1
+            if p.get('name'):
+                duplicate_name_registry[p['name']] += 1
+            continue
+
+        prepared = near_dup_index.prepare(p) if ENABLE_NEAR_DUP else None
+        if prepared is not None:
+            match = near_dup_index.check(p, prepared)
+            if match:
+                stats["rejected_near_duplicate"] += 1
+                stats[f"near_dup_{match[0]}"] += 1
+                if p.get('name'):
+                    duplicate_name_registry[p['name']] += 1
+                continue
 
-    # Slice the string to end at the last completed object
-    # and force a closing bracket for the list
-    salvaged_text = raw_text[start_index:last_object_end + 1] + "]"
+        is_p_v, p_r = validate_password(p.get('personal_password', ''), check_complexity=False)
+        is_w_v, w_r = validate_password(p.get('work_password', ''), check_complexity=True)
+
+        if is_p_v and is_w_v:
+            p['sector'] = sector
+            valid_batch.append(p)
+            seen_ids.add(p_email)
+            seen_ids.add(w_id)
+            if prepared is not None:
+                near_dup_index.add(p, prepared)
+            stats["accepted"] += 1
+            personal_pw_registry[p['personal_password']] += 1
+            work_pw_registry[p['work_password']] += 1
+        else:
+            reason = p_r if not is_p_v else w_r
+            if reason == "pattern":
+                stats["rejected_pattern"] += 1
+            elif reason == "complexity":
+                stats["rejected_complexity"] += 1
+            elif reason == "blocklist":
+                stats["rejected_blocklist"] += 1
+    return valid_batch
+
+def migrate_legacy(store):
+    """ one-time migration from the old rewrite-everything personas.json """
+    if not store.exists() and os.path.exists(OUTPUT_JSON):
+        try:
+            migrated = store.import_legacy_json(OUTPUT_JSON)
+            print(f"--- Migrated {migrated} personas from {OUTPUT_JSON} to {OUTPUT_JSONL} ---")
+        except json.JSONDecodeError as e:
+            sys.exit(f"❌ {OUTPUT_JSON} is corrupt ({e}); fix or move it before resuming")
 
-    # 3. Handle the "dangling comma" case (e.g., -}, or }, [garbage])
-    # Removes commas that appear right before the closing bracket
-    salvaged_text = re.sub(r',\s*\]', ']', salvaged_text)
+def load_existing():
+    """
+    Resume from OUTPUT_JSONL: streams the store to rebuild seen_ids and the
+    registries. Returns (store, seen_ids).
+    """
+    store = PersonaStore(OUTPUT_JSONL)
+    seen_ids = set()
+    migrate_legacy(store)
+
+    dropped = store.repair()
+    if dropped:
+        print(f"⚠️  Dropped a torn {dropped} byte record at the end of {OUTPUT_JSONL}")
+
+    stats["accepted"] = 0
+    for p in store:
+        stats["accepted"] += 1
+        seen_ids.add(p['personal_email'].lower())
+        seen_ids.add(p['work_lanid'].lower())
+        personal_pw_registry[p['personal_password']] += 1
+        work_pw_registry[p['work_password']] += 1
+        if ENABLE_NEAR_DUP:
+            near_dup_index.add(p)
+    return store, seen_ids
+
+def save_batch(store, valid_batch):
+    """ commit a batch to the store (fsync'd) and refresh the summary """
+    store.append(valid_batch)
+    write_summary()
+
+def export_legacy(store):
+    """ compact the store into the personas.json / credentials.csv the other scripts read """
+    count = store.export(OUTPUT_JSON, OUTPUT_CSV)
+    print(f"✅ Exported {count} personas to {OUTPUT_JSON} and {OUTPUT_CSV}")
+
+def plan_request(target_sector_override=None, rotation=None):
+    """ (sector, persona count, prompt) for the next request """
+    remaining = TARGET_COUNT - stats["accepted"]
+    if not ENABLE_ADAPTIVE_BATCHING:
+        sector = target_sector_override or SECTORS[next(rotation) % len(SECTORS)]
+        count = min(CHUNK_SIZE, remaining)
+        return sector, count, get_prompt(count, sector)
+    sector = target_sector_override or controller.next_sector()
+    count = controller.batch_size(sector, remaining)
+    hints = controller.exclusion_hints(duplicate_name_registry, personal_pw_registry)
+    return sector, count, get_prompt(count, sector, hints)
+
+def record_batch(sector, request_count, batch_data, valid_batch, response):
+    """ feed a batch's yield and token cost back to the controller """
+    tokens = usage_tokens(response)
+    stats["tokens_used"] += tokens
+    controller.record(sector, request_count, len(batch_data), len(valid_batch), tokens)
+    metrics.inc("llm_tokens_total", tokens, sector=sector)
+    metrics.inc("personas_generated_total", len(batch_data), sector=sector)
+    metrics.inc("personas_accepted_total", len(valid_batch), sector=sector)
+    metrics.event("batch", sector=sector, requested=request_count, generated=len(batch_data),
+                  accepted=len(valid_batch), tokens=tokens)
+    for key, value in stats.items():
+        metrics.gauge(f"generator_{key}", value)
+    metrics.gauge("generator_target", TARGET_COUNT)
+    metrics.gauge("generator_personal_unique", len(personal_pw_registry))
+
+def print_progress(sector):
+    print(f"\n--- Progress: {stats['accepted']}/{TARGET_COUNT} Sector: [{sector}] ---")
+    print(f"  [REJECTIONS] Pattern: {stats['rejected_pattern']} | Complex: {stats['rejected_complexity']} | Block: {stats['rejected_blocklist']}")
+    print(f"  [IDENTITY]   Duplicates: {stats['rejected_duplicate_persona']} | Near: {stats['rejected_near_duplicate']}")
+    print(f"  [ENTROPY]    Personal Unique: {len(personal_pw_registry)}/{stats['accepted']}")
+    print(f"  [TOKENS]     Used: {stats['tokens_used']} | Accepted per 1k: {accepted_per_1k_tokens():.2f}")
+
+def run_study(target_sector_override=None, model_client=None, on_batch=None):
+    """ main generation loop; on_batch(valid_batch) is called after each saved batch """
+    model_client = model_client or client
+    store, seen_ids = load_existing()
+    rotation = itertools.count(stats["accepted"] // CHUNK_SIZE)
 
     try:
-        return json.loads(salvaged_text)
-    except json.JSONDecodeError as e:
-        # 4. Final attempt: Character-by-character scan (Slow but sure)
-        # We try to build a string and see at what point it stops being valid
-        objs = []
-        # Simple regex to find potential JSON objects
-        potential_objs = re.findall(r'\{.*?\}', salvaged_text, re.DOTALL)
-        for obj_str in potential_objs:
-            try:
-                objs.append(json.loads(obj_str))
-            except:
-                continue
-        return objs
+        while stats["accepted"] < TARGET_COUNT:
+            sector, request_count, prompt = plan_request(target_sector_override, rotation)
 
-def run_study():
-    """ main generation loop """
-    target_sector_override = sys.argv[1] if len(sys.argv) > 1 else None
-    all_personas = []
-    seen_ids = set()
+            try:
+                if ENABLE_STREAMING:
+                    batch_data, valid_batch, response = stream_batch(model_client, prompt, sector, seen_ids)
+                else:
+                    with metrics.timer("llm_request_seconds", mode="serial"):
+                        response = model_client.models.generate_content(
+                            model=MODEL,
+                            contents=prompt,
+                            config=generation_config()
+                        )
+                    batch_data = parse_batch(response)
+                    valid_batch = accept_batch(batch_data, sector, seen_ids,
+                                               limit=TARGET_COUNT - stats["accepted"])
+                if not batch_data:
+                    record_batch(sector, request_count, [], [], response)
+                    print("Batch completely unreadable, skipping...")
+                    continue
 
-    if os.path.exists(OUTPUT_JSON):
+                record_batch(sector, request_count, batch_data, valid_batch, response)
+                save_batch(store, valid_batch)
+                if on_batch is not None:
+                    on_batch(valid_batch)
+                print_progress(sector)
+
+            except llm_cache.ReplayExhausted as e:
+                print(f"--- Replay finished: {e} ---")
+                break
+            except Exception as e:
+                print(f"❌ API/Parse Error: {e}")
+                metrics.inc("llm_errors_total", kind="quota" if is_quota_error(e) else "other")
+                metrics.inc("sleep_seconds_total", 2, reason="error")
+                time.sleep(2)
+    finally:
+        export_legacy(store)
+
+def usage_tokens(response):
+    """ total tokens billed for a response, 0 when the SDK didn't report it """
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", 0) or 0
+
+async def request_async(model_client, prompt):
+    """
+    One async request: (parsed personas, response or last chunk). Streamed
+    replies are parsed as they arrive, so the consumer gets them as soon as
+    the last chunk is in; a stream that breaks off keeps what arrived.
+    """
+    if not ENABLE_STREAMING:
+        with metrics.timer("llm_request_seconds", mode="async"):
+            response = await model_client.aio.models.generate_content(
+                model=MODEL,
+                contents=prompt,
+                config=generation_config()
+            )
         try:
-            with open(OUTPUT_JSON, 'r') as f:
-                all_personas = json.load(f)
-                stats["accepted"] = len(all_personas)
-                for p in all_personas:
-                    seen_ids.add(p['personal_email'].lower())
-                    seen_ids.add(p['work_lanid'].lower())
-                    personal_pw_registry[p['personal_password']] += 1
-                    work_pw_registry[p['work_password']] += 1
-        except Exception:
-            pass
-
-    while len(all_personas) < TARGET_COUNT:
-        sector = target_sector_override if target_sector_override else SECTORS[len(all_personas) % len(SECTORS)]
-        request_count = min(CHUNK_SIZE, TARGET_COUNT - len(all_personas))
+            return parse_batch(response), response
+        except Exception as e:
+            print(f"❌ Parse Error: {e}")
+            return [], response
 
+    parser = PersonaStreamParser()
+    personas = []
+    chunk = None
+    try:
+        with metrics.timer("llm_request_seconds", mode="async_stream"):
+            async for chunk in await model_client.aio.models.generate_content_stream(
+                model=MODEL,
+                contents=prompt,
+                config=generation_config()
+            ):
+                personas += parser.feed(chunk.text or "")
+    except Exception as e:
+        if not personas:
+            raise
+        print(f"⚠️  Stream broke off after {len(personas)} personas: {e}")
+        metrics.inc("llm_errors_total", kind="stream")
+    personas += parser.close()
+    metrics.inc("json_parse_total", result=parser.outcome())
+    return personas, chunk
+
+async def generation_worker(model_client, limiter, schedule, results, done, target_sector_override):
+    """
+    One in-flight request slot: pick the next sector, wait for quota, call
+    the model and hand the parsed personas to the consumer.
+    """
+    attempt = 0
+    while not done.is_set():
+        sector, request_count, prompt = plan_request(target_sector_override, schedule)
+        estimate = len(prompt) // 4 + request_count * EST_TOKENS_PER_PERSONA
+        await limiter.acquire(estimate)
+        if done.is_set():
+            break
         try:
-            # Explicitly targeting 2.5 Flash, high temperature that sometimes fails JSON outout
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=get_prompt(request_count, sector),
-                config=types.GenerateContentConfig(
-                    response_mime_type='application/json',
-                    temperature=0.7
-                )
-            )
-
-            # Robust Cleaning for 2.5 API Responses
-            raw_text = response.text.strip()
-            if raw_text.startswith("```"):
-                # Strips ```json and trailing ```
-                raw_text = raw_text.split("```")[1].replace("json", "", 1).strip()
+            batch_data, response = await request_async(model_client, prompt)
+        except llm_cache.ReplayExhausted as e:
+            print(f"--- Replay finished: {e} ---")
+            done.set()
+            await results.put(None)
+            break
+        except Exception as e:
+            if is_quota_error(e):
+                delay = limiter.quota_exceeded(attempt)
+                attempt += 1
+                metrics.inc("llm_errors_total", kind="quota")
+                print(f"--- Quota exceeded. Backing off {delay:.1f}s... ---")
+            else:
+                print(f"❌ API Error: {e}")
+                metrics.inc("llm_errors_total", kind="other")
+                metrics.inc("sleep_seconds_total", 2, reason="error")
+                await asyncio.sleep(2)
+            continue
+        attempt = 0
+        limiter.settle(estimate, usage_tokens(response))
+        await results.put((sector, request_count, batch_data, response))
+
+async def run_study_async(target_sector_override=None, concurrency=CONCURRENCY,
+                          limiter=None, model_client=None, on_batch=None):
+    """
+    Concurrent generation loop: `concurrency` requests in flight, spread
+    over SECTORS by the batch controller, paced by a shared quota limiter. A single consumer
+    (this coroutine) does all validation and dedup, so acceptance is the
+    same as in the serial loop.
+    """
+    model_client = model_client or client
+    limiter = limiter or ModelRateLimiter(RATE_LIMIT_RPM, RATE_LIMIT_RPD, RATE_LIMIT_TPM)
+    store, seen_ids = load_existing()
+
+    results = asyncio.Queue(maxsize=concurrency)
+    done = asyncio.Event()
+    schedule = itertools.count(stats["accepted"] // CHUNK_SIZE)
+    workers = [
+        asyncio.create_task(generation_worker(model_client, limiter, schedule, results,
+                                              done, target_sector_override))
+        for _ in range(concurrency)
+    ]
 
-            #batch_data = json.loads(raw_text)
-            batch_data = salvage_json(response.text)
+    try:
+        while stats["accepted"] < TARGET_COUNT:
+            item = await results.get()
+            if item is None:
+                break
+            sector, request_count, batch_data, response = item
             if not batch_data:
+                record_batch(sector, request_count, [], [], response)
                 print("Batch completely unreadable, skipping...")
                 continue
 
-            # Ensure we have a list (some versions wrap in a dict)
-            if isinstance(batch_data, dict):
-                batch_data = next(iter(batch_data.values()))
-
-            valid_batch = []
-            for p in batch_data:
-                stats["total_generated"] += 1
-                p_email = p.get('personal_email', '').lower()
-                w_id = p.get('work_lanid', '').lower()
-
-                if not p_email or p_email in seen_ids or w_id in seen_ids:
-                    stats["rejected_duplicate_persona"] += 1
-                    continue
-
-                is_p_v, p_r = validate_password(p.get('personal_password', ''), check_complexity=False)
-                is_w_v, w_r = validate_password(p.get('work_password', ''), check_complexity=True)
-
-                if is_p_v and is_w_v:
-                    p['sector'] = sector
-                    valid_batch.append(p)
-                    seen_ids.add(p_email)
-                    seen_ids.add(w_id)
-                    stats["accepted"] += 1
-                    personal_pw_registry[p['personal_password']] += 1
-                    work_pw_registry[p['work_password']] += 1
-                else:
-                    reason = p_r if not is_p_v else w_r
-                    if reason == "pattern":
-                        stats["rejected_pattern"] += 1
-                    elif reason == "complexity":
-                        stats["rejected_complexity"] += 1
-                    elif reason == "blocklist":
-                        stats["rejected_blocklist"] += 1
-
-            all_personas.extend(valid_batch)
-            with open(OUTPUT_JSON, 'w') as f:
-                json.dump(all_personas, f, indent=4)
-
-            file_exists = os.path.exists(OUTPUT_CSV) and os.path.getsize(OUTPUT_CSV) > 0
-            with open(OUTPUT_CSV, 'a', newline='') as f:
-                writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-                if not file_exists:
-                    writer.writerow(["user_id", "password"])
-                for p in valid_batch:
-                    writer.writerow([p['personal_email'], p['personal_password']])
-                    writer.writerow([p['work_lanid'], p['work_password']])
-
-            write_summary()
-
-            print(f"\n--- Progress: {len(all_personas)}/{TARGET_COUNT} Sector: [{sector}] ---")
-            print(f"  [REJECTIONS] Pattern: {stats['rejected_pattern']} | Complex: {stats['rejected_complexity']} | Block: {stats['rejected_blocklist']}")
-            print(f"  [IDENTITY]   Duplicates: {stats['rejected_duplicate_persona']}")
-            print(f"  [ENTROPY]    Personal Unique: {len(personal_pw_registry)}/{len(all_personas)}")
-
-        except Exception as e:
-            print(f"❌ API/Parse Error: {e}")
-            time.sleep(2)
+            valid_batch = accept_batch(batch_data, sector, seen_ids,
+                                       limit=TARGET_COUNT - stats["accepted"])
+            record_batch(sector, request_count, batch_data, valid_batch, response)
+            save_batch(store, valid_batch)
+            if on_batch is not None:
+                on_batch(valid_batch)
+            print_progress(sector)
+    finally:
+        done.set()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if limiter.quota_errors or limiter.waited:
+            print(f"  [QUOTA]      429s: {limiter.quota_errors} | Limiter wait: {limiter.waited:.1f}s")
+        export_legacy(store)
 
 if __name__ == "__main__":
-    run_study()
+    parser = argparse.ArgumentParser(description="Generate human-like persona passwords for the study.")
+    parser.add_argument("sector", nargs="?", help="study this sector exclusively (default: rotate SECTORS)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help=f"requests in flight; >1 uses the asyncio rate-limited mode (suggested: {CONCURRENCY})")
+    parser.add_argument("--rpm", type=int, default=RATE_LIMIT_RPM, help="requests per minute quota (default: %(default)s)")
+    parser.add_argument("--rpd", type=int, default=RATE_LIMIT_RPD, help="requests per day quota, 0 = unlimited (default: %(default)s)")
+    parser.add_argument("--tpm", type=int, default=RATE_LIMIT_TPM, help="tokens per minute quota, 0 = unlimited (default: %(default)s)")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="wait for complete responses instead of streaming them")
+    parser.add_argument("--fake", action="store_true", help="use the offline fake model client (fake_model.py)")
+    parser.add_argument("--fake-latency", type=float, default=0.5, help="mean fake response time in seconds (default: %(default)s)")
+    llm_cache.add_cli_options(parser)
+    metrics.add_cli_options(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+    if args.no_stream:
+        ENABLE_STREAMING = False
+
+    if args.fake:
+        from fake_model import FakeClient
+        client = FakeClient(latency=args.fake_latency)
+    client = llm_cache.wrap(client, args)
+    if args.llm_cache == "replay":
+        # nothing goes over the network, so there is no quota to pace
+        args.rpm, args.rpd, args.tpm = 10**9, 0, 0
+
+    try:
+        if args.concurrency > 1:
+            asyncio.run(run_study_async(args.sector, args.concurrency,
+                                        ModelRateLimiter(args.rpm, args.rpd, args.tpm), client))
+        else:
+            run_study(args.sector, client)
+    finally:
+        if args.llm_cache:
+            print(client.cache.summary())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Compiled password policy shared by the generator and the analysis tools.
+
+PasswordPolicy precomputes its character-class tables and a hashed,
+lowercased blocklist once; validate() checks one password and
+validate_many() a whole batch, returning a reason code per item:
+    None (valid), "empty", "pattern", "complexity", "blocklist"
+Large external blocklists (rockyou-scale) are loaded into a Bloom filter
+that is cached next to the list and memory-mapped on later runs.
+
+Usage: python password_policy.py bench [count] [blocklist.txt]
+"""
+import os
+import sys
+import mmap
+import math
+import time
+import random
+import string
+import struct
+import hashlib
+
+VALID_SYMBOLS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+# lists bigger than this go into a Bloom filter instead of a set
+BLOOM_THRESHOLD_BYTES = 8 * 1024 * 1024
+BLOOM_FP_RATE = 1e-4
+BLOOM_MAGIC = b"PPBLOOM1"
+BLOOM_HEADER = struct.Struct("<8sQQQdQ")   # magic, bits, hashes, items, src mtime, src size
+
+# --- STUDY POLICY (study_policy()) ---
+ENABLE_BLOCKLIST = True
+BLOCKLIST = [
+    "password", "12345678", "qwertyuiop", "password123", "password123!",
+    "admin123", "welcome1", "welcome1!", "changeme", "sunshine",
+    "football", "p@ssword", "123456789", "iloveyou", "monkey",
+    "dragon", "letmein", "p@$$w0rd", "spring2026", "summer2026",
+    "winter2026", "autumn2026", "password!", "admin!123", "adminadmin"
+]
+# Extra one-per-line blocklists (e.g. rockyou.txt); big files are Bloom filtered
+BLOCKLIST_FILES = []
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over a bytearray (or a read-only mmap when
+    loaded from disk). Positions come from one blake2b digest via double
+    hashing, so each add/lookup costs a single hash call.
+    """
+    def __init__(self, capacity=1000, fp_rate=BLOOM_FP_RATE, bits=None, hashes=None):
+        capacity = max(1, capacity)
+        self.bits = bits or max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        m = self.bits
+        return [(h1 + i * h2) % m for i in range(self.hashes)]
+
+    def add(self, item):
+        array = self.array
+        for pos in self._positions(item):
+            array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        array = self.array
+        for pos in self._positions(item):
+            if not array[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def add_new(self, item):
+        """Add item; True if it was not (probably) present before."""
+        array = self.array
+        new = False
+        for pos in self._positions(item):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not array[byte] & bit:
+                array[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def save(self, path, src_mtime=0.0, src_size=0):
+        with open(path + ".tmp", 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.bits, self.hashes, self.count,
+                                      src_mtime, src_size))
+            f.write(self.array)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path, src_mtime=None, src_size=None):
+        """Memory-map a saved filter; None if missing or stale for the source."""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            header = f.read(BLOOM_HEADER.size)
+            if len(header) < BLOOM_HEADER.size:
+                return None
+            magic, bits, hashes, count, mtime, size = BLOOM_HEADER.unpack(header)
+            if magic != BLOOM_MAGIC:
+                return None
+            if src_mtime is not None and (mtime != src_mtime or size != src_size):
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        bloom = cls.__new__(cls)
+        bloom.bits, bloom.hashes, bloom.count = bits, hashes, count
+        bloom.array = memoryview(mm)[BLOOM_HEADER.size:]
+        return bloom
+
+
+class FastBloomFilter(BloomFilter):
+    """
+    In-memory Bloom filter keyed on Python's built-in str hash, with few
+    hash functions (more bits per item instead). add_many_new() checks a
+    whole batch at once, vectorized with NumPy when it is installed.
+    hash() is salted per interpreter run, so the filter can't be saved or
+    shared between processes.
+    """
+    def __init__(self, capacity=1000, fp_rate=BLOOM_FP_RATE, hashes=4):
+        capacity = max(1, capacity)
+        # bits for the target rate with a fixed hash count: m = -k n / ln(1 - p^(1/k))
+        bits = max(64, int(-hashes * capacity / math.log(1 - fp_rate ** (1 / hashes))))
+        super().__init__(capacity, fp_rate, bits=bits, hashes=hashes)
+
+    def _positions(self, item):
+        h = hash(item)
+        h1, h2 = h & 0xFFFFFFFF, ((h >> 32) & 0xFFFFFFFF) | 1
+        m = self.bits
+        return [(h1 + i * h2) % m for i in range(self.hashes)]
+
+    def add_many_new(self, items):
+        """Add a batch; returns the items that were new, in order."""
+        try:
+            import numpy as np  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return [item for item in items if self.add_new(item)]
+        if not items:
+            return []
+        hashes = np.fromiter((hash(item) for item in items), dtype=np.int64, count=len(items))
+        # first occurrence of each hash, so repeats inside the batch count as seen
+        _, first = np.unique(hashes, return_index=True)
+        first.sort()
+        h = hashes[first].view(np.uint64)
+        h1 = (h & np.uint64(0xFFFFFFFF))[:, None]
+        h2 = ((h >> np.uint64(32)) | np.uint64(1))[:, None]
+        pos = (h1 + np.arange(self.hashes, dtype=np.uint64) * h2) % np.uint64(self.bits)
+        array = np.frombuffer(self.array, dtype=np.uint8)
+        byte = (pos >> np.uint64(3)).astype(np.intp)
+        bit = (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8))
+        new = ~np.all(array[byte] & bit, axis=1)
+        np.bitwise_or.at(array, byte[new].ravel(), bit[new].ravel())
+        fresh = first[new]
+        self.count += len(fresh)
+        return [items[i] for i in fresh.tolist()]
+
+    def save(self, path, src_mtime=0.0, src_size=0):
+        raise TypeError("FastBloomFilter uses the per-process str hash and can't be saved")
+
+
+def load_blocklist_file(path, fp_rate=BLOOM_FP_RATE):
+    """
+    Lowercased entries of a one-per-line list: a frozenset for small files,
+    a Bloom filter (built once, cached as <path>.bloom) for big ones.
+    """
+    st = os.stat(path)
+    if st.st_size <= BLOOM_THRESHOLD_BYTES:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return frozenset(line.strip().lower() for line in f if line.strip())
+
+    cache_path = path + ".bloom"
+    bloom = BloomFilter.load(cache_path, st.st_mtime, st.st_size)
+    if bloom is not None:
+        return bloom
+    with open(path, 'rb') as f:
+        lines = sum(1 for _ in f)
+    bloom = BloomFilter(lines, fp_rate)
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word:
+                bloom.add(word)
+    try:
+        bloom.save(cache_path, st.st_mtime, st.st_size)
+    except OSError:
+        pass
+    return bloom
+
+
+class PasswordPolicy:
+    """
+    Length / character class / charset / blocklist rules compiled once.
+    min_classes counts lowercase, uppercase, digits and symbols.
+    """
+    def __init__(self, min_length=12, min_classes=3, symbols=VALID_SYMBOLS,
+                 blocklist=(), blocklist_files=(), enable_blocklist=True):
+        self.min_length = min_length
+        self.min_classes = min_classes
+        self.symbols = symbols
+        self.lower = frozenset(string.ascii_lowercase)
+        self.upper = frozenset(string.ascii_uppercase)
+        self.digits = frozenset(string.digits)
+        self.symbol_set = frozenset(symbols)
+        self.allowed = self.lower | self.upper | self.digits | self.symbol_set
+        self.enable_blocklist = enable_blocklist
+        self.blocklist = frozenset(b.lower() for b in blocklist)
+        self.external = [load_blocklist_file(p) for p in blocklist_files]
+
+    def is_blocked(self, pw):
+        lowered = pw.lower()
+        if lowered in self.blocklist:
+            return True
+        return any(lowered in extra for extra in self.external)
+
+    def check(self, pw, check_complexity=True):
+        """Reason code for one password, None when it passes."""
+        if not pw:
+            return "empty"
+
+        chars = set(pw)
+        if not chars <= self.allowed:
+            return "pattern"
+
+        if check_complexity:
+            if len(pw) < self.min_length:
+                return "complexity"
+            classes = ((not chars.isdisjoint(self.lower)) + (not chars.isdisjoint(self.upper))
+                       + (not chars.isdisjoint(self.digits)) + (not chars.isdisjoint(self.symbol_set)))
+            if classes < self.min_classes:
+                return "complexity"
+
+            if self.enable_blocklist and self.is_blocked(pw):
+                return "blocklist"
+
+        return None
+
+    def fragment(self, text):
+        """
+        (length, class count bits, charset ok) of part of a password. Parts
+        combine with check_fragments(), so generators can check a template
+        once instead of every candidate built from it.
+        """
+        chars = set(text)
+        mask = ((not chars.isdisjoint(self.lower)) | (not chars.isdisjoint(self.upper)) << 1
+                | (not chars.isdisjoint(self.digits)) << 2 | (not chars.isdisjoint(self.symbol_set)) << 3)
+        return len(text), mask, chars <= self.allowed
+
+    def check_fragments(self, *fragments):
+        """Reason code for the concatenation of fragments (blocklist not applied)."""
+        length = sum(f[0] for f in fragments)
+        if not length:
+            return "empty"
+        if not all(f[2] for f in fragments):
+            return "pattern"
+        mask = 0
+        for f in fragments:
+            mask |= f[1]
+        if length < self.min_length or bin(mask).count("1") < self.min_classes:
+            return "complexity"
+        return None
+
+    def validate(self, pw, check_complexity=True):
+        """ (is_valid, reason) like the generator's validate_password """
+        reason = self.check(pw, check_complexity)
+        return reason is None, reason
+
+    def validate_many(self, passwords, check_complexity=True):
+        """Batch API: one reason code (None = valid) per password, in order."""
+        allowed = self.allowed
+        lower, upper, digits, symbols = self.lower, self.upper, self.digits, self.symbol_set
+        min_length, min_classes = self.min_length, self.min_classes
+        blocklist, external = self.blocklist, self.external
+        use_blocklist = self.enable_blocklist
+        results = []
+        append = results.append
+        for pw in passwords:
+            if not pw:
+                append("empty")
+                continue
+            chars = set(pw)
+            if not chars <= allowed:
+                append("pattern")
+                continue
+            if check_complexity:
+                if len(pw) < min_length or ((not chars.isdisjoint(lower)) + (not chars.isdisjoint(upper))
+                                            + (not chars.isdisjoint(digits))
+                                            + (not chars.isdisjoint(symbols))) < min_classes:
+                    append("complexity")
+                    continue
+                if use_blocklist:
+                    lowered = pw.lower()
+                    if lowered in blocklist or any(lowered in extra for extra in external):
+                        append("blocklist")
+                        continue
+            append(None)
+        return results
+
+
+def study_policy():
+    """ the rules password_generator enforces, for every tool that reports compliance """
+    return PasswordPolicy(blocklist=BLOCKLIST, blocklist_files=BLOCKLIST_FILES,
+                          enable_blocklist=ENABLE_BLOCKLIST)
+
+
+def benchmark(count=1_000_000, blocklist_files=()):
+    """ time validate() and validate_many() on synthetic candidates """
+    rng = random.Random(0)
+    alphabet = string.ascii_letters + string.digits + VALID_SYMBOLS + " é"
+    candidates = ["".join(rng.choices(alphabet, k=rng.randint(6, 24))) for _ in range(count)]
+    policy = PasswordPolicy(blocklist=["password", "welcome1!"], blocklist_files=blocklist_files)
+
+    start = time.perf_counter()
+    single = [policy.check(pw) for pw in candidates]
+    t_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = policy.validate_many(candidates)
+    t_batch = time.perf_counter() - start
+
+    assert single == batch
+    valid = sum(1 for r in batch if r is None)
+    print(f"Candidates: {count} ({valid} valid)")
+    print(f"validate():      {count / t_single:,.0f} passwords/s")
+    print(f"validate_many(): {count / t_batch:,.0f} passwords/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "bench":
+        print(f"Usage: python {os.path.basename(sys.argv[0])} bench [count] [blocklist.txt]")
+        sys.exit(1)
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    benchmark(n, sys.argv[3:4])
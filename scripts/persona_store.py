@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL persistence for generated personas.
+Each accepted batch is appended as one write and fsync'd, so a crash can
+lose at most the batch in flight and never corrupts earlier data; a torn
+final line is detected and cut off on the next open. The legacy
+personas.json / credentials.csv files are produced by an explicit export.
+Usage: python persona_store.py <personas.jsonl> [personas.json] [credentials.csv]
+"""
+import os
+import csv
+import sys
+import json
+import textwrap
+
+OUTPUT_JSONL = "personas.jsonl"
+
+
+def credential_rows(p):
+    """ the two credentials.csv rows (user_id, password) of a persona """
+    return [(p['personal_email'], p['personal_password']), (p['work_lanid'], p['work_password'])]
+
+
+class PersonaStore:
+    """personas.jsonl: one persona JSON object per line, append only."""
+    def __init__(self, path=OUTPUT_JSONL):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def repair(self):
+        """
+        Cut off a torn trailing record left by a crash mid-append.
+        Returns the number of bytes dropped.
+        """
+        if not self.exists():
+            return 0
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            # walk back to the last newline, the only safe record boundary
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                block = f.read(step)
+                idx = block.rfind(b"\n")
+                if idx != -1:
+                    pos = pos - step + idx + 1
+                    break
+                pos -= step
+            else:
+                pos = 0
+            if pos == size:
+                return 0
+            f.truncate(pos)
+            f.flush()
+            os.fsync(f.fileno())
+        return size - pos
+
+    def __iter__(self):
+        """Stream personas one at a time, without loading the whole file."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{self.path}:{line_no}: corrupt record ({e})") from e
+
+    def append(self, personas):
+        """Durably append a batch (one write + fsync)."""
+        if not personas:
+            return
+        data = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in personas)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def import_legacy_json(self, json_path):
+        """One-time migration of a pretty-printed personas.json list."""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            personas = json.load(f)
+        self.append(personas)
+        return len(personas)
+
+    def export(self, json_path=None, csv_path=None):
+        """
+        Stream the store out to the legacy formats: personas.json (a list,
+        indent=4, as json.dump wrote it) and credentials.csv. Both are written
+        to a temp file and renamed, so readers never see a partial file.
+        """
+        outputs = []
+        json_f = csv_f = writer = None
+        try:
+            if json_path:
+                json_f = open(json_path + ".tmp", 'w', encoding='utf-8')
+                outputs.append((json_f, json_path))
+            if csv_path:
+                csv_f = open(csv_path + ".tmp", 'w', encoding='utf-8', newline='')
+                outputs.append((csv_f, csv_path))
+                writer = csv.writer(csv_f, quoting=csv.QUOTE_ALL)
+                writer.writerow(["user_id", "password"])
+
+            count = 0
+            for p in self:
+                if json_f:
+                    json_f.write("[\n" if count == 0 else ",\n")
+                    json_f.write(textwrap.indent(json.dumps(p, indent=4), "    "))
+                if writer:
+                    writer.writerows(credential_rows(p))
+                count += 1
+            if json_f:
+                json_f.write("\n]" if count else "[]")
+        finally:
+            for f, _ in outputs:
+                f.close()
+        for f, final_path in outputs:
+            os.replace(final_path + ".tmp", final_path)
+        return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3, 4):
+        print(f"Usage: python {os.path.basename(sys.argv[0])} <personas.jsonl> [personas.json] [credentials.csv]")
+        sys.exit(1)
+
+    store = PersonaStore(sys.argv[1])
+    dropped = store.repair()
+    if dropped:
+        print(f"⚠️  Dropped a torn {dropped} byte record at the end of {store.path}")
+    json_out = sys.argv[2] if len(sys.argv) > 2 else "personas.json"
+    csv_out = sys.argv[3] if len(sys.argv) > 3 else "credentials.csv"
+    n = store.export(json_out, csv_out)
+    print(f"✅ Exported {n} personas to {json_out} and {csv_out}")
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Single-process streaming pipeline: generate (or read) → HIBP enrich →
+hash dumps → sample.
+
+Credentials flow in chunks through bounded queues between stage threads,
+so HIBP lookups (network bound), hashing (CPU bound, in a process pool)
+and sampling overlap, and a slow stage holds back the ones in front of it
+instead of everything being buffered. The CSV is parsed once. Writes the
+same files as running the scripts one after another:
+  checked_credentials.csv                       (check_hibp_csv.py)
+  shadow.txt, pwdump.txt, md5.txt, ...          (create_hashdumps.py)
+  sample_shadow.txt, sample_pwdump.txt, ...     (sample.py --aligned)
+With the same --seed the samples match `sample.py --aligned` run on the
+files in --formats order.
+
+Usage: python pipeline.py credentials.csv [--formats md5,sha1] [--sample 25%]
+       python pipeline.py --generate [--fake] [--target 200]
+"""
+import os
+import csv
+import sys
+import time
+import queue
+import random
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import hibp
+import metrics
+import check_hibp_csv
+import create_hashdumps
+from create_hashdumps import FORMATS, DEFAULT_FORMATS, START_UID, WRITE_BUFFER, parse_formats
+from hibp_cache import MemoryRangeCache
+from password_policy import study_policy
+from persona_store import PersonaStore, credential_rows
+from sample import stream_sample, parse_sample_size, output_name_for
+
+SOURCE_CHUNK = 256      # rows per message between stages
+QUEUE_SIZE = 16         # messages per queue: bounds memory, blocks the producer when full
+ENRICH_BATCH = 2048     # rows per bulk HIBP lookup, when that many are already queued
+DEFAULT_SAMPLE = "25%"
+GENERATED_CSV = "credentials.csv"
+END = None
+
+
+class PipelineAborted(Exception):
+    """ raised in every stage once another stage has failed """
+
+
+class Pipeline:
+    """ stage threads, the queues between them and per-stage wait accounting """
+    def __init__(self):
+        self.abort = threading.Event()
+        self.errors = []
+        self.fieldnames = None
+        self.waited = {}
+        self.elapsed = {}
+        self.threads = []
+
+    def queue(self):
+        return queue.Queue(maxsize=QUEUE_SIZE)
+
+    def _wait(self, stage, op):
+        start = time.perf_counter()
+        try:
+            while True:
+                if self.abort.is_set():
+                    raise PipelineAborted()
+                try:
+                    return op()
+                except (queue.Full, queue.Empty):
+                    continue
+        finally:
+            self.waited[stage] = self.waited.get(stage, 0.0) + time.perf_counter() - start
+
+    def put(self, stage, q, item):
+        self._wait(stage, lambda: q.put(item, timeout=0.2))
+
+    def send(self, stage, outboxes, item):
+        """ fan one message out to every downstream queue """
+        for q in outboxes:
+            self.put(stage, q, item)
+
+    def get(self, stage, q):
+        return self._wait(stage, lambda: q.get(timeout=0.2))
+
+    def drain(self, stage, q):
+        """ messages until END """
+        while True:
+            item = self.get(stage, q)
+            if item is END:
+                return
+            yield item
+
+    def start(self, name, func, *args):
+        def run():
+            start = time.perf_counter()
+            try:
+                func(self, *args)
+            except PipelineAborted:
+                pass
+            except BaseException as e:
+                self.errors.append(f"{name}: {e}")
+                self.abort.set()
+            finally:
+                self.elapsed[name] = time.perf_counter() - start
+                metrics.observe("pipeline_stage_seconds", self.elapsed[name], stage=name)
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def join(self):
+        try:
+            for thread in self.threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.errors.append("interrupted")
+            self.abort.set()
+            for thread in self.threads:
+                thread.join()
+
+    def busy_lines(self):
+        """ time each stage spent working rather than waiting on a queue """
+        return [f"{name}: {self.elapsed[name] - self.waited.get(name, 0.0):.1f}s busy"
+                for name in self.elapsed]
+
+
+# --- sources ---
+def csv_source(pipe, input_file, outboxes):
+    """ stream an existing credentials CSV """
+    with open(input_file, mode='r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        pipe.fieldnames = (reader.fieldnames or ["user_id", "password"]) + ['pwned']
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= SOURCE_CHUNK:
+                pipe.send("source", outboxes, chunk)
+                chunk = []
+        if chunk:
+            pipe.send("source", outboxes, chunk)
+    pipe.send("source", outboxes, END)
+
+
+def generate_source(pipe, outboxes, sector, concurrency, fake, fake_latency, target):
+    """ resume from the persona store, then stream every batch the generator accepts """
+    import asyncio                      # pylint: disable=import-outside-toplevel
+    import password_generator as pg     # needs google-genai once a request is made
+    pipe.fieldnames = ["user_id", "password", "pwned"]
+    if target:
+        pg.TARGET_COUNT = target
+    model_client = pg.client
+    if fake:
+        from fake_model import FakeClient
+        model_client = FakeClient(latency=fake_latency)
+
+    def rows_of(personas):
+        return [{"user_id": user, "password": pw} for p in personas for user, pw in credential_rows(p)]
+
+    store = PersonaStore(pg.OUTPUT_JSONL)
+    # before the snapshot, so personas from a legacy personas.json go downstream too
+    pg.migrate_legacy(store)
+    store.repair()
+    chunk = []
+    for p in store:
+        chunk.extend(rows_of([p]))
+        if len(chunk) >= SOURCE_CHUNK:
+            pipe.send("source", outboxes, chunk)
+            chunk = []
+    if chunk:
+        pipe.send("source", outboxes, chunk)
+
+    def on_batch(batch):
+        try:
+            pipe.send("source", outboxes, rows_of(batch))
+        except PipelineAborted:
+            pg.TARGET_COUNT = 0     # ends the generation loop after this batch
+
+    if concurrency > 1:
+        limiter = pg.ModelRateLimiter(pg.RATE_LIMIT_RPM, pg.RATE_LIMIT_RPD, pg.RATE_LIMIT_TPM)
+        asyncio.run(pg.run_study_async(sector, concurrency, limiter, model_client, on_batch))
+    else:
+        pg.run_study(sector, model_client, on_batch)
+    pipe.send("source", outboxes, END)
+
+
+# --- stages ---
+def enrich_stage(pipe, inbox, output_file, results, open_cache, concurrency, cache_only, index):
+    """ HIBP lookups in batches of whatever is queued, written to checked_*.csv in order """
+    cache = open_cache() or MemoryRangeCache()     # sqlite connections stay in their thread
+    policy = study_policy()
+    totals = check_hibp_csv.new_totals()
+    outfile = writer = None
+    try:
+        done = False
+        while not done:
+            rows = pipe.get("enrich", inbox)
+            if rows is END:
+                rows, done = [], True
+            while not done and len(rows) < ENRICH_BATCH:
+                try:
+                    more = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if more is END:
+                    done = True
+                else:
+                    rows = rows + more
+            if writer is None:
+                outfile = open(output_file, mode='w', encoding='utf-8', newline='')
+                writer = csv.DictWriter(outfile, fieldnames=pipe.fieldnames, quoting=csv.QUOTE_ALL)
+                writer.writeheader()
+            if not rows:
+                continue
+            passwords = [row.get('password', '') for row in rows]
+            with metrics.timer("hibp_lookup_seconds"):
+                counts = hibp.lookup_counts(passwords, concurrency, cache=cache,
+                                            cache_only=cache_only, index=index)
+            compliant = [reason is None for reason in policy.validate_many(passwords)]
+            check_hibp_csv.enrich_rows(rows, counts, compliant, writer, totals, verbose=False)
+    finally:
+        if outfile is not None:
+            outfile.close()
+        cache.close()
+    results["enrich"] = (totals, cache)
+
+
+def hash_stage(pipe, inbox, sample_box, formats, workers, rounds, bcrypt_rounds, results):
+    """ hash every row into the dump files, passing the written lines on to sampling """
+    create_hashdumps.configure_hashers(rounds, bcrypt_rounds)
+    pool = None
+    if workers > 1:
+        # spawn: forking a process that already runs network threads is not safe
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=create_hashdumps.init_worker,
+                                   initargs=(rounds, bcrypt_rounds))
+
+    def chunks():
+        i = 0
+        for rows in pipe.drain("hash", inbox):
+            items = []
+            for row in rows:
+                password = row.get('password', '')
+                if password:
+                    items.append((row.get('user_id', f'user_{i}'), password, START_UID + i))
+                i += 1
+            yield i, items
+
+    writers = {}
+    entries = 0
+    try:
+        for name in formats:
+            writers[name] = open(FORMATS[name][0], "wb", buffering=WRITE_BUFFER)
+        for _, n, (lines, seconds) in create_hashdumps.ordered_results(pool, formats, chunks(),
+                                                                        workers * 4):
+            for name, data in lines.items():
+                writers[name].write(data)
+                metrics.inc("hash_seconds_total", seconds[name], format=name)
+                metrics.inc("hash_entries_total", n, format=name)
+            entries += n
+            if sample_box is not None and n:
+                columns = [lines[name].decode('utf-8').splitlines(keepends=True) for name in formats]
+                pipe.put("hash", sample_box, list(zip(*columns)))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        for w in writers.values():
+            w.close()
+    if sample_box is not None:
+        pipe.put("hash", sample_box, END)
+    results["hash"] = entries
+
+
+def sample_stage(pipe, inbox, requested_size, formats, seed, results):
+    """ one aligned sample over the hashed rows, like sample.py --aligned """
+    rng = random.Random(seed)
+    rows = (row for block in pipe.drain("sample", inbox) for row in block)
+    sample_data, total_lines = stream_sample(rows, requested_size, rng)
+    written = []
+    for column, name in enumerate(formats):
+        output_name = output_name_for(FORMATS[name][0])
+        with open(output_name, 'w', encoding='utf-8') as f_out:
+            f_out.writelines(row[column] for _, row in sample_data)
+        written.append(output_name)
+    results["sample"] = (written, len(sample_data), total_lines)
+
+
+def run_pipeline(input_file=None, generate=None, formats=None, workers=None, rounds=None,
+                 bcrypt_rounds=None, sample_size=DEFAULT_SAMPLE, seed=None, open_cache=lambda: None,
+                 concurrency=hibp.DEFAULT_CONCURRENCY, cache_only=False, index=None):
+    """
+    main entry: input_file streams a CSV; generate is a dict of generator
+    options (sector, concurrency, fake, fake_latency, target) instead.
+    """
+    formats = list(formats or DEFAULT_FORMATS)
+    workers = workers or os.cpu_count() or 1
+    source_name = input_file or GENERATED_CSV
+    output_file = f"checked_{os.path.basename(source_name)}"
+    pipe = Pipeline()
+    results = {}
+    start = time.perf_counter()
+
+    enrich_box, hash_box = pipe.queue(), pipe.queue()
+    sample_box = pipe.queue() if sample_size else None
+    print(f"--- Pipeline: {'generator' if generate else source_name} → HIBP → "
+          f"{', '.join(formats)}{' → sample ' + sample_size if sample_size else ''} "
+          f"({workers} hashing worker{'s' if workers > 1 else ''}) ---")
+
+    if generate is not None:
+        pipe.start("source", generate_source, [enrich_box, hash_box], generate["sector"],
+                   generate["concurrency"], generate["fake"], generate["fake_latency"],
+                   generate["target"])
+    else:
+        pipe.start("source", csv_source, input_file, [enrich_box, hash_box])
+    pipe.start("enrich", enrich_stage, enrich_box, output_file, results, open_cache,
+               concurrency, cache_only, index)
+    pipe.start("hash", hash_stage, hash_box, sample_box, formats, workers, rounds,
+               bcrypt_rounds, results)
+    if sample_box is not None:
+        pipe.start("sample", sample_stage, sample_box, sample_size, formats, seed, results)
+    pipe.join()
+
+    if pipe.errors:
+        for error in pipe.errors:
+            print(f"❌ Pipeline stopped, {error}")
+        return False
+
+    totals, cache = results["enrich"]
+    check_hibp_csv.print_report(totals, source_name, output_file,
+                                cache if cache.hits or cache.misses else None)
+    for name in formats:
+        print(f"✅ Created {FORMATS[name][0]} ({results['hash']} entries)")
+    if "sample" in results:
+        written, kept, total = results["sample"]
+        for output_name in written:
+            print(f"✅ Created {output_name}: Sampled {kept} of {total} records ({sample_size}, aligned)")
+    wall = time.perf_counter() - start
+    print(f"--- Done in {wall:.1f}s | {' | '.join(pipe.busy_lines())} ---")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Stream credentials through HIBP enrichment, hash dumps and sampling in one process.")
+    parser.add_argument("input_file", nargs="?", help="credentials.csv (omit with --generate)")
+    parser.add_argument("--generate", action="store_true",
+                        help="run the persona generator as the source (resumes from personas.jsonl)")
+    parser.add_argument("--sector", help="with --generate: study this sector exclusively")
+    parser.add_argument("--gen-concurrency", type=int, default=1,
+                        help="with --generate: model requests in flight (default: %(default)s)")
+    parser.add_argument("--fake", action="store_true", help="with --generate: use the offline fake model")
+    parser.add_argument("--fake-latency", type=float, default=0.5,
+                        help="mean fake response time in seconds (default: %(default)s)")
+    parser.add_argument("--target", type=int, help="with --generate: personas to reach (default: TARGET_COUNT)")
+    parser.add_argument("--formats", type=parse_formats, default=DEFAULT_FORMATS,
+                        help=f"hash formats, as for create_hashdumps.py (default: {','.join(DEFAULT_FORMATS)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="hashing processes, 1 = hash in the pipeline thread (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, help="SHA-512 crypt rounds for shadow.txt")
+    parser.add_argument("--bcrypt-rounds", type=int, help="bcrypt log2 cost for bcrypt.txt")
+    parser.add_argument("--sample", default=DEFAULT_SAMPLE,
+                        help="sample size for sample_*.txt, 250 or 10%% (default: %(default)s)")
+    parser.add_argument("--no-sample", action="store_true", help="skip the sampling stage")
+    parser.add_argument("--seed", type=int, help="random seed for the sample")
+    hibp.add_cli_options(parser)
+    metrics.add_cli_options(parser)
+    args = parser.parse_args()
+
+    if bool(args.input_file) == args.generate:
+        parser.error("give either a credentials CSV or --generate")
+    if args.input_file and not os.path.isfile(args.input_file):
+        print(f"Error: File '{args.input_file}' not found.")
+        sys.exit(1)
+    sample_size = None if args.no_sample else args.sample
+    if sample_size:
+        parse_sample_size(sample_size)      # exits on a bad size before anything starts
+    metrics.configure(args)
+    # open once here so bad flag combinations fail now; the stage opens its own connection
+    range_cache = hibp.open_cache(args)
+    if range_cache is not None:
+        range_cache.close()
+    generator_options = None
+    if args.generate:
+        generator_options = {"sector": args.sector, "concurrency": args.gen_concurrency,
+                             "fake": args.fake, "fake_latency": args.fake_latency,
+                             "target": args.target}
+
+    ok = run_pipeline(args.input_file, generator_options, args.formats, args.workers, args.rounds,
+                      args.bcrypt_rounds, sample_size, args.seed, lambda: hibp.open_cache(args),
+                      args.concurrency, args.cache_only, hibp.open_index(args))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,102 @@
+"""
+asyncio token-bucket limiter for model quotas (RPM, RPD and tokens per minute).
+Every request takes one slot from the RPM and RPD buckets and an estimated
+token count from the TPM bucket; once the real usage is known the estimate
+is settled so the TPM bucket tracks what was actually spent.
+Quota errors pause every caller with exponential backoff.
+"""
+import time
+import random
+import asyncio
+import metrics
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` per second."""
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def give_back(self, amount):
+        """Return over-estimated tokens (or take more when amount < 0)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ModelRateLimiter:
+    """
+    Shared limiter for all in-flight generation tasks.
+    rpm / rpd: requests per minute / day, tpm: tokens per minute (0 = off).
+    """
+    def __init__(self, rpm, rpd=0, tpm=0, backoff_base=2.0, backoff_max=120.0):
+        self.buckets = {"rpm": TokenBucket(rpm, rpm / 60.0)}
+        if rpd:
+            self.buckets["rpd"] = TokenBucket(rpd, rpd / 86400.0)
+        if tpm:
+            self.buckets["tpm"] = TokenBucket(tpm, tpm / 60.0)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.quota_errors = 0
+        self.paused_until = 0.0
+        self.waited = 0.0
+        self.lock = asyncio.Lock()
+
+    def _cost(self, name, tokens):
+        return tokens if name == "tpm" else 1
+
+    async def acquire(self, estimated_tokens=0):
+        """Wait until a request costing `estimated_tokens` may be sent."""
+        async with self.lock:
+            while True:
+                pause = max(self.paused_until - time.monotonic(), 0.0)
+                delay = pause
+                for name, bucket in self.buckets.items():
+                    delay = max(delay, bucket.delay_for(self._cost(name, estimated_tokens)))
+                if delay <= 0:
+                    break
+                self.waited += delay
+                metrics.inc("sleep_seconds_total", delay,
+                            reason="quota_backoff" if pause >= delay else "rate_limit")
+                await asyncio.sleep(delay)
+            for name, bucket in self.buckets.items():
+                bucket.take(self._cost(name, estimated_tokens))
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct the TPM bucket once the response's real usage is known."""
+        if "tpm" in self.buckets and actual_tokens:
+            self.buckets["tpm"].give_back(estimated_tokens - actual_tokens)
+
+    def quota_exceeded(self, attempt):
+        """
+        Record a quota error and pause everyone. Returns the delay applied:
+        backoff_base * 2^attempt with jitter, capped at backoff_max.
+        """
+        self.quota_errors += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay *= random.uniform(0.5, 1.0)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+
+def is_quota_error(error):
+    """ google-genai raises APIError with code 429 / RESOURCE_EXHAUSTED """
+    return getattr(error, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(error)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Root extraction and clustering for the study data.
+
+Every password is split into prefix / core / suffix (the leading and
+trailing runs of digits and symbols), and the core is de-leeted and
+lowercased into its root: 'P1zz@l0v3r*2025' -> 'pizzalover' + '*2025'.
+For persona pairs the shared root of personal_password and work_password
+is found and the transformation between them is labelled (case, leet,
+prefix, suffix, expansion, new_root).
+
+Roots are then clustered across the whole dataset: most frequent roots
+become cluster leaders, and every other root joins the nearest leader
+within a small edit distance. Candidates come from a character 3-gram
+index probed with each root's rarest grams only (prefix filtering), and
+distances are computed per batch, vectorized with NumPy when available.
+
+Usage:
+    python root_analysis.py personas.json          (or personas.jsonl)
+    python root_analysis.py --wordlist rockyou.txt [--min-count 2]
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import argparse
+import difflib
+import importlib.util
+from collections import Counter, defaultdict
+from persona_store import PersonaStore
+
+# numpy is optional (pure Python edit distance fallback) and imported on
+# first use, since it adds ~100ms to the startup of every importing tool
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+# '!' is left out: inside a password it is far more often a separator than an i
+LEET_UNDO = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s",
+                           "7": "t", "@": "a", "$": "s"})
+AFFIXES = re.compile(r"^([^A-Za-z]*)(.*?)([^A-Za-z]*)$", re.DOTALL)
+NON_LETTERS = re.compile(r"[^a-z]+")
+NON_ALPHA = re.compile(r"[^A-Za-z]+")
+NGRAM = 3
+MIN_ROOT = 3            # shorter common substrings don't count as a shared root
+MIN_CLUSTER_ROOT = 4    # shorter roots are left in their own cluster
+NUMPY_MIN_BATCH = 32    # below this the pure Python loop is faster
+PAIRS_FILE = "root_pairs.csv"
+CLUSTERS_FILE = "root_clusters.csv"
+
+
+class Decomposed:
+    """ prefix + core + suffix of one password, plus the core's root (and its cased form) """
+    __slots__ = ("prefix", "core", "suffix", "root", "cased", "leet")
+
+    def __init__(self, password):
+        self.prefix, self.core, self.suffix = AFFIXES.match(password).groups()
+        if not self.core:
+            # all digits/symbols ('123456'): nothing to de-leet, the whole thing is the root
+            self.core, self.prefix, self.suffix = self.prefix + self.suffix, "", ""
+            self.root = self.cased = self.core
+        else:
+            self.cased = NON_ALPHA.sub("", self.core.translate(LEET_UNDO))
+            self.root = self.cased.lower()
+        self.leet = sum(1 for c in self.core if not c.isalpha() and c.translate(LEET_UNDO) != c)
+
+
+def decompose(password):
+    return Decomposed(password or "")
+
+
+def shared_root(a, b):
+    """ longest common substring of two roots, None if too short to be the same idea """
+    if not a or not b:
+        return None
+    match = difflib.SequenceMatcher(None, a, b, autojunk=False).find_longest_match(0, len(a), 0, len(b))
+    if match.size < MIN_ROOT or match.size * 2 < min(len(a), len(b)):
+        return None
+    return a[match.a:match.a + match.size]
+
+
+def classify_pair(personal, work):
+    """
+    Describe how `work` was derived from `personal`.
+    Returns (shared root or None, '+'-joined transformation tags).
+    """
+    if personal == work:
+        return decompose(personal).root or None, "identical"
+    p, w = decompose(personal), decompose(work)
+    root = shared_root(p.root, w.root)
+    if root is None:
+        return None, "new_root"
+    tags = []
+    p_at, w_at = p.root.find(root), w.root.find(root)
+    if p.cased[p_at:p_at + len(root)] != w.cased[w_at:w_at + len(root)]:
+        tags.append("case")
+    if w.leet > p.leet:
+        tags.append("leet")
+    if w.prefix and w.prefix != p.prefix:
+        tags.append("prefix")
+    if w.suffix and w.suffix != p.suffix:
+        tags.append("suffix")
+    if len(w.root) > len(p.root):
+        tags.append("expansion")
+    return root, "+".join(tags) or "none"
+
+
+# --- edit distance ---
+def edit_distance(a, b, limit=None):
+    """
+    Levenshtein distance. With a limit only the diagonal band of width
+    2 * limit + 1 is filled and anything over the limit returns limit + 1.
+    """
+    n, m = len(a), len(b)
+    if limit is None:
+        limit = max(n, m)
+    over = limit + 1
+    if abs(n - m) > limit:
+        return over
+    prev = [j if j <= limit else over for j in range(m + 1)]
+    for i in range(1, n + 1):
+        ca = a[i - 1]
+        lo, hi = max(1, i - limit), min(m, i + limit)
+        cur = [over] * (m + 1)
+        if i <= limit:
+            cur[0] = i
+        best = cur[lo - 1]
+        for j in range(lo, hi + 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+            cur[j] = d
+            if d < best:
+                best = d
+        if best > limit:
+            return over
+        prev = cur
+    return min(prev[m], over)
+
+
+def _edit_distances_numpy(query, candidates):
+    """
+    One DP row per query character, computed for all candidates at once;
+    the insertion chain along a row is a running minimum.
+    """
+    global np
+    if np is None:
+        import numpy as np  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    lens = np.fromiter((len(c) for c in candidates), dtype=np.int64, count=len(candidates))
+    width = int(lens.max())
+    chars = np.zeros((len(candidates), width), dtype=np.uint32)
+    for k, c in enumerate(candidates):
+        chars[k, :len(c)] = np.frombuffer(c.encode('utf-32-le'), dtype=np.uint32)
+    cols = np.arange(width + 1)
+    prev = np.tile(cols, (len(candidates), 1))
+    row = np.empty_like(prev)
+    for i, ch in enumerate(np.frombuffer(query.encode('utf-32-le'), dtype=np.uint32), 1):
+        row[:, 0] = i
+        np.minimum(prev[:, 1:] + 1, prev[:, :-1] + (chars != ch), out=row[:, 1:])
+        prev = np.minimum.accumulate(row - cols, axis=1) + cols
+    return prev[np.arange(len(candidates)), lens].tolist()
+
+
+def edit_distances(query, candidates, limit=None):
+    """ distances from query to every candidate, batched with NumPy when it pays off """
+    if HAVE_NUMPY and len(candidates) >= NUMPY_MIN_BATCH:
+        return _edit_distances_numpy(query, candidates)
+    return [edit_distance(query, c, limit) for c in candidates]
+
+
+# --- clustering ---
+def max_distance(length):
+    """ edits allowed between two roots, by the shorter root's length """
+    return 1 if length < 8 else 2
+
+
+def ngrams(root, size=NGRAM):
+    padded = f"^{root}$"
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def cluster_roots(root_counts):
+    """
+    Leader clustering of roots, most frequent first.
+    Returns {root: leader root}; each leader maps to itself.
+    """
+    ranked = sorted(root_counts, key=lambda r: (-root_counts[r], r))
+    gram_sets = {r: ngrams(r) for r in ranked if len(r) >= MIN_CLUSTER_ROOT}
+    doc_freq = Counter(g for grams in gram_sets.values() for g in grams)
+
+    leaders = []
+    index = defaultdict(list)    # 3-gram -> leader ids
+    cluster_of = {}
+    for root in ranked:
+        if root not in gram_sets:
+            cluster_of[root] = root
+            continue
+        n = len(root)
+        limit = max_distance(n)
+        # an edit touches at most NGRAM grams, so a match shares >= need of ours and
+        # must contain at least one of our len(grams) - need + 1 rarest ones
+        grams = sorted(gram_sets[root], key=doc_freq.__getitem__)
+        need = len(grams) - NGRAM * limit
+        probe = grams[:len(grams) - need + 1] if need > 0 else grams
+        candidates = set()
+        for g in probe:
+            candidates.update(index.get(g, ()))
+        # length and count filters before any distance is computed
+        query = gram_sets[root]
+        candidates = [j for j in candidates if abs(len(leaders[j]) - n) <= limit
+                      and len(query & gram_sets[leaders[j]]) >= need]
+
+        best = None
+        if candidates:
+            names = [leaders[j] for j in candidates]
+            for name, dist in zip(names, edit_distances(root, names, limit)):
+                if dist <= max_distance(min(n, len(name))) and (best is None or dist < best[1]):
+                    best = (name, dist)
+        if best is not None:
+            cluster_of[root] = best[0]
+            continue
+
+        cluster_of[root] = root
+        for g in grams:
+            index[g].append(len(leaders))
+        leaders.append(root)
+    return cluster_of
+
+
+def cluster_totals(root_counts, cluster_of):
+    """ Counter of leader -> total occurrences of every root in its cluster """
+    totals = Counter()
+    for root, count in root_counts.items():
+        totals[cluster_of[root]] += count
+    return totals
+
+
+# --- inputs ---
+def load_personas(path):
+    """ personas from personas.json (a list), the personas.jsonl store or a study.parquet """
+    if path.endswith(".jsonl"):
+        return list(PersonaStore(path))
+    if path.endswith(".parquet"):
+        # only the columns the analysis needs; pyarrow is optional
+        from study_store import load_personas as load_study
+        return load_study(path, ["sector", "behavior_tag", "personal_password", "work_password"])
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def analyze_personas(personas):
+    """ per-persona rows with roots, clusters and transformations """
+    rows = []
+    for p in personas:
+        personal, work = p.get('personal_password', ''), p.get('work_password', '')
+        root, transformation = classify_pair(personal, work)
+        rows.append({
+            "sector": p.get('sector', 'Unknown'),
+            "behavior_tag": p.get('behavior_tag', 'Unknown'),
+            "personal_password": personal,
+            "work_password": work,
+            "personal_root": decompose(personal).root,
+            "shared_root": root or "",
+            "transformation": transformation,
+            "length_added": len(work) - len(personal),
+        })
+    root_counts = Counter(r["personal_root"] for r in rows if r["personal_root"])
+    cluster_of = cluster_roots(root_counts)
+    for r in rows:
+        r["root_cluster"] = cluster_of.get(r["personal_root"], "")
+    return rows, root_counts, cluster_of
+
+
+def print_group_report(rows, key, top=5):
+    groups = defaultdict(list)
+    for r in rows:
+        groups[r[key]].append(r)
+    print(f"\n--- BY {key.upper()} ---")
+    for name, members in sorted(groups.items(), key=lambda kv: -len(kv[1])):
+        shared = sum(1 for r in members if r["shared_root"])
+        added = sum(r["length_added"] for r in members) / len(members)
+        print(f"{name}: {len(members)} personas, {shared / len(members):.1%} keep the personal root, "
+              f"+{added:.1f} chars on average")
+        transforms = Counter(r["transformation"] for r in members).most_common(top)
+        print("    transformations: " + ", ".join(f"{t} {c}" for t, c in transforms))
+        clusters = Counter(r["root_cluster"] for r in members if r["root_cluster"]).most_common(top)
+        print("    root clusters:   " + ", ".join(f"{t} {c}" for t, c in clusters))
+
+
+def write_clusters(path, root_counts, cluster_of):
+    """ root_clusters.csv: cluster, cluster total, root, root count """
+    totals = cluster_totals(root_counts, cluster_of)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["cluster", "cluster_count", "root", "count"])
+        for root in sorted(root_counts, key=lambda r: (-totals[cluster_of[r]], cluster_of[r], -root_counts[r])):
+            writer.writerow([cluster_of[root], totals[cluster_of[root]], root, root_counts[root]])
+    return totals
+
+
+def process_personas(path, pairs_file=PAIRS_FILE, clusters_file=CLUSTERS_FILE):
+    personas = load_personas(path)
+    rows, root_counts, cluster_of = analyze_personas(personas)
+
+    with open(pairs_file, 'w', encoding='utf-8', newline='') as f:
+        fieldnames = ["sector", "behavior_tag", "personal_password", "work_password", "personal_root",
+                      "shared_root", "root_cluster", "transformation", "length_added"]
+        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(rows)
+    totals = write_clusters(clusters_file, root_counts, cluster_of)
+
+    print(f"--- {len(rows)} personas, {len(root_counts)} personal roots in {len(totals)} clusters ---")
+    print("Top root clusters: " + ", ".join(f"{r} {c}" for r, c in totals.most_common(10)))
+    print_group_report(rows, "sector")
+    print_group_report(rows, "behavior_tag")
+    print(f"\n✅ Saved {pairs_file} and {clusters_file}")
+
+
+def process_wordlist(path, min_count=1, clusters_file=CLUSTERS_FILE):
+    """ roots and clusters of a plain password list (one per line, e.g. a dump) """
+    start = time.perf_counter()
+    root_counts = Counter()
+    entries = 0
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            pw = line.rstrip("\r\n")
+            if pw:
+                entries += 1
+                root = Decomposed(pw).root
+                if root:
+                    root_counts[root] += 1
+    if min_count > 1:
+        root_counts = Counter({r: c for r, c in root_counts.items() if c >= min_count})
+    parsed = time.perf_counter()
+    cluster_of = cluster_roots(root_counts)
+    totals = write_clusters(clusters_file, root_counts, cluster_of)
+    done = time.perf_counter()
+
+    print(f"--- {entries} passwords, {len(root_counts)} roots in {len(totals)} clusters "
+          f"(parse {parsed - start:.1f}s, cluster {done - parsed:.1f}s, "
+          f"{'NumPy' if HAVE_NUMPY else 'pure Python'} distances) ---")
+    for root, count in totals.most_common(25):
+        print(f"{root}: {count}")
+    print(f"\n✅ Saved {clusters_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Extract and cluster password roots from personas or a password list.")
+    parser.add_argument("input_file", help="personas.json / personas.jsonl, or a password list with --wordlist")
+    parser.add_argument("--wordlist", action="store_true", help="input is one password per line (e.g. a dump)")
+    parser.add_argument("--min-count", type=int, default=1,
+                        help="wordlist mode: only cluster roots seen at least this often (default: %(default)s)")
+    parser.add_argument("--pairs", default=PAIRS_FILE, help="per-persona output (default: %(default)s)")
+    parser.add_argument("--clusters", default=CLUSTERS_FILE, help="cluster output (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        if args.wordlist:
+            process_wordlist(args.input_file, args.min_count, args.clusters)
+        else:
+            process_personas(args.input_file, args.pairs, args.clusters)
+    except FileNotFoundError:
+        print(f"Error: File '{args.input_file}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
@@ -3,70 +3,181 @@
 Take a random sample from text files (fixed number or percentage).
 Usage: python sample.py <size> <file1> <file2> ...
 Example: python sample.py 10% shadow.txt pwdump.txt
+
+Files are streamed once, so memory stays O(sample size) however big the
+input is: fixed sizes use reservoir sampling (Algorithm L), percentages
+keep each line independently with that probability.
+With --aligned, all files are read in lock step and the same line numbers
+are picked from each, so sample_shadow.txt, sample_md5.txt, ... describe
+the same users.
 """
 import os
 import sys
 import math
 import random
+import argparse
+from itertools import zip_longest
+import metrics
 
-def get_sample_size(total_lines, requested):
-    """Calculate the final sample size based on integer or percentage string."""
+def parse_sample_size(requested):
+    """'250' -> ('count', 250), '10%' -> ('percent', 0.10)"""
     try:
         if requested.endswith('%'):
             percent = float(requested.strip('%')) / 100
-            size = math.ceil(total_lines * percent)
-        else:
-            size = int(requested)
-
-        # Ensure we don't try to sample more than exists
-        return max(0, min(size, total_lines))
+            if not 0 <= percent <= 1:
+                raise ValueError(requested)
+            return 'percent', percent
+        count = int(requested)
+        if count < 0:
+            raise ValueError(requested)
+        return 'count', count
     except ValueError:
         print(f"Error: Invalid sample size format '{requested}'. Use '250' or '10%'.")
         sys.exit(1)
 
-def process_sampling(requested_size, files):
+def _open_unit(rng):
+    """ uniform draw from (0, 1), safe to take the log of """
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+def reservoir_sample(items, k, rng):
+    """
+    Algorithm L (Li, 1994): uniform sample of k items from a stream in one
+    pass and O(k) memory, drawing O(k log(n/k)) random numbers instead of
+    one per item. Returns (sample of (index, item) in stream order, n).
+    """
+    reservoir = []
+    n = 0
+    if k <= 0:
+        return reservoir, sum(1 for _ in items)
+    it = iter(items)
+    for item in it:
+        reservoir.append((n, item))
+        n += 1
+        if n == k:
+            break
+    else:
+        return reservoir, n
+
+    w = math.exp(math.log(_open_unit(rng)) / k)
+    next_pick = n + math.floor(math.log(_open_unit(rng)) / math.log(1 - w))
+    for item in it:
+        if n == next_pick:
+            reservoir[rng.randrange(k)] = (n, item)
+            w *= math.exp(math.log(_open_unit(rng)) / k)
+            next_pick += 1 + math.floor(math.log(_open_unit(rng)) / math.log(1 - w))
+        n += 1
+    reservoir.sort(key=lambda pair: pair[0])
+    return reservoir, n
+
+def bernoulli_sample(items, p, rng):
+    """Keep each item independently with probability p. Returns (sample, n)."""
+    sample = []
+    n = 0
+    for n, item in enumerate(items, 1):
+        if rng.random() < p:
+            sample.append((n - 1, item))
+    return sample, n
+
+def stream_sample(items, requested, rng):
+    """ dispatch on the requested size: reservoir for counts, Bernoulli for % """
+    kind, value = parse_sample_size(requested)
+    if kind == 'percent':
+        return bernoulli_sample(items, value, rng)
+    return reservoir_sample(items, value, rng)
+
+def output_name_for(file_path):
+    """ sample_<name> in the current directory """
+    return f"sample_{os.path.basename(file_path)}"
+
+def process_sampling(requested_size, files, seed=None):
     """ main loop to process files """
+    rng = random.Random(seed)
     for file_path in files:
         if not os.path.isfile(file_path):
             print(f"Skipping: '{file_path}' (File not found)")
             continue
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            with metrics.timer("sample_file_seconds"), open(file_path, 'r', encoding='utf-8') as f:
+                sample_data, total_lines = stream_sample(f, requested_size, rng)
+            metrics.inc("sample_lines_read_total", total_lines)
+            metrics.inc("sample_lines_kept_total", len(sample_data))
 
-            total_lines = len(lines)
             if total_lines == 0:
                 print(f"Skipping: '{file_path}' (Empty file)")
                 continue
 
-            # Calculate how many records to pull
-            n = get_sample_size(total_lines, requested_size)
-
-            # Perform the random sample
-            sample_data = random.sample(lines, n)
-
             # Create the new filename
-            base_name = os.path.basename(file_path)
-            output_name = f"sample_{base_name}"
+            output_name = output_name_for(file_path)
 
             with open(output_name, 'w', encoding='utf-8') as f_out:
-                f_out.writelines(sample_data)
+                f_out.writelines(line for _, line in sample_data)
 
-            print(f"✅ Created {output_name}: Sampled {n} of {total_lines} records ({requested_size})")
+            print(f"✅ Created {output_name}: Sampled {len(sample_data)} of {total_lines} records ({requested_size})")
+            metrics.event("sample", file=file_path, output=output_name, kept=len(sample_data),
+                          total=total_lines, size=requested_size)
 
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python sample.py <number|percent> <file_paths...>")
-        print("Examples:")
-        print("  python sample.py 250 shadow.txt md5.txt")
-        print("  python sample.py 10% sha256.txt pwdump.txt")
-        sys.exit(1)
+def process_aligned_sampling(requested_size, files, seed=None):
+    """ sample the same line numbers from every file in a single pass """
+    rng = random.Random(seed)
+    existing = []
+    for file_path in files:
+        if os.path.isfile(file_path):
+            existing.append(file_path)
+        else:
+            print(f"Skipping: '{file_path}' (File not found)")
+    if not existing:
+        return
 
-    requested_val = sys.argv[1]
-    target_files = sys.argv[2:]
+    handles = [open(path, 'r', encoding='utf-8') for path in existing]
+    try:
+        rows = zip_longest(*handles)
+        with metrics.timer("sample_file_seconds", aligned="true"):
+            sample_data, total_lines = stream_sample(rows, requested_size, rng)
+        metrics.inc("sample_lines_read_total", total_lines * len(existing))
+        metrics.inc("sample_lines_kept_total", len(sample_data) * len(existing))
+    finally:
+        for f in handles:
+            f.close()
+
+    if total_lines == 0:
+        print("Skipping: all files are empty")
+        return
+
+    for column, file_path in enumerate(existing):
+        output_name = output_name_for(file_path)
+        picked = [row[column] for _, row in sample_data if row[column] is not None]
+        with open(output_name, 'w', encoding='utf-8') as f_out:
+            f_out.writelines(picked)
+        print(f"✅ Created {output_name}: Sampled {len(picked)} of {total_lines} records ({requested_size}, aligned)")
+        metrics.event("sample", file=file_path, output=output_name, kept=len(picked),
+                      total=total_lines, size=requested_size, aligned=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Take a random sample from text files (fixed number or percentage).",
+        epilog="Examples:\n"
+               "  python sample.py 250 shadow.txt md5.txt\n"
+               "  python sample.py 10% sha256.txt pwdump.txt\n"
+               "  python sample.py --aligned --seed 7 25% shadow.txt pwdump.txt md5.txt",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("size", help="number of lines (250) or percentage (10%%)")
+    parser.add_argument("files", nargs="+", help="files to sample")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible samples")
+    parser.add_argument("--aligned", action="store_true",
+                        help="pick the same line numbers from every file (one pass over all of them)")
+    metrics.add_cli_options(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
 
-    process_sampling(requested_val, target_files)
+    if args.aligned:
+        process_aligned_sampling(args.size, args.files, args.seed)
+    else:
+        process_sampling(args.size, args.files, args.seed)
@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+"""
+zxcvbn-style guessability scores for the study passwords.
+
+Each password is matched against ranked dictionaries, also after undoing
+leet and with case variations. It is also matched for keyboard walks,
+years and dates, and repeated chunks. The cheapest sequence of matches
+that covers the password, with brute force filling the gaps, gives the
+estimated number of guesses. log10(guesses) is then bucketed into
+zxcvbn's 0-4 score.
+
+The dictionaries are:
+- a small built-in list
+- optional ranked wordlists (--wordlist rockyou.txt, first --max-words lines)
+- the roots of the corpus' own personal passwords, ranked by frequency
+
+Each persona's name, email and lanid are also matched as user inputs.
+For the work password, so is the personal password. That is what gives
+away a 19+ character work password built on a known personal root.
+
+All dictionaries are compiled into one Aho-Corasick automaton. It is
+cached in AUTOMATON_CACHE and rebuilt only when a source changes. Batch
+scoring hands the loaded automaton to each worker process.
+
+Usage: python strength.py personas.json [--wordlist rockyou.txt] [--workers N]
+       python strength.py credentials.csv
+       python strength.py --password 'Tr@v3lbug&2025' [--user-input travelbug]
+"""
+import os
+import re
+import csv
+import sys
+import math
+import time
+import pickle
+import hashlib
+import argparse
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from root_analysis import decompose, load_personas, LEET_UNDO
+
+AUTOMATON_CACHE = "strength_automaton.pickle"
+CACHE_VERSION = 1
+SCORES_FILE = "strength_scores.csv"
+MAX_WORDS = 100_000       # per wordlist, like zxcvbn's trimmed frequency lists
+CORPUS_ROOTS = 20_000     # most frequent personal roots used as a dictionary
+MIN_WORD = 3
+BATCH_SIZE = 2000
+REFERENCE_YEAR = time.localtime().tm_year
+MIN_YEAR_SPACE = 20
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+SCORE_THRESHOLDS = (1e3, 1e6, 1e8, 1e10)   # below each: score 0..3, above all: 4
+LONG_WORK = 19            # the study's median work password length
+
+# '1' and '!' also stand in for 'l' and 'i'; the second table covers those
+LEET_ALT = {**LEET_UNDO, ord("1"): "l", ord("!"): "i"}
+
+# ranked: most common first
+COMMON_WORDS = [
+    "password", "123456", "qwerty", "letmein", "welcome", "admin", "login", "dragon", "monkey",
+    "football", "baseball", "soccer", "hockey", "golf", "master", "shadow", "sunshine", "princess",
+    "iloveyou", "love", "secret", "summer", "winter", "spring", "autumn", "fall", "changeme",
+    "trustno1", "superman", "batman", "starwars", "freedom", "whatever", "hello", "charlie",
+    "jordan", "michael", "jennifer", "thomas", "daniel", "family", "friends", "happy", "lucky",
+    "angel", "tiger", "coffee", "pizza", "music", "guitar", "travel", "beach", "garden", "flower",
+    "cookie", "chocolate", "cheese", "dog", "cat", "puppy", "kitty", "horse", "bear", "eagle",
+    "red", "blue", "green", "black", "silver", "gold", "star", "moon", "sun", "sky", "ocean",
+    "mountain", "river", "forest", "fire", "water", "rock", "king", "queen", "boss", "hero",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september",
+    "october", "november", "december", "monday", "tuesday", "wednesday", "thursday", "friday",
+    "saturday", "sunday", "work", "office", "company", "team", "manager", "finance", "sales",
+    "health", "care", "nurse", "doctor", "hospital", "bank", "money", "cash", "teacher",
+    "school", "student", "class", "build", "builder", "construction", "site", "safety",
+    "retail", "store", "shop", "customer", "tech", "code", "data", "cloud", "server", "network",
+    "banking", "healthcare", "education", "secure", "security", "access", "system", "support",
+]
+
+QWERTY_ROWS = ("`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./")
+QWERTY_SHIFTED = ("~!@#$%^&*()_+", "QWERTYUIOP{}|", 'ASDFGHJKL:"', "ZXCVBNM<>?")
+
+YEAR = re.compile(r"(?=(19\d\d|20\d\d))")
+DATE_SEPARATED = re.compile(r"(?=(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4}))")
+DATE_DIGITS = re.compile(r"(?=(\d{8}|\d{6}))")
+REPEAT_GREEDY = re.compile(r"(.+)\1+", re.DOTALL)
+REPEAT_LAZY = re.compile(r"(.+?)\1+", re.DOTALL)
+REPEAT_BASE = re.compile(r"^(.+?)\1+$", re.DOTALL)
+START_UPPER = re.compile(r"^[A-Z][^A-Z]+$")
+END_UPPER = re.compile(r"^[^A-Z]+[A-Z]$")
+
+
+# --- keyboard graph ---
+def keyboard_graph():
+    """ {key: (row, col, shifted)} and {key: neighbouring keys} for a slanted QWERTY layout """
+    keys = {}
+    for shifted, rows in ((False, QWERTY_ROWS), (True, QWERTY_SHIFTED)):
+        for r, row in enumerate(rows):
+            for c, key in enumerate(row):
+                keys[key] = (r, c, shifted)
+    positions = {(r, c): (QWERTY_ROWS[r][c], QWERTY_SHIFTED[r][c])
+                 for r in range(len(QWERTY_ROWS)) for c in range(len(QWERTY_ROWS[r]))}
+    neighbours = {}
+    for key, (r, c, _) in keys.items():
+        # each row sits half a key right of the one above it
+        around = [(r, c - 1), (r, c + 1), (r - 1, c), (r - 1, c + 1), (r + 1, c - 1), (r + 1, c)]
+        neighbours[key] = frozenset(k for pos in around for k in positions.get(pos, ()))
+    return keys, neighbours
+
+
+KEYS, NEIGHBOURS = keyboard_graph()
+KEY_COUNT = sum(len(row) for row in QWERTY_ROWS)
+AVG_DEGREE = sum(len(NEIGHBOURS[k]) / 2 for row in QWERTY_ROWS for k in row) / KEY_COUNT
+
+
+# --- guess estimates ---
+def uppercase_variations(token):
+    if not any(c.isupper() for c in token) or token.lower() == token:
+        return 1
+    if START_UPPER.match(token) or END_UPPER.match(token) or not any(c.islower() for c in token):
+        return 2
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def leet_variations(token, subs):
+    """ subs: {leet char: letter} used in the token """
+    lowered = token.lower()
+    variations = 1
+    for leet, letter in subs.items():
+        substituted, unsubstituted = lowered.count(leet), lowered.count(letter)
+        if not substituted or not unsubstituted:
+            variations *= 2
+        else:
+            variations *= sum(math.comb(substituted + unsubstituted, i)
+                              for i in range(1, min(substituted, unsubstituted) + 1))
+    return variations
+
+
+def spatial_guesses(length, turns, shifted):
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += math.comb(i - 1, j - 1) * KEY_COUNT * AVG_DEGREE ** j
+    unshifted = length - shifted
+    if shifted and not unshifted:
+        guesses *= 2
+    elif shifted:
+        guesses *= sum(math.comb(shifted + unshifted, i) for i in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+
+def year_guesses(year):
+    return max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE)
+
+
+def bruteforce_guesses(length, whole):
+    guesses = float(BRUTEFORCE_CARDINALITY) ** length
+    if not whole:
+        guesses = max(guesses, MIN_SUBMATCH_GUESSES_SINGLE_CHAR if length == 1
+                      else MIN_SUBMATCH_GUESSES_MULTI_CHAR)
+    return guesses
+
+
+def guesses_to_score(guesses):
+    for score, threshold in enumerate(SCORE_THRESHOLDS):
+        if guesses < threshold:
+            return score
+    return len(SCORE_THRESHOLDS)
+
+
+def full_year(value):
+    if value > 99:
+        return value
+    return 1900 + value if value > 50 else 2000 + value
+
+
+def date_year(parts):
+    """ the year of a (a, b, c) digit split that reads as a date, else None """
+    a, b, c = parts
+    for year, first, second in ((c, a, b), (a, b, c)):
+        if len(str(year)) not in (2, 4) or not (1 <= first <= 31 and 1 <= second <= 31):
+            continue
+        if first > 12 and second > 12:
+            continue
+        year = full_year(year)
+        if 1900 <= year <= 2099:
+            return year
+    return None
+
+
+# --- dictionaries ---
+class Automaton:
+    """
+    Aho-Corasick over lowercased words: search() finds every dictionary
+    word inside a string in one pass, as (start, end, rank). state() is
+    plain lists and dicts, which is what gets cached.
+    """
+    def __init__(self, goto, fail, out, words):
+        self.goto, self.fail, self.out = goto, fail, out
+        self.words = words
+
+    @classmethod
+    def build(cls, ranked):
+        goto, out = [{}], [()]
+        for word, rank in ranked.items():
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = ((len(word), rank),)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # words ending here include those ending at the failure state
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        return cls(goto, fail, out, len(ranked))
+
+    def state(self):
+        return self.goto, self.fail, self.out, self.words
+
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        found = []
+        state = 0
+        for j, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, rank in out[state]:
+                found.append((j - length + 1, j, rank))
+        return found
+
+
+def read_wordlist(path, max_words):
+    """ lowercased entries of a frequency-ordered list, first occurrence wins """
+    words = {}
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            word = line.strip().lower()
+            if len(word) >= MIN_WORD and word not in words:
+                words[word] = len(words) + 1
+                if len(words) >= max_words:
+                    break
+    return words
+
+
+def ranked_words(wordlists=(), max_words=MAX_WORDS, corpus_roots=()):
+    """ {word: best rank} over the built-in list, the wordlists and the corpus roots """
+    ranked = {}
+    sources = [{w: i for i, w in enumerate(COMMON_WORDS, 1)}]
+    sources += [read_wordlist(path, max_words) for path in wordlists]
+    sources.append({w: i for i, w in enumerate(corpus_roots, 1)})
+    for source in sources:
+        for word, rank in source.items():
+            if len(word) >= MIN_WORD and rank < ranked.get(word, math.inf):
+                ranked[word] = rank
+    return ranked
+
+
+def automaton_signature(wordlists, max_words, corpus_roots):
+    files = []
+    for path in wordlists:
+        st = os.stat(path)
+        files.append((os.path.abspath(path), st.st_mtime, st.st_size))
+    corpus = hashlib.blake2b("\n".join(corpus_roots).encode('utf-8'), digest_size=16).hexdigest()
+    builtin = hashlib.blake2b("\n".join(COMMON_WORDS).encode('utf-8'), digest_size=16).hexdigest()
+    return (CACHE_VERSION, tuple(files), max_words, corpus, builtin)
+
+
+def load_automaton(wordlists=(), max_words=MAX_WORDS, corpus_roots=(), cache_path=AUTOMATON_CACHE):
+    """ the cached automaton for these sources, built (and cached) when missing or stale """
+    signature = automaton_signature(wordlists, max_words, corpus_roots)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_signature, state = pickle.load(f)
+            if cached_signature == signature:
+                return Automaton(*state)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+    start = time.perf_counter()
+    automaton = Automaton.build(ranked_words(wordlists, max_words, corpus_roots))
+    print(f"--- Built the dictionary automaton: {automaton.words} words, "
+          f"{len(automaton.goto)} states ({time.perf_counter() - start:.1f}s) ---")
+    if cache_path:
+        try:
+            with open(cache_path + ".tmp", 'wb') as f:
+                pickle.dump((signature, automaton.state()), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + ".tmp", cache_path)
+        except OSError:
+            pass
+    return automaton
+
+
+# --- scoring ---
+class Strength:
+    """ estimated guesses (log10), 0-4 score and the patterns of the cheapest match sequence """
+    __slots__ = ("guesses_log10", "score", "pattern")
+
+    def __init__(self, guesses, pattern):
+        self.guesses_log10 = math.log10(max(guesses, 1))
+        self.score = guesses_to_score(guesses)
+        self.pattern = pattern
+
+
+class StrengthScorer:
+    def __init__(self, automaton):
+        self.automaton = automaton
+        self.memo = {}
+
+    # --- matchers: (start, end, pattern, guesses) ---
+    def dictionary_matches(self, password, user_inputs):
+        lowered = password.lower()
+        variants = [(lowered, None)]
+        for table in (LEET_UNDO, LEET_ALT):
+            plain = lowered.translate(table)
+            if plain != lowered and all(plain != v for v, _ in variants):
+                variants.append((plain, table))
+        matches = []
+        for text, table in variants:
+            found = self.automaton.search(text)
+            for rank, word in enumerate(user_inputs, 1):
+                start = text.find(word)
+                while start != -1:
+                    found.append((start, start + len(word) - 1, rank))
+                    start = text.find(word, start + 1)
+            for i, j, rank in found:
+                token = password[i:j + 1]
+                guesses = rank * uppercase_variations(token)
+                pattern = "dictionary"
+                if table is not None:
+                    subs = {o: p for o, p in zip(lowered[i:j + 1], text[i:j + 1]) if o != p}
+                    if not subs:
+                        continue    # the plain text already matched this span
+                    guesses *= leet_variations(token, subs)
+                    pattern = "leet"
+                matches.append((i, j, pattern, guesses))
+        return matches
+
+    def spatial_matches(self, password):
+        matches = []
+        n = len(password)
+        i = 0
+        while i < n - 2:
+            j, turns, direction = i, 0, None
+            while j + 1 < n and password[j + 1] in NEIGHBOURS.get(password[j], ()):
+                (r1, c1, _), (r2, c2, _) = KEYS[password[j]], KEYS[password[j + 1]]
+                if (r2 - r1, c2 - c1) != direction:
+                    turns += 1
+                    direction = (r2 - r1, c2 - c1)
+                j += 1
+            if j - i >= 2:
+                shifted = sum(1 for c in password[i:j + 1] if KEYS[c][2])
+                matches.append((i, j, "spatial", spatial_guesses(j - i + 1, turns, shifted)))
+                i = j
+            else:
+                i += 1
+        return matches
+
+    def date_matches(self, password):
+        matches = []
+        for m in YEAR.finditer(password):
+            matches.append((m.start(1), m.end(1) - 1, "year", year_guesses(int(m.group(1)))))
+        for m in DATE_SEPARATED.finditer(password):
+            year = date_year((int(m.group(1)), int(m.group(3)), int(m.group(4))))
+            if year:
+                matches.append((m.start(1), m.end(4) - 1, "date", 365 * year_guesses(year) * 4))
+        for m in DATE_DIGITS.finditer(password):
+            digits = m.group(1)
+            splits = ((digits[:2], digits[2:4], digits[4:]), (digits[:4], digits[4:6], digits[6:])) \
+                if len(digits) == 8 else ((digits[:2], digits[2:4], digits[4:]),)
+            for parts in splits:
+                year = date_year(tuple(int(p) for p in parts))
+                if year:
+                    matches.append((m.start(1), m.end(1) - 1, "date", 365 * year_guesses(year)))
+                    break
+        return matches
+
+    def repeat_matches(self, password):
+        matches = []
+        last = 0
+        while last < len(password):
+            greedy = REPEAT_GREEDY.search(password, last)
+            if not greedy:
+                break
+            lazy = REPEAT_LAZY.search(password, last)
+            if len(greedy.group(0)) > len(lazy.group(0)):
+                match, base = greedy, REPEAT_BASE.match(greedy.group(0)).group(1)
+            else:
+                match, base = lazy, lazy.group(1)
+            repeats = len(match.group(0)) // len(base)
+            matches.append((match.start(), match.end() - 1, "repeat", self.guesses(base)[0] * repeats))
+            last = match.end()
+        return matches
+
+    def matches(self, password, user_inputs=()):
+        return (self.dictionary_matches(password, user_inputs) + self.spatial_matches(password)
+                + self.date_matches(password) + self.repeat_matches(password))
+
+    # --- the cheapest covering sequence (zxcvbn's most_guessable_match_sequence) ---
+    def guesses(self, password, user_inputs=()):
+        """ (guesses, [matches]) of the cheapest match sequence covering the password """
+        if not user_inputs and password in self.memo:
+            return self.memo[password]
+        n = len(password)
+        if not n:
+            return 1, []
+        by_end = defaultdict(list)
+        for i, j, pattern, guesses in self.matches(password, user_inputs):
+            if j - i + 1 < n:
+                guesses = max(guesses, MIN_SUBMATCH_GUESSES_SINGLE_CHAR if i == j
+                              else MIN_SUBMATCH_GUESSES_MULTI_CHAR)
+            by_end[j].append((i, j, pattern, guesses))
+        # per end position k and sequence length l: the best (g, pi, match)
+        best = [{} for _ in range(n)]
+        brute = [bruteforce_guesses(length, False) for length in range(n + 1)]
+
+        def update(match, length):
+            i, k = match[0], match[1]
+            pi = match[3] * (best[i - 1][length - 1][1] if length > 1 else 1)
+            g = math.factorial(length) * pi + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1)
+            for other_length, (other_g, _, _) in best[k].items():
+                if other_length <= length and other_g <= g:
+                    return
+            best[k][length] = (g, pi, match)
+
+        for k in range(n):
+            for match in by_end[k]:
+                i = match[0]
+                if i == 0:
+                    update(match, 1)
+                else:
+                    for length in list(best[i - 1]):
+                        update(match, length + 1)
+            update((0, k, "bruteforce", bruteforce_guesses(k + 1, k + 1 == n)), 1)
+            for i in range(1, k + 1):
+                gap = (i, k, "bruteforce", brute[k - i + 1])
+                for length, (_, _, last) in list(best[i - 1].items()):
+                    if last[2] != "bruteforce":
+                        update(gap, length + 1)
+
+        length, (g, _, _) = min(best[n - 1].items(), key=lambda item: item[1][0])
+        sequence = []
+        k = n - 1
+        while k >= 0:
+            match = best[k][length][2]
+            sequence.append(match)
+            k = match[0] - 1
+            length -= 1
+        sequence.reverse()
+        result = (g, sequence)
+        if not user_inputs:
+            if len(self.memo) > 100_000:
+                self.memo.clear()
+            self.memo[password] = result
+        return result
+
+    def score(self, password, user_inputs=()):
+        guesses, sequence = self.guesses(password, user_inputs)
+        return Strength(guesses, "+".join(m[2] for m in sequence))
+
+
+# --- batch scoring ---
+_scorer = None
+
+
+def init_worker(state):
+    """ the parent's automaton, once per process (inherited as is when forked) """
+    global _scorer
+    if _scorer is None:
+        _scorer = StrengthScorer(Automaton(*state))
+
+
+def score_batch(batch):
+    """ [(password, user_inputs)] -> [(guesses_log10, score, pattern)] """
+    results = []
+    for password, user_inputs in batch:
+        s = _scorer.score(password, user_inputs)
+        results.append((s.guesses_log10, s.score, s.pattern))
+    return results
+
+
+def score_many(items, automaton, workers=1):
+    """ scores for [(password, user_inputs)], in order, on `workers` processes """
+    global _scorer
+    _scorer = StrengthScorer(automaton)
+    batches = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+    if workers <= 1 or len(batches) <= 1:
+        return [r for batch in batches for r in score_batch(batch)]
+    # the state itself, not the cache file: that may be stale or missing if writing it failed
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(automaton.state(),)) as pool:
+        return [r for results in pool.map(score_batch, batches) for r in results]
+
+
+def clean_inputs(words):
+    """ lowercased, de-duplicated user inputs long enough to count, in rank order """
+    return tuple(dict.fromkeys(w.lower() for w in words if w and len(w) >= MIN_WORD))
+
+
+def persona_items(personas):
+    """ one row per account: (user_id, account, sector, behavior_tag, password, user_inputs) """
+    rows = []
+    for p in personas:
+        personal, work = p.get('personal_password', ''), p.get('work_password', '')
+        email, lanid = p.get('personal_email') or '', p.get('work_lanid') or ''
+        known = re.split(r"[\s._-]+", p.get('name') or '') + [email.split('@')[0], lanid]
+        sector, behavior = p.get('sector', 'Unknown'), p.get('behavior_tag', 'Unknown')
+        rows.append((email, "personal", sector, behavior, personal, clean_inputs(known)))
+        # the attacker who has the personal password (84% are pwned) tries its root first
+        rows.append((lanid, "work", sector, behavior, work,
+                     clean_inputs([decompose(personal).root, personal] + known)))
+    return rows
+
+
+def credential_items(path):
+    """ rows for a credentials.csv: accounts told apart by the '@' in personal user ids """
+    rows = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            user = row.get('user_id', '')
+            account = "personal" if '@' in user else "work"
+            known = [user.split('@')[0]]
+            rows.append((user, account, "Unknown", "Unknown", row.get('password', ''), clean_inputs(known)))
+    return rows
+
+
+def corpus_roots(rows, top=CORPUS_ROOTS):
+    roots = Counter(decompose(r[4]).root for r in rows if r[1] == "personal")
+    return [root for root, _ in roots.most_common(top) if len(root) >= MIN_WORD]
+
+
+# --- report ---
+def print_distribution(rows, results, key):
+    for account in ("personal", "work"):
+        groups = defaultdict(list)
+        for row, result in zip(rows, results):
+            if row[1] == account:
+                groups[row[key]].append(result)
+        if not groups:
+            continue
+        label = ("sector", "behavior_tag")[key - 2]
+        print(f"\n--- {account.upper()} PASSWORD STRENGTH BY {label.upper()} ---")
+        print(f"{label:<40} {'count':>7} {'median log10':>13}   score 0 / 1 / 2 / 3 / 4")
+        for name, members in sorted(groups.items(), key=lambda kv: -len(kv[1])):
+            logs = sorted(r[0] for r in members)
+            scores = Counter(r[1] for r in members)
+            shares = " / ".join(f"{scores[s] / len(members):.0%}" for s in range(5))
+            print(f"{str(name):<40} {len(members):>7} {logs[len(logs) // 2]:>13.1f}   {shares}")
+
+
+def print_weak_long(rows, results, top=10):
+    """ work passwords at least LONG_WORK chars that still score 2 or less """
+    long_work = [(result, row) for row, result in zip(rows, results)
+                 if row[1] == "work" and len(row[4]) >= LONG_WORK]
+    weak = sorted((item for item in long_work if item[0][1] <= 2), key=lambda item: item[0][0])
+    print("\n--- WEAK LONG WORK PASSWORDS ---")
+    if not long_work:
+        print(f"No work passwords of {LONG_WORK}+ characters")
+        return
+    print(f"{len(weak)} of {len(long_work)} work passwords with {LONG_WORK}+ characters score 2 or less")
+    shown = set()
+    for (log10, score, pattern), row in weak:
+        if len(shown) >= top:
+            break
+        if row[4] in shown:
+            continue
+        shown.add(row[4])
+        print(f"  {row[4]} ({len(row[4])} chars, {row[3]}): 10^{log10:.1f} guesses, score {score}, {pattern}")
+
+
+def score_file(path, wordlists=(), max_words=MAX_WORDS, workers=None, out_path=SCORES_FILE,
+               use_corpus=True, cache_path=AUTOMATON_CACHE):
+    rows = credential_items(path) if path.endswith(".csv") else persona_items(load_personas(path))
+    automaton = load_automaton(wordlists, max_words, corpus_roots(rows) if use_corpus else (),
+                               cache_path)
+    workers = max(1, workers or os.cpu_count() or 1)
+    start = time.perf_counter()
+    results = score_many([(r[4], r[5]) for r in rows], automaton, workers)
+    elapsed = time.perf_counter() - start
+    print(f"--- Scored {len(rows)} passwords in {elapsed:.1f}s "
+          f"({len(rows) / max(elapsed, 1e-9) * 60:,.0f} per minute, {workers} worker"
+          f"{'s' if workers > 1 else ''}) ---")
+
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["user_id", "account", "sector", "behavior_tag", "length",
+                         "guesses_log10", "score", "pattern"])
+        for row, (log10, score, pattern) in zip(rows, results):
+            writer.writerow([row[0], row[1], row[2], row[3], len(row[4]), f"{log10:.2f}", score, pattern])
+
+    if any(row[2] != "Unknown" for row in rows):
+        print_distribution(rows, results, 2)
+        print_distribution(rows, results, 3)
+    else:
+        print_distribution(rows, results, 2)
+    print_weak_long(rows, results)
+    print(f"\n✅ Saved {out_path}")
+
+
+def explain(password, user_inputs=(), wordlists=(), max_words=MAX_WORDS, cache_path=AUTOMATON_CACHE):
+    """ print the cheapest match sequence for one password """
+    scorer = StrengthScorer(load_automaton(wordlists, max_words, (), cache_path))
+    guesses, sequence = scorer.guesses(password, clean_inputs(user_inputs))
+    print(f"{password}: 10^{math.log10(max(guesses, 1)):.1f} guesses, score {guesses_to_score(guesses)}")
+    for i, j, pattern, match_guesses in sequence:
+        print(f"  {password[i:j + 1]!r:<24} {pattern:<11} 10^{math.log10(max(match_guesses, 1)):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="zxcvbn-style guessability scores per sector and behavior tag.")
+    parser.add_argument("input_file", nargs="?",
+                        help="personas.json / personas.jsonl / study.parquet or credentials.csv")
+    parser.add_argument("--password", help="explain the score of one password instead")
+    parser.add_argument("--user-input", action="append", default=[],
+                        help="known word for --password (name, personal root...), repeatable")
+    parser.add_argument("--wordlist", action="append", default=[],
+                        help="frequency-ordered wordlist to use as a dictionary, repeatable")
+    parser.add_argument("--max-words", type=int, default=MAX_WORDS,
+                        help="entries read from each wordlist (default: %(default)s)")
+    parser.add_argument("--no-corpus-roots", action="store_true",
+                        help="don't use the corpus' personal password roots as a dictionary")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="scoring processes (default: %(default)s)")
+    parser.add_argument("--output", default=SCORES_FILE, help="per password scores (default: %(default)s)")
+    parser.add_argument("--cache", default=AUTOMATON_CACHE,
+                        help="compiled dictionary cache (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        if args.password is not None:
+            explain(args.password, args.user_input, args.wordlist, args.max_words, args.cache)
+        elif args.input_file:
+            score_file(args.input_file, args.wordlist, args.max_words, args.workers, args.output,
+                       not args.no_corpus_roots, args.cache)
+        else:
+            parser.error("give an input file or --password")
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        sys.exit(1)
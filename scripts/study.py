@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the study tools.
+
+Each command runs the script of the same purpose exactly as if it had
+been started directly: same arguments, output and exit code. Nothing is
+imported until a command is chosen, so a command starts as fast as its
+script and offline commands never load the Gemini SDK, requests, passlib
+or NumPy unless they actually use them. `benchmark.py --only startup`
+times the cold start of the offline commands.
+
+Usage: python study.py <command> [args...]
+       python study.py                  list the commands
+"""
+import os
+import sys
+import runpy
+
+# command -> (module, description); offline commands first
+COMMANDS = {
+    "hashdump": ("create_hashdumps", "shadow, pwdump and raw hash files from a credentials CSV"),
+    "sample": ("sample", "random sample of text files"),
+    "roots": ("root_analysis", "password root extraction and clustering"),
+    "candidates": ("candidate_generator", "targeted work-password candidates"),
+    "audit": ("audit", "offline audit of the hash dumps against a wordlist"),
+    "strength": ("strength", "zxcvbn-style guessability scores"),
+    "store": ("study_store", "Parquet study store (needs pyarrow)"),
+    "personas": ("persona_store", "export personas.jsonl to personas.json / credentials.csv"),
+    "synthetic": ("synthetic", "deterministic synthetic study data"),
+    "policy": ("password_policy", "password policy throughput benchmark"),
+    "benchmark": ("benchmark", "offline scale benchmarks"),
+    "metrics": ("metrics", "summarize or watch run metrics"),
+    "hibp-cache": ("hibp_cache", "HIBP range cache stats"),
+    "hibp-index": ("hibp_index", "build or query a local Pwned Passwords index"),
+    "llm-cache": ("llm_cache", "model response cache stats"),
+    "generate": ("password_generator", "generate personas with the model"),
+    "check": ("check_hibp_csv", "HIBP lookups for a credentials CSV"),
+    "check-text": ("check_hibp_text", "HIBP lookups for a password list"),
+    "pipeline": ("pipeline", "streaming generate/enrich/hash/sample pipeline"),
+    "coordinator": ("coordinator", "sharded generation over HTTP"),
+    "hibp-stub": ("hibp_stub", "local stand-in for the range API"),
+}
+
+
+def print_commands():
+    print(f"Usage: python {os.path.basename(sys.argv[0])} <command> [args...]\n")
+    for command, (module, description) in COMMANDS.items():
+        print(f"  {command:<12} {description} ({module}.py)")
+
+
+def run_command(command, argv):
+    """ run the command's script as __main__ with argv as its arguments """
+    module = COMMANDS[command][0]
+    # the scripts import their siblings by plain name
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.argv = [module, *argv]
+    # alter_sys makes the script the real __main__, so its functions pickle for process pools
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print_commands()
+        sys.exit(0 if len(sys.argv) > 1 else 1)
+    if sys.argv[1] not in COMMANDS:
+        print(f"Error: unknown command '{sys.argv[1]}'.\n")
+        print_commands()
+        sys.exit(1)
+    run_command(sys.argv[1], sys.argv[2:])
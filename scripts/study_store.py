@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Columnar study store: one typed, zstd compressed Parquet table per study.
+
+One row per persona, keyed by persona_id (its position in personas.jsonl,
+so credentials.csv row 2*id is the personal account and 2*id+1 the work
+account). Columns join the persona fields, sector and behavior_tag
+(dictionary encoded), both passwords and their lengths, the HIBP counts
+(null until looked up) and pwned flags, the raw md5 / sha1 / sha256 /
+NTLM digests and, when imported, the salted shadow.txt hashes.
+
+Rows are written sorted by sector with per row group statistics, so
+loaders that read a few columns with a filter (load(..., where=...))
+skip the rest of the file. Needs pyarrow (pip install pyarrow).
+
+Usage: python study_store.py import study.parquet [--personas personas.jsonl] [--checked checked_credentials.csv] [--lookup]
+       python study_store.py export study.parquet [--credentials credentials.csv] [--hashes md5,pwdump]
+       python study_store.py summary study.parquet [--by behavior_tag] [--where sector=Banking]
+"""
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import textwrap
+import hibp
+from audit import digests_for
+from create_hashdumps import FORMATS, START_UID, LM_EMPTY
+from persona_store import PersonaStore, credential_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # the rest of the scripts work without it
+    pa = pc = pq = None
+
+STUDY_FILE = "study.parquet"
+ROW_GROUP_SIZE = 65536
+COMPRESSION = "zstd"
+ACCOUNTS = ("personal", "work")
+DIGESTS = {"md5": 16, "sha1": 20, "sha256": 32, "ntlm": 16}
+PERSONA_FIELDS = ["name", "occupation", "personal_email", "personal_password",
+                  "work_lanid", "work_password", "behavior_tag", "sector"]
+GROUP_COLUMNS = ("sector", "behavior_tag")
+
+
+def require_pyarrow():
+    if pa is None:
+        raise SystemExit("study_store.py needs pyarrow: pip install pyarrow")
+
+
+def schema():
+    require_pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ("persona_id", pa.int32()),
+        ("name", pa.string()),
+        ("occupation", pa.string()),
+        ("sector", category),
+        ("behavior_tag", category),
+        ("personal_email", pa.string()),
+        ("work_lanid", pa.string()),
+    ]
+    for account in ACCOUNTS:
+        fields += [
+            (f"{account}_password", pa.string()),
+            (f"{account}_length", pa.int16()),
+            (f"{account}_pwned_count", pa.int64()),
+            (f"{account}_pwned", pa.bool_()),
+        ]
+        fields += [(f"{account}_{name}", pa.binary(size)) for name, size in DIGESTS.items()]
+        fields.append((f"{account}_shadow", pa.string()))
+    return pa.schema(fields)
+
+
+# --- import ---
+def read_personas(path):
+    """ personas.jsonl (the store) or a personas.json list """
+    if path.endswith(".jsonl"):
+        store = PersonaStore(path)
+        store.repair()
+        return list(store)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_checked(path):
+    """ {user_id: True/False/None} from checked_credentials.csv """
+    flags = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            flags[row['user_id']] = {"True": True, "False": False}.get(row.get('pwned', ''))
+    return flags
+
+
+def read_shadow(path, personas):
+    """ shadow hashes per (persona index, account), matched by position like create_hashdumps wrote them """
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    hashes = {}
+    position = 0
+    for i, p in enumerate(personas):
+        for account, (user, password) in zip(ACCOUNTS, credential_rows(p)):
+            if not password:
+                continue
+            if position >= len(lines):
+                return hashes
+            name, _, rest = lines[position].partition(":")
+            if name != user.split('@')[0].lower():
+                raise ValueError(f"{path} line {position + 1}: expected user {user!r}, found {name!r}")
+            hashes[(i, account)] = rest.split(":")[0]
+            position += 1
+    return hashes
+
+
+def build_table(personas, checked=None, counts=None, shadow=None):
+    """
+    Arrow table for a persona list. checked: {user_id: bool} from a
+    checked CSV, counts: {user_id: HIBP count}, shadow: read_shadow().
+    """
+    checked, counts, shadow = checked or {}, counts or {}, shadow or {}
+    columns = {
+        "persona_id": list(range(len(personas))),
+        "name": [p.get('name') for p in personas],
+        "occupation": [p.get('occupation') for p in personas],
+        "sector": [p.get('sector') for p in personas],
+        "behavior_tag": [p.get('behavior_tag') for p in personas],
+        "personal_email": [p.get('personal_email', '') for p in personas],
+        "work_lanid": [p.get('work_lanid', '') for p in personas],
+    }
+    for account, user_key in zip(ACCOUNTS, ("personal_email", "work_lanid")):
+        passwords = [p.get(f'{account}_password', '') for p in personas]
+        users = columns[user_key]
+        columns[f"{account}_password"] = passwords
+        columns[f"{account}_length"] = [len(pw) for pw in passwords]
+        pwned_counts = [counts.get(user) for user in users]
+        columns[f"{account}_pwned_count"] = pwned_counts
+        columns[f"{account}_pwned"] = [checked.get(user) if count is None else count > 0
+                                       for user, count in zip(users, pwned_counts)]
+        for name in DIGESTS:
+            columns[f"{account}_{name}"] = digests_for("pwdump" if name == "ntlm" else name, passwords)
+        columns[f"{account}_shadow"] = [shadow.get((i, account)) for i in range(len(personas))]
+    return pa.Table.from_pydict(columns, schema=schema())
+
+
+def write_table(table, path):
+    """ sorted by sector so row group statistics can skip whole sectors """
+    # dictionary columns can't be sort keys, so sort on their string values
+    keys = pa.table({"sector": pc.cast(table["sector"], pa.string()), "persona_id": table["persona_id"]})
+    ordered = table.take(pc.sort_indices(keys, sort_keys=[("sector", "ascending"),
+                                                          ("persona_id", "ascending")]))
+    tmp = path + ".tmp"
+    pq.write_table(ordered, tmp, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE,
+                   write_statistics=True)
+    os.replace(tmp, path)
+
+
+def lookup_counts(personas, concurrency, cache, cache_only, index):
+    """ {user_id: HIBP count} for both accounts of every persona (failed lookups left out) """
+    rows = [row for p in personas for row in credential_rows(p)]
+    counts = hibp.lookup_counts([pw for _, pw in rows], concurrency,
+                                cache=cache, cache_only=cache_only, index=index)
+    return {user: count for (user, _), count in zip(rows, counts) if count is not None}
+
+
+def import_study(path, personas_file, checked_file=None, shadow_file=None, lookup=None):
+    """ build the store; lookup is (concurrency, cache, cache_only, index) to fetch HIBP counts """
+    require_pyarrow()
+    start = time.perf_counter()
+    personas = read_personas(personas_file)
+    checked = read_checked(checked_file) if checked_file else None
+    shadow = read_shadow(shadow_file, personas) if shadow_file else None
+    counts = lookup_counts(personas, *lookup) if lookup else None
+    write_table(build_table(personas, checked, counts, shadow), path)
+    print(f"✅ Stored {len(personas)} personas in {path} "
+          f"({os.path.getsize(path) / 1024 / 1024:.1f} MiB, {time.perf_counter() - start:.1f}s)")
+    if counts is not None:
+        print(f"   HIBP counts for {len(counts)} of {2 * len(personas)} accounts")
+
+
+# --- loading ---
+def parse_where(clauses):
+    """ ['sector=Banking', 'personal_pwned=true'] -> pyarrow filters, or None """
+    if not clauses:
+        return None
+    filters = []
+    for clause in clauses:
+        column, sep, value = clause.partition("=")
+        if not sep:
+            raise ValueError(f"bad filter {clause!r}, use column=value")
+        if value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        elif value.lstrip("-").isdigit():
+            value = int(value)
+        filters.append((column, "=", value))
+    return filters
+
+
+def load(path=STUDY_FILE, columns=None, where=None):
+    """ Arrow table with only `columns`, rows filtered by `where` (pyarrow filter tuples) """
+    require_pyarrow()
+    return pq.read_table(path, columns=columns, filters=where)
+
+
+def load_personas(path=STUDY_FILE, columns=None, where=None):
+    """ persona dicts (only `columns`) in persona_id order, the shape personas.json has """
+    columns = columns or PERSONA_FIELDS
+    table = load(path, list(dict.fromkeys(["persona_id"] + columns)), where).sort_by("persona_id")
+    return table.select(columns).to_pylist()
+
+
+def aggregate(path=STUDY_FILE, by="sector", where=None):
+    """ per group: personas, pwned rates (of looked up accounts) and mean password lengths """
+    require_pyarrow()
+    columns = [by, "personal_pwned", "work_pwned", "personal_length", "work_length"]
+    table = load(path, columns, where)
+    table = table.set_column(0, by, pc.cast(table[by], pa.string()))
+    for account in ACCOUNTS:
+        flag = table[f"{account}_pwned"]
+        table = table.append_column(f"{account}_hit", pc.cast(flag, pa.int64()))
+    grouped = table.group_by(by).aggregate([
+        ("personal_length", "count"),
+        ("personal_hit", "sum"), ("personal_hit", "count"),
+        ("work_hit", "sum"), ("work_hit", "count"),
+        ("personal_length", "mean"), ("work_length", "mean"),
+    ])
+    return grouped.sort_by([("personal_length_count", "descending")])
+
+
+def print_summary(path, by="sector", where=None):
+    start = time.perf_counter()
+    table = aggregate(path, by, where)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    def rate(hits, checked):
+        return f"{hits / checked:.1%}" if checked else "n/a"
+
+    print(f"{by:<40} {'personas':>9} {'personal pwned':>15} {'work pwned':>11} "
+          f"{'avg personal':>13} {'avg work':>9}")
+    for row in table.to_pylist():
+        print(f"{str(row[by]):<40} {row['personal_length_count']:>9} "
+              f"{rate(row['personal_hit_sum'] or 0, row['personal_hit_count']):>15} "
+              f"{rate(row['work_hit_sum'] or 0, row['work_hit_count']):>11} "
+              f"{row['personal_length_mean'] or 0:>13.2f} {row['work_length_mean'] or 0:>9.2f}")
+    print(f"--- {table.num_rows} groups in {elapsed:.1f} ms ---")
+
+
+# --- export ---
+def export_study(path, personas_json=None, credentials_csv=None, checked_csv=None, hashes=()):
+    """ write the legacy files from the store, in persona order """
+    require_pyarrow()
+    columns = list(dict.fromkeys(["persona_id", "personal_email", "personal_password",
+                                  "work_lanid", "work_password"]
+                                 + (PERSONA_FIELDS if personas_json else [])
+                                 + (["personal_pwned", "work_pwned"] if checked_csv else [])
+                                 + [f"{a}_{'ntlm' if h == 'pwdump' else h}"
+                                    for h in hashes for a in ACCOUNTS]))
+    rows = load(path, columns).sort_by("persona_id").to_pylist()
+    credentials = [(row, account, user, pw)
+                   for row in rows
+                   for account, (user, pw) in zip(ACCOUNTS, credential_rows(row))]
+
+    if personas_json:
+        with open(personas_json, 'w', encoding='utf-8') as f:
+            f.write("[\n" + ",\n".join(
+                textwrap.indent(json.dumps({k: row[k] for k in PERSONA_FIELDS}, indent=4), "    ")
+                for row in rows) + "\n]" if rows else "[]")
+        print(f"✅ Exported {len(rows)} personas to {personas_json}")
+    for out_path, extra in ((credentials_csv, False), (checked_csv, True)):
+        if not out_path:
+            continue
+        with open(out_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(["user_id", "password"] + (["pwned"] if extra else []))
+            for row, account, user, pw in credentials:
+                pwned = row[f"{account}_pwned"] if extra else None
+                writer.writerow([user, pw] + ([("" if pwned is None else pwned)] if extra else []))
+        print(f"✅ Exported {len(credentials)} credentials to {out_path}")
+    for fmt in hashes:
+        column = "ntlm" if fmt == "pwdump" else fmt
+        with open(FORMATS[fmt][0], 'w', encoding='utf-8') as f:
+            for i, (row, account, user, pw) in enumerate(credentials):
+                if not pw:
+                    continue
+                digest = row[f"{account}_{column}"].hex()
+                if fmt == "pwdump":
+                    f.write(f"{user}:{START_UID + i}:{LM_EMPTY}:{digest.upper()}:::\n")
+                else:
+                    f.write(digest + "\n")
+        print(f"✅ Exported {FORMATS[fmt][0]}")
+
+
+def parse_hashes(value):
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [n for n in names if n not in ("md5", "sha1", "sha256", "pwdump")]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unsaltable format(s) only: md5, sha1, sha256, pwdump "
+                                         f"(got {', '.join(unknown)})")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Columnar (Parquet) store of personas, credentials, HIBP counts and hashes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="build the store from the generator output")
+    imp.add_argument("store", help="study.parquet to write")
+    imp.add_argument("--personas", default="personas.jsonl",
+                     help="personas.jsonl or personas.json (default: %(default)s)")
+    imp.add_argument("--checked", help="checked_credentials.csv for the pwned flags")
+    imp.add_argument("--shadow", help="shadow.txt written from the same credentials.csv")
+    imp.add_argument("--lookup", action="store_true", help="fetch the HIBP counts (uses the range cache)")
+    hibp.add_cli_options(imp)
+
+    exp = sub.add_parser("export", help="write the legacy files from the store")
+    exp.add_argument("store")
+    exp.add_argument("--personas-json", help="personas.json to write")
+    exp.add_argument("--credentials", help="credentials.csv to write")
+    exp.add_argument("--checked", help="checked_credentials.csv to write")
+    exp.add_argument("--hashes", type=parse_hashes, default=[],
+                     help="md5,sha1,sha256,pwdump dump files to write")
+
+    summ = sub.add_parser("summary", help="per sector / behavior aggregates")
+    summ.add_argument("store")
+    summ.add_argument("--by", choices=GROUP_COLUMNS, default="sector")
+    summ.add_argument("--where", action="append", help="column=value filter, repeatable")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "import":
+            lookup = None
+            if args.lookup:
+                lookup = (args.concurrency, hibp.open_cache(args), args.cache_only, hibp.open_index(args))
+            import_study(args.store, args.personas, args.checked, args.shadow, lookup)
+        elif args.command == "export":
+            export_study(args.store, args.personas_json, args.credentials, args.checked, args.hashes)
+        else:
+            print_summary(args.store, args.by, parse_where(args.where))
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic study data for benchmarks.
+Personas come from fake_model.fake_persona (the study schema) with an
+index added to the email and LAN ID, so every row is unique at any size,
+and the same seed always gives the same files. Writes personas.jsonl,
+personas.json and credentials.csv like a finished generator run.
+Usage: python synthetic.py 10k|100k|1M|<rows> [--seed N] [--out-dir DIR]
+"""
+import os
+import sys
+import random
+import argparse
+from fake_model import fake_persona
+from persona_store import PersonaStore
+
+# same rotation as password_generator.SECTORS
+SECTORS = ["Banking", "Healthcare", "Construction", "Education", "Retail", "Tech"]
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+APPEND_EVERY = 10_000
+
+
+def parse_size(value):
+    """ '10k' / '100k' / '1M' or a plain row count """
+    if value in SIZES:
+        return SIZES[value]
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {value!r}; use {', '.join(SIZES)} or a number")
+    if count <= 0:
+        raise argparse.ArgumentTypeError("size must be positive")
+    return count
+
+
+def synthetic_personas(count, seed=0):
+    """ yields `count` unique personas, identical for the same seed """
+    rng = random.Random(seed)
+    for i in range(count):
+        sector = SECTORS[i % len(SECTORS)]
+        p = fake_persona(rng, sector)
+        local, domain = p['personal_email'].split("@")
+        p['personal_email'] = f"{local}{i}@{domain}"
+        p['work_lanid'] = f"{p['work_lanid']}{i}"
+        p['sector'] = sector
+        yield p
+
+
+def write_corpus(count, out_dir=".", seed=0):
+    """ personas.jsonl + personas.json + credentials.csv in out_dir; returns the paths """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, name)
+             for name in ("personas.jsonl", "personas.json", "credentials.csv")}
+    if os.path.exists(paths["personas.jsonl"]):
+        os.remove(paths["personas.jsonl"])
+    store = PersonaStore(paths["personas.jsonl"])
+    batch = []
+    for p in synthetic_personas(count, seed):
+        batch.append(p)
+        if len(batch) >= APPEND_EVERY:
+            store.append(batch)
+            batch = []
+    store.append(batch)
+    store.export(paths["personas.json"], paths["credentials.csv"])
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Write a deterministic synthetic personas/credentials corpus.")
+    parser.add_argument("size", type=parse_size, help=f"{', '.join(SIZES)} or a row count")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument("--out-dir", default=".", help="output directory (default: current)")
+    args = parser.parse_args()
+
+    written = write_corpus(args.size, args.out_dir, args.seed)
+    print(f"✅ {args.size} personas ({2 * args.size} credentials) in "
+          f"{', '.join(written.values())}")